@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Индекс имён артистов для fuzzy_find — MTB Concerts Bot
+У каждого концерта два ключа, посчитанных один раз при правке:
+  - кириллический — norm(artist);
+  - латинский     — latin_key(artist).
+Запрос сравнивается с обоими столбцами через rapidfuzz.process.extract —
+цикл по всем ключам идёт внутри C, без norm() и вызова scorer из Python
+на каждый концерт. «Ivan Dorn» находит «Иван Дорн» и наоборот.
+"""
+
+from typing import Dict, List, Tuple
+
+from rapidfuzz import fuzz, process
+
+from concert import Concert
+from textnorm import norm, latin_key
+
+SCORERS = (fuzz.token_set_ratio, fuzz.partial_ratio, fuzz.WRatio)
+# Латинский ключ грубее (щ → sch, х → h): частичные совпадения на нём
+# находят «вот» в «Швец» — и partial_ratio, и WRatio (он тоже берёт
+# частичное сравнение). Поэтому там только имя целиком и целые слова
+SCORERS_LAT = (fuzz.ratio, fuzz.token_set_ratio)
+
+
+class ArtistIndex:
+    def __init__(self):
+        # Параллельные столбцы; удаление — перестановкой последнего на место удалённого
+        self._ids: List[int] = []
+        self._cyr: List[str] = []
+        self._lat: List[str] = []
+        self._pos:    Dict[int, int] = {}    # id → позиция в столбцах
+        self._artist: Dict[int, str] = {}    # id → имя, по которому считаны ключи
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def clear(self):
+        self._ids.clear()
+        self._cyr.clear()
+        self._lat.clear()
+        self._pos.clear()
+        self._artist.clear()
+
+    def place(self, c: Concert):
+        if self._artist.get(c.id) == c.artist:
+            return
+        cyr, lat = norm(c.artist or ''), latin_key(c.artist or '')
+        i = self._pos.get(c.id)
+        if i is None:
+            self._pos[c.id] = len(self._ids)
+            self._ids.append(c.id)
+            self._cyr.append(cyr)
+            self._lat.append(lat)
+        else:
+            self._cyr[i], self._lat[i] = cyr, lat
+        self._artist[c.id] = c.artist
+
+    def discard(self, cid: int):
+        i = self._pos.pop(cid, None)
+        if i is None:
+            return
+        self._artist.pop(cid, None)
+        last = len(self._ids) - 1
+        if i != last:
+            self._ids[i], self._cyr[i], self._lat[i] = self._ids[last], self._cyr[last], self._lat[last]
+            self._pos[self._ids[i]] = i
+        self._ids.pop()
+        self._cyr.pop()
+        self._lat.pop()
+
+    def match(self, name: str, threshold: float) -> List[Tuple[int, float]]:
+        """
+        [(id, очки)] — лучший результат по обоим ключам, не ниже threshold.
+        Порядок не определён: сортирует вызывающий.
+        """
+        best: Dict[int, float] = {}
+        for query, column, scorers in ((norm(name), self._cyr, SCORERS),
+                                       (latin_key(name), self._lat, SCORERS_LAT)):
+            if not query:
+                continue
+            for scorer in scorers:
+                for _, score, i in process.extract(query, column, scorer=scorer,
+                                                   limit=None, score_cutoff=threshold):
+                    cid = self._ids[i]
+                    if score > best.get(cid, 0):
+                        best[cid] = score
+        return list(best.items())
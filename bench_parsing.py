@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Бенчмарк разбора сообщений — MTB Concerts Bot
+Меряет функции, через которые проходит каждый входящий текст:
+detect_kw, parse_trigger, extract_date_time, strip_date_time,
+parse_free_text и fuzzy_find (последний — на хранилищах 10…10000 концертов).
+
+Корпус сообщений генерируется из фиксированного seed, поэтому прогоны
+сравнимы между версиями. Результат — JSON:
+  python bench_parsing.py -o bench_v6.json
+  python bench_parsing.py -o bench_new.json --compare bench_v6.json
+"""
+
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List
+
+import bot
+from concert import Concert
+
+FIRST = ['Иван', 'Мария', 'Олег', 'Анна', 'Дмитрий', 'Zemfira', 'Oxxxymiron', 'Монеточка',
+         'Noize', 'Ленинград', 'Кино', 'Пётр', 'Алёна', 'Sergey', 'Little', 'Гречка']
+LAST  = ['Дорн', 'Шульц', 'MC', 'Big', 'Лазарев', 'Band', 'Квартет', 'Trio', 'Orchestra',
+         'Швец', 'Жуков', "O'Brien", 'Ёлкин', 'DJ', 'Project', '']
+MONTH_NAMES = list(bot.MONTHS)
+
+TEMPLATES = [
+    "{a} билеты {url}",
+    "{a} билет {url} пожалуйста",
+    "вот билеты {a} {url}",
+    "{a} афиша одобрена",
+    "{a} афиша ок",
+    "{a} poster approved",
+    "{a} текст {desc}",
+    "{a} описание: {desc}",
+    "{a} дата {d} {t}",
+    "{a} перенос на {dm}",
+    "{a} дата {dw}",
+    "{a} отмена",
+    "{a} отменили",
+    "{a} {d} {t}",
+    "{d} {a}",
+    "{a} {dw} {t}",
+    "{a} билетсы {url}",
+    "привет, как дела?",
+    "{a}",
+    "ок",
+]
+DESC = ("Большой сольный концерт с новой программой и любимыми хитами. "
+        "Специальные гости, живой звук и атмосфера клуба.")
+
+
+def artist(rng: random.Random) -> str:
+    return f"{rng.choice(FIRST)} {rng.choice(LAST)}".strip()
+
+
+def make_corpus(n: int, seed: int) -> List[str]:
+    rng = random.Random(seed)
+    out = []
+    for _ in range(n):
+        day, month = rng.randint(1, 28), rng.randint(1, 12)
+        out.append(rng.choice(TEMPLATES).format(
+            a    = artist(rng),
+            url  = f"https://mtbarmoscow.com/tickets/{rng.randint(1000, 99999)}?utm=tg",
+            desc = DESC[:rng.randint(20, len(DESC))],
+            d    = f"{day:02d}.{month:02d}.2026",
+            dm   = f"{day}.{month:02d}",
+            dw   = f"{day} {MONTH_NAMES[month - 1]}",
+            t    = rng.choice(['19:00', '20:30', '21.00', '']),
+        ))
+    return out
+
+
+def make_concerts(n: int, seed: int) -> List[Concert]:
+    rng = random.Random(seed)
+    return [Concert(id=i + 1, artist=artist(rng) + ('' if i < 50 else f" {i}"),
+                    date=f"{rng.randint(1, 28):02d}.{rng.randint(1, 12):02d}.2026")
+            for i in range(n)]
+
+
+def measure(fn: Callable, corpus: List[str], repeat: int) -> Dict[str, float]:
+    """Время на вызов (лучший и средний из repeat проходов) и память одного прохода."""
+    for text in corpus[:20]:   # прогрев кэшей regex
+        fn(text)
+    passes = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for text in corpus:
+            fn(text)
+        passes.append(time.perf_counter() - t0)
+
+    tracemalloc.start()
+    base = tracemalloc.take_snapshot()
+    for text in corpus:
+        fn(text)
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    stats  = after.compare_to(base, 'filename')
+    blocks = sum(max(s.count_diff, 0) for s in stats)
+
+    n = len(corpus)
+    return {
+        'calls':           n,
+        'best_us':         round(min(passes) / n * 1e6, 2),
+        'mean_us':         round(sum(passes) / len(passes) / n * 1e6, 2),
+        'peak_kb':         round(peak / 1024, 1),
+        'retained_blocks': blocks,
+    }
+
+
+def run(sizes: List[int], messages: int, fuzzy_messages: int, repeat: int, seed: int) -> dict:
+    corpus = make_corpus(messages, seed)
+    result = {
+        'meta': {
+            'date':     datetime.now().isoformat(timespec='seconds'),
+            'python':   platform.python_version(),
+            'platform': platform.platform(),
+            'seed':     seed,
+            'messages': messages,
+            'repeat':   repeat,
+        },
+        'functions': {},
+        'fuzzy_find': {},
+    }
+
+    for name in ('detect_kw', 'parse_trigger', 'extract_date_time',
+                 'strip_date_time', 'parse_free_text'):
+        result['functions'][name] = measure(getattr(bot, name), corpus, repeat)
+        print(f"{name:<18} {result['functions'][name]['best_us']:>10.1f} µs", file=sys.stderr)
+
+    # fuzzy_find получает имя артиста, уже выделенное из сообщения
+    names = []
+    for text in corpus[:fuzzy_messages]:
+        parsed = bot.parse_trigger(text)
+        names.append(parsed['artist'] if parsed else text)
+    for size in sizes:
+        bot.store.load(make_concerts(size, seed))
+        r = measure(bot.fuzzy_find, names, max(1, repeat // 2))
+        result['fuzzy_find'][str(size)] = r
+        print(f"fuzzy_find n={size:<6} {r['best_us']:>10.1f} µs", file=sys.stderr)
+    return result
+
+
+def compare(new: dict, old: dict) -> List[str]:
+    """Строки 'функция: было → стало (±%)' по best_us."""
+    lines = []
+    pairs = [(k, new['functions'].get(k), old['functions'].get(k)) for k in new['functions']]
+    pairs += [(f"fuzzy_find[{k}]", new['fuzzy_find'].get(k), old['fuzzy_find'].get(k))
+              for k in new['fuzzy_find']]
+    for name, n, o in pairs:
+        if not n or not o:
+            continue
+        delta = (n['best_us'] - o['best_us']) / o['best_us'] * 100 if o['best_us'] else 0.0
+        lines.append(f"{name:<20} {o['best_us']:>10.1f} → {n['best_us']:>10.1f} µs  ({delta:+.0f}%)")
+    return lines
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument('-o', '--output', default='', help='куда записать JSON (по умолчанию stdout)')
+    p.add_argument('--sizes', default='10,100,1000,10000', help='размеры хранилища для fuzzy_find')
+    p.add_argument('--messages', type=int, default=1000, help='сообщений в корпусе')
+    p.add_argument('--fuzzy-messages', type=int, default=50, help='сообщений для fuzzy_find')
+    p.add_argument('--repeat', type=int, default=5)
+    p.add_argument('--seed', type=int, default=1)
+    p.add_argument('--compare', default='', help='JSON предыдущего прогона')
+    args = p.parse_args()
+
+    result = run([int(x) for x in args.sizes.split(',') if x],
+                 args.messages, args.fuzzy_messages, args.repeat, args.seed)
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            old = json.load(f)
+        print('\n'.join(compare(result, old)), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
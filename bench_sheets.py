@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Бенчмарк записи в Sheets на фейковой таблице (fake_sheets.py) — MTB Concerts Bot
+Для каждой операции — время и число запросов к API, которые ушли бы в Google:
+  sync_row_new      — новая строка в 'Данные'
+  sync_row_update   — правка существующей строки
+  calendar_first    — первый рисунок месяца (оформление + значения)
+  calendar_redraw   — повторная перерисовка того же месяца
+  rebuild_all       — настоящий /rebuild: cmd_rebuild из bot.py через load_sim
+                      (store.update каждого концерта → все месяцы → строки 'Данные')
+Задержка запроса (--latency) имитирует сеть: время ≈ запросы × задержка.
+
+  python bench_sheets.py --concerts 500 --latency 0.05 -o sheets.json
+"""
+
+import sys
+import json
+import time
+import random
+import asyncio
+import logging
+import argparse
+from datetime import datetime
+from typing import Callable, Dict, List
+
+import bot
+from concert import Concert
+from fake_sheets import fake_manager
+from load_sim import Simulator
+
+
+def make_concerts(n: int, seed: int) -> List[Concert]:
+    rng = random.Random(seed)
+    return [Concert(id=i + 1, artist=f"Артист {i + 1}",
+                    date=f"{rng.randint(1, 28):02d}.{rng.randint(1, 12):02d}.2026",
+                    time=rng.choice(['19:00', '20:00', None]),
+                    tickets_url=rng.choice(['https://mtbarmoscow.com/t', None]),
+                    poster_status=rng.choice(['approved', 'none']))
+            for i in range(n)]
+
+
+def measure(backend, fn: Callable, runs: int) -> Dict[str, float]:
+    backend.reset()
+    t0 = time.perf_counter()
+    for i in range(runs):
+        fn(i)
+    elapsed = time.perf_counter() - t0
+    return {
+        'runs':             runs,
+        'ms_per_run':       round(elapsed / runs * 1000, 3),
+        'requests_per_run': round(backend.total / runs, 2),
+        'by_kind':          dict(backend.calls),
+    }
+
+
+def measure_rebuild(n: int, latency: float, seed: int) -> Dict[str, float]:
+    """
+    /rebuild от начала до конца: Application из bot.py на фейковой таблице
+    с n концертами, команда идёт через обычный диспетчер апдейтов.
+    """
+    loop = asyncio.new_event_loop()
+    sim = Simulator(sheets_latency=latency, tg_latency=0.0, concerts=n, seed=seed)
+    loop.run_until_complete(sim.app.initialize())
+    loop.run_until_complete(sim.app.post_init(sim.app))
+    try:
+        result = measure(sim.sheet.backend, lambda i: loop.run_until_complete(
+            sim.dispatch(sim.updates.text(1, '/rebuild'))), 1)
+        if sim.errors:
+            result['errors'] = dict(sim.errors)
+        return result
+    finally:
+        loop.run_until_complete(sim.app.shutdown())
+        loop.run_until_complete(sim.app.post_shutdown(sim.app))
+        loop.close()
+
+
+def run(n: int, latency: float, seed: int) -> dict:
+    concerts = make_concerts(n, seed)
+    manager, sheet = fake_manager(latency=latency, seed=seed)
+    backend = sheet.backend
+    manager.load_all_concerts()
+    result = {'meta': {'date': datetime.now().isoformat(timespec='seconds'),
+                       'concerts': n, 'latency': latency, 'seed': seed}}
+
+    result['sync_row_new'] = measure(
+        backend, lambda i: manager._sync_data_row(concerts[i]), n)
+    for c in concerts:
+        c.tickets_url = 'https://mtbarmoscow.com/new'
+        c.touch()
+    result['sync_row_update'] = measure(
+        backend, lambda i: manager._sync_data_row(concerts[i]), n)
+
+    months = sorted({(int(c.date[6:]), int(c.date[3:5])) for c in concerts})
+    result['calendar_first'] = measure(
+        backend, lambda i: manager.rebuild_month_calendar(months[i][1], months[i][0], concerts),
+        len(months))
+    result['calendar_redraw'] = measure(
+        backend, lambda i: manager.rebuild_month_calendar(months[i][1], months[i][0], concerts),
+        len(months))
+    result['rebuild_all'] = measure_rebuild(n, latency, seed)
+
+    for k, v in result.items():
+        if k != 'meta':
+            print(f"{k:<16} {v['ms_per_run']:>9.2f} ms  {v['requests_per_run']:>6.1f} req",
+                  file=sys.stderr)
+    return result
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument('-o', '--output', default='', help='куда записать JSON (по умолчанию stdout)')
+    p.add_argument('--concerts', type=int, default=200)
+    p.add_argument('--latency', type=float, default=0.0, help='секунд на запрос')
+    p.add_argument('--seed', type=int, default=1)
+    args = p.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    bot._deleter.snapshot_path = ''   # очередь автоудаления бенчмарка не сохраняем
+    text = json.dumps(run(args.concerts, args.latency, args.seed), ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
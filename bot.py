@@ -11,6 +11,7 @@ import os
 import re
 import logging
 import asyncio
+import secrets
 from datetime import datetime, time as dtime
 from typing import Optional, Dict, List, Tuple
 
@@ -18,9 +19,18 @@ from rapidfuzz import fuzz
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
     Application, CommandHandler, MessageHandler,
-    CallbackQueryHandler, ContextTypes, filters,
+    CallbackQueryHandler, TypeHandler, ContextTypes, filters,
 )
-from google_sheets import GoogleSheetsManager
+from google_sheets import GoogleSheetsManager, AsyncSheetsManager
+from store import ConcertStore
+from concert import Concert
+from ttl_store import TTLStore, PendingStore
+from deleter import DeleteScheduler
+from chats import ChatRegistry
+from textnorm import norm, transliterate
+from dupes import merge_fields
+import metrics
+from profiler import UpdateProfiler
 
 # ─── НАСТРОЙКИ ────────────────────────────────────────────────────────────────
 
@@ -30,8 +40,51 @@ logger = logging.getLogger(__name__)
 TOKEN     = os.getenv('TELEGRAM_TOKEN', '')
 OWNER_ID  = int(os.getenv('OWNER_ID', '534303997'))
 SHEETS_ID = os.getenv('GOOGLE_SHEETS_ID', '')
-
-sheets = GoogleSheetsManager(spreadsheet_id=SHEETS_ID if SHEETS_ID else None)
+# Как часто подтягивать ручные правки из Sheets (сек). 0 — выключено
+REFRESH_SEC = int(os.getenv('SHEETS_REFRESH_SEC', '300'))
+# Через сколько дней после даты отменённые концерты уезжают в лист 'Архив YYYY'
+ARCHIVE_AFTER_DAYS = int(os.getenv('ARCHIVE_AFTER_DAYS', '30'))
+# Сколько минут зал занят одним концертом — для предупреждений о пересечениях
+CONCERT_MINUTES = int(os.getenv('CONCERT_MINUTES', '180'))
+
+# Пул потоков для gspread: размер, лимит очереди и таймаут ответа (сек)
+SHEETS_WORKERS = int(os.getenv('SHEETS_WORKERS', '4'))
+SHEETS_TIMEOUT = float(os.getenv('SHEETS_TIMEOUT', '30'))
+# Попыток загрузить 'Данные' при старте; все неудачны — бот не стартует
+SHEETS_STARTUP_RETRIES = int(os.getenv('SHEETS_STARTUP_RETRIES', '3'))
+
+# Аргументы inline-кнопок (см. cb()): сколько живут и сколько держим в памяти
+CALLBACK_TTL_SEC = int(os.getenv('CALLBACK_TTL_SEC', '86400'))
+CALLBACK_MAX     = int(os.getenv('CALLBACK_MAX', '4096'))
+# Незавершённые действия пользователя (ждём время, «Да/Нет»): срок и лимит на человека
+PENDING_TTL_SEC  = int(os.getenv('PENDING_TTL_SEC', '3600'))
+PENDING_PER_USER = int(os.getenv('PENDING_PER_USER', '16'))
+# Очередь автоудаления ответов: файл-снимок (пусто — не сохранять), шаг проверки
+# и как часто, не чаще, переписывать снимок (сек); при остановке он пишется всегда
+DELETE_SNAPSHOT  = os.getenv('DELETE_SNAPSHOT', 'delete_queue.json')
+DELETE_TICK_SEC  = float(os.getenv('DELETE_TICK_SEC', '1'))
+DELETE_SAVE_SEC  = float(os.getenv('DELETE_SAVE_SEC', '30'))
+# Как часто новые чаты дописываются в лист 'Чаты' одной пачкой (сек)
+CHATS_FLUSH_SEC  = float(os.getenv('CHATS_FLUSH_SEC', '30'))
+
+# Режим получения апдейтов: 'polling' (по умолчанию) или 'webhook'.
+# WEBHOOK_URL — внешний адрес; пустой — webhook не регистрируется (локальная отладка)
+BOT_MODE       = os.getenv('BOT_MODE', 'polling')
+WEBHOOK_URL    = os.getenv('WEBHOOK_URL', '')
+WEBHOOK_LISTEN = os.getenv('WEBHOOK_LISTEN', '0.0.0.0')
+WEBHOOK_PORT   = int(os.getenv('PORT', os.getenv('WEBHOOK_PORT', '8443')))
+WEBHOOK_PATH   = os.getenv('WEBHOOK_PATH', '/telegram')
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET', '')
+# Отдельный сервер для GET /metrics (Prometheus) в любом режиме; порт 0 — выключено.
+# Метрики без авторизации: по умолчанию слушает только localhost
+METRICS_PORT   = int(os.getenv('METRICS_PORT', '0'))
+METRICS_LISTEN = os.getenv('METRICS_LISTEN', '127.0.0.1')
+
+# Без сети: gspread и авторизация — в post_init через sheets.connect()
+sheets = AsyncSheetsManager(
+    GoogleSheetsManager(spreadsheet_id=SHEETS_ID if SHEETS_ID else None),
+    max_workers=SHEETS_WORKERS, timeout=SHEETS_TIMEOUT,
+)
 
 KW = {
     'tickets': ['билеты', 'билет', 'ticket', 'tickets'],
@@ -44,95 +97,86 @@ POSTER_OK = ['одобрена', 'ок', 'ok', 'утверждена', 'гото
 
 # ─── IN-MEMORY ХРАНИЛИЩЕ ──────────────────────────────────────────────────────
 # Загружается из Google Sheets при старте. Sheets = источник правды.
+# Правки — только через db_create/db_update: они берут блокировку концерта.
+
+store = ConcertStore(CONCERT_MINUTES)   # все концерты
+_chats = ChatRegistry()           # зарегистрированные chat_id
+_cb_payloads = TTLStore(CALLBACK_MAX, CALLBACK_TTL_SEC)   # токен кнопки → аргументы
+# Вместо ctx.user_data: 'aw' → (поле, cid), 'v_{cid}' → значение до «Да»,
+# 'aw_time_{cid}' → дата, к которой ждём время. Брошенное истекает само.
+_pending = PendingStore(PENDING_PER_USER, PENDING_TTL_SEC)
+_deleter = DeleteScheduler(DELETE_SNAPSHOT, DELETE_SAVE_SEC)  # сообщения на автоудаление
+_profiler = UpdateProfiler()                                # /profile on|off
+
+def db_get(cid: int) -> Optional[Concert]:
+    return store.get(cid)
+
+def db_all(include_cancelled=False) -> List[Concert]:
+    return store.all(include_cancelled)
+
+async def db_create(data: dict) -> Concert:
+    """Создаёт концерт в памяти и пишет его в Sheets."""
+    c = store.create(data)
+    async with store.lock(c.id):
+        await sync(c)
+    return c
+
+async def db_update(cid: int, **fields) -> Optional[Concert]:
+    """Атомарно меняет поля концерта и синхронизирует его с Sheets."""
+    async with store.lock(cid):
+        c = store.update(cid, fields)
+        if c:
+            await sync(c)
+        return c
 
-_concerts: List[dict] = []   # все концерты
-_chats:    List[int]  = []   # зарегистрированные chat_id
-
-def _concerts_sorted(include_cancelled=False) -> List[dict]:
-    items = _concerts if include_cancelled else [c for c in _concerts if c.get('status') != 'cancelled']
-    return sorted(items, key=lambda c: (c.get('date') or '9999', -c.get('id', 0)))
-
-def db_get(cid: int) -> Optional[dict]:
-    for c in _concerts:
-        if c.get('id') == cid:
-            return c
-    return None
-
-def db_all(include_cancelled=False) -> List[dict]:
-    return _concerts_sorted(include_cancelled)
-
-def db_save(data: dict) -> int:
-    """Создаёт или обновляет концерт в памяти. Запись в Sheets — отдельно через sheets.sync_concert."""
-    if data.get('id'):
-        existing = db_get(data['id'])
-        if existing:
-            existing.update({k: v for k, v in data.items() if k != '_row'})
-            return data['id']
-    # Новый концерт
-    new_id = sheets.next_id(_concerts) if sheets.is_connected() else (max((c['id'] for c in _concerts), default=0) + 1)
-    new_c  = {
-        'id':               new_id,
-        'artist':           data.get('artist', ''),
-        'date':             data.get('date'),
-        'time':             data.get('time'),
-        'poster_status':    data.get('poster_status', 'none'),
-        'poster_file_id':   data.get('poster_file_id'),
-        'tickets_url':      data.get('tickets_url'),
-        'description_text': data.get('description_text'),
-        'status':           data.get('status', 'draft'),
-        'created_at':       datetime.now().isoformat(),
-        'updated_at':       datetime.now().isoformat(),
-        '_row':             None,
-    }
-    _concerts.append(new_c)
-    return new_id
+async def db_delete(cid: int):
+    async with store.lock(cid):
+        c = store.remove(cid)
+        if c:
+            await sheets.delete_concert(c, store.raw())
 
-def db_delete(cid: int):
-    global _concerts
-    c = db_get(cid)
-    if c:
-        sheets.delete_concert(c, _concerts)
-        _concerts = [x for x in _concerts if x.get('id') != cid]
+async def db_merge(keep_id: int, drop_id: int) -> Optional[Concert]:
+    """Сливает дубль drop в keep: пустые поля keep заполняются, drop уходит в архив."""
+    # Одна и та же запись дважды — asyncio.Lock не реентерабельна, зависли бы
+    if keep_id == drop_id:
+        return None
+    # Блокировки — по возрастанию id, чтобы встречные слияния не ждали друг друга вечно
+    first, second = sorted((keep_id, drop_id))
+    async with store.lock(first), store.lock(second):
+        keep, drop = store.get(keep_id), store.get(drop_id)
+        if not keep or not drop:
+            return None
+        c = store.update(keep_id, merge_fields(keep, drop))
+        store.remove(drop_id)
+        await sync(c)
+        await sheets.delete_concert(drop, store.raw())
+        return c
+
+async def sync(c: Concert):
+    """Пишет концерт в Sheets и перерисовывает все затронутые месяцы (по одному разу)."""
+    await sheets.sync_concert(c, store.raw(), months=store.take_dirty_months())
 
 def register_chat(chat_id: int):
-    if chat_id not in _chats:
-        _chats.append(chat_id)
-        sheets.save_chat(chat_id, _chats)
+    # Без обращения к Sheets: новый чат запишет flush_chats
+    _chats.add(chat_id)
 
 def get_chats() -> List[int]:
     return list(_chats)
 
+def pend_set(upd: Update, key: str, value):
+    _pending.put(upd.effective_user.id, key, value)
+
+def pend_get(upd: Update, key: str, default=None):
+    return _pending.get(upd.effective_user.id, key, default)
+
+def pend_pop(upd: Update, key: str, default=None):
+    return _pending.pop(upd.effective_user.id, key, default)
+
 # ─── ВСПОМОГАТЕЛЬНЫЕ ФУНКЦИИ ──────────────────────────────────────────────────
 
-# Латиница → кириллица для часто путаемых символов
-_CYR_LAT = str.maketrans('aceopxyABCEHKMOPTX', 'асеорхуАВСЕНКМОРТХ')
-
-def norm(text: str) -> str:
-    """Нормализация с заменой латиницы на кириллицу."""
-    text = text.lower()
-    text = text.translate(_CYR_LAT)
-    text = text.replace('ё', 'е')
-    text = text.replace('`', '').replace("'", '').replace('\u2019', '').replace('\u02bc', '')  # апострофы
-    text = re.sub(r'[^\w\s]', ' ', text)
-    return re.sub(r'\s+', ' ', text).strip()
-
-def transliterate(text: str) -> str:
-    """ИВАН ДОРН → ivan-dorn"""
-    table = {
-        'а':'a','б':'b','в':'v','г':'g','д':'d','е':'e','ё':'e',
-        'ж':'zh','з':'z','и':'i','й':'y','к':'k','л':'l','м':'m',
-        'н':'n','о':'o','п':'p','р':'r','с':'s','т':'t','у':'u',
-        'ф':'f','х':'kh','ц':'ts','ч':'ch','ш':'sh','щ':'sch',
-        'ъ':'','ы':'y','ь':'','э':'e','ю':'yu','я':'ya',
-    }
-    result = ''
-    for ch in text.lower():
-        if ch in table:
-            result += table[ch]
-        elif ch.isascii() and (ch.isalnum() or ch == ' '):
-            result += ch
-    result = re.sub(r'\s+', '-', result.strip())
-    return re.sub(r'-+', '-', result)
+def clean_artist(artist: str) -> str:
+    """Имя без хвостового " —" и лишних пробелов (см. /rebuild)."""
+    return artist.rstrip(' —').strip()
 
 def make_slug(artist: str, date_str: str = '') -> str:
     """Иван Дорн + 15.04.2026 → ivan-dorn-15-04-2026"""
@@ -203,26 +247,22 @@ def strip_date_time(text: str) -> str:
         cleaned = re.sub(r'(?i)\b' + mo + r'\b', '', cleaned)
     return re.sub(r'\s+', ' ', cleaned).strip()
 
-def fuzzy_find(name: str, soft=False) -> List[dict]:
+def fuzzy_scored(name: str, threshold: float) -> List[Tuple[Concert, float]]:
     """
-    soft=True — возвращает также совпадения 60-69 (для "ты имел в виду?")
+    [(концерт, очки)] от лучшего к худшему, отменённые — мимо.
+    Имя сравнивается и в кириллице, и в латинице (store.artists).
     """
-    all_c  = db_all()
-    name_n = norm(name)
-    results = []
-    for c in all_c:
-        c_n   = norm(c['artist'])
-        score = max(
-            fuzz.token_set_ratio(name_n, c_n),
-            fuzz.partial_ratio(name_n, c_n),
-            fuzz.WRatio(name_n, c_n),
-        )
-        threshold = 60 if soft else 65
-        if score >= threshold:
-            results.append((c, score))
+    results = [(store.get(cid), score) for cid, score in store.artists.match(name, threshold)]
+    results = [(c, score) for c, score in results if c.status != 'cancelled']
+    # При равных очках — порядок db_all()
+    results.sort(key=lambda x: (-x[1], x[0].date or '9999', -x[0].id))
+    return results
+
+def fuzzy_find(name: str, soft=False) -> List[Concert]:
+    """soft=True — возвращает также совпадения 60-64 (для "ты имел в виду?")"""
+    results = fuzzy_scored(name, 60 if soft else 65)
     if not results:
         return []
-    results.sort(key=lambda x: x[1], reverse=True)
     top = results[0][1]
     # Одно явное совпадение
     if top >= 90 or (len(results) >= 2 and top - results[1][1] >= 20):
@@ -231,45 +271,32 @@ def fuzzy_find(name: str, soft=False) -> List[dict]:
 
 # ─── КАРТОЧКА ─────────────────────────────────────────────────────────────────
 
-def is_ready(c: dict) -> bool:
-    return all([c.get('date'), c.get('poster_status') == 'approved',
-                c.get('tickets_url'), c.get('description_text')])
-
-def missing(c: dict) -> List[str]:
-    m = []
-    if not c.get('date'):                       m.append('дата')
-    if c.get('poster_status') != 'approved':    m.append('афиша')
-    if not c.get('tickets_url'):                m.append('билеты')
-    if not c.get('description_text'):           m.append('текст')
-    return m
-
-def s_icon(c: dict) -> str:
-    s = c.get('status', 'draft')
-    if s == 'cancelled': return '🚫'
-    if s == 'published': return '⚫'
-    if is_ready(c):      return '🟢'
-    filled = sum([bool(c.get('date')), c.get('poster_status') == 'approved',
-                  bool(c.get('tickets_url')), bool(c.get('description_text'))])
-    return '🟡' if filled >= 2 else '🔴'
-
-def card(c: dict) -> str:
-    icon  = s_icon(c)
-    dt    = f"{c['date']} {c.get('time') or ''}".strip() if c.get('date') else '—'
-    title = f"#{c['id']} {c['artist']}" + (f" • {dt}" if c.get('date') else '')
-    m     = missing(c)
+def card(c: Concert) -> str:
+    icon  = c.icon()
+    dt    = f"{c.date} {c.time or ''}".strip() if c.date else '—'
+    title = f"#{c.id} {c.artist}" + (f" • {dt}" if c.date else '')
+    m     = c.missing()
     text  = (
         f"{icon} *{title}*\n\n"
-        f"{'✅' if c.get('poster_status') == 'approved' else '❌'} Афиша\n"
-        f"{'✅' if c.get('tickets_url') else '❌'} Билеты\n"
-        f"{'✅' if c.get('description_text') else '❌'} Текст\n"
-        f"{'✅' if c.get('date') else '❌'} Дата\n"
+        f"{'✅' if c.poster_status == 'approved' else '❌'} Афиша\n"
+        f"{'✅' if c.tickets_url else '❌'} Билеты\n"
+        f"{'✅' if c.description_text else '❌'} Текст\n"
+        f"{'✅' if c.date else '❌'} Дата\n"
     )
     if m:
         text += f"\n❗ Не хватает: {', '.join(m)}"
     else:
-        text += f"\n🟢 Готово → `/code {c['id']}`"
+        text += f"\n🟢 Готово → `/code {c.id}`"
     return text
 
+def conflict_note(c: Optional[Concert]) -> str:
+    """Предупреждение, если в это время в зале уже стоит другой концерт."""
+    clash = store.conflicts(c) if c else []
+    if not clash:
+        return ''
+    items = ', '.join(f"#{o.id} {o.artist}" + (f" {o.time}" if o.time else '') for o in clash[:3])
+    return f"\n\n⚠️ В этот вечер уже: {items}"
+
 # Флаг уведомлений (вкл/выкл через /notify_on и /notify_off)
 _notify_enabled: bool = True
 
@@ -289,39 +316,38 @@ def edit_kb(cid: int) -> InlineKeyboardMarkup:
          InlineKeyboardButton("⚫ Опубликовать",    callback_data=f"do|publish|{cid}")],
     ])
 
-async def notify_ready(ctx: ContextTypes.DEFAULT_TYPE, c: dict):
-    if is_ready(c) and c.get('status') == 'draft':
+async def notify_ready(ctx: ContextTypes.DEFAULT_TYPE, c: Concert):
+    if c.is_ready() and c.status == 'draft':
         try:
             await ctx.bot.send_message(
                 OWNER_ID,
-                f"🎤 *{c['artist']}* — готов к публикации!\n`/code {c['id']}`",
+                f"🎤 *{c.artist}* — готов к публикации!\n`/code {c.id}`",
                 parse_mode='Markdown'
             )
         except Exception as e:
             logger.error(f"notify: {e}")
 
-async def auto_delete(msg, delay: int = 3):
-    """Удаляет сообщение через delay секунд."""
-    await asyncio.sleep(delay)
-    try:
-        await msg.delete()
-    except Exception:
-        pass
+def auto_delete(msg, delay: int = 3):
+    """Ставит сообщение в очередь на удаление через delay секунд."""
+    _deleter.schedule(msg.chat_id, msg.message_id, delay)
 
 async def reply_and_delete(msg, text, delay=5, **kwargs):
     """Отправить сообщение и удалить через delay секунд."""
     sent = await msg.reply_text(text, **kwargs)
-    asyncio.get_event_loop().create_task(auto_delete(sent, delay))
+    auto_delete(sent, delay)
     return sent
 
 async def edit_and_delete(q, text, delay=5, **kwargs):
     """Отредактировать сообщение и удалить через delay секунд."""
     try:
         await q.edit_message_text(text, **kwargs)
-        asyncio.get_event_loop().create_task(auto_delete(q.message, delay))
+        auto_delete(q.message, delay)
     except Exception:
         pass
 
+async def run_deletes(ctx: ContextTypes.DEFAULT_TYPE):
+    await _deleter.run_due(ctx.bot)
+
 # ─── ПАРСИНГ ТРИГГЕРА ─────────────────────────────────────────────────────────
 
 def detect_kw(text: str) -> Optional[Tuple[str, str]]:
@@ -448,10 +474,10 @@ def parse_free_text(text: str) -> Optional[dict]:
 # ─── ПРИМЕНИТЬ ДЕЙСТВИЕ ───────────────────────────────────────────────────────
 
 async def apply_action(upd: Update, ctx: ContextTypes.DEFAULT_TYPE,
-                        c: dict, action: str, payload: str):
+                        c: Concert, action: str, payload: str):
     msg  = upd.effective_message
-    cid  = c['id']
-    name = c['artist']
+    cid  = c.id
+    name = c.artist
 
     if action == 'cancel':
         kb = [[InlineKeyboardButton("✅ Да",  callback_data=f"do|cancel|{cid}"),
@@ -465,8 +491,8 @@ async def apply_action(upd: Update, ctx: ContextTypes.DEFAULT_TYPE,
             await reply_and_delete(msg, f"Нет ссылки.\nПример: `{name} билеты https://...`",
                                  parse_mode='Markdown')
             return
-        ctx.user_data[f'v_{cid}'] = url
-        label = "Перезаписать билеты" if c.get('tickets_url') else "Добавить билеты"
+        pend_set(upd, f'v_{cid}', url)
+        label = "Перезаписать билеты" if c.tickets_url else "Добавить билеты"
         kb = [[InlineKeyboardButton("✅ Да",  callback_data=f"do|tickets|{cid}"),
                InlineKeyboardButton("❌ Нет", callback_data="noop")]]
         await reply_and_delete(msg, f"{label} для *{name}*?",
@@ -486,7 +512,7 @@ async def apply_action(upd: Update, ctx: ContextTypes.DEFAULT_TYPE,
             await reply_and_delete(msg, f"Текст слишком короткий.\nПример: `{name} текст Описание...`",
                                  parse_mode='Markdown')
             return
-        ctx.user_data[f'v_{cid}'] = payload
+        pend_set(upd, f'v_{cid}', payload)
         preview = payload[:100] + ('...' if len(payload) > 100 else '')
         kb = [[InlineKeyboardButton("✅ Да",  callback_data=f"do|text|{cid}"),
                InlineKeyboardButton("❌ Нет", callback_data="noop")]]
@@ -499,18 +525,17 @@ async def apply_action(upd: Update, ctx: ContextTypes.DEFAULT_TYPE,
             await reply_and_delete(msg, f"Не распознал дату.\nПример: `{name} дата 15.04.2026 21:00`",
                                  parse_mode='Markdown')
             return
-        ctx.user_data[f'v_{cid}'] = (d, t)
+        pend_set(upd, f'v_{cid}', (d, t))
         dt = f"{d} {t or ''}".strip()
         if not t:
             # Спрашиваем время отдельно
-            ctx.user_data[f'aw_time_{cid}'] = d
+            pend_set(upd, f'aw_time_{cid}', d)
             kb = [[InlineKeyboardButton("Пропустить", callback_data=f"do|date|{cid}")]]
             await reply_and_delete(msg, 
                 f"Дата *{name}*: `{d}`\nВведи время (например `21:00`) или пропусти:",
                 reply_markup=InlineKeyboardMarkup(kb), parse_mode='Markdown'
             )
-            ctx.user_data['aw']    = 'time_for_date'
-            ctx.user_data['aw_id'] = cid
+            pend_set(upd, 'aw', ('time_for_date', cid))
             return
         kb = [[InlineKeyboardButton("✅ Да",  callback_data=f"do|date|{cid}"),
                InlineKeyboardButton("❌ Нет", callback_data="noop")]]
@@ -528,7 +553,7 @@ async def process_trigger(upd: Update, ctx: ContextTypes.DEFAULT_TYPE, parsed: d
     matches = fuzzy_find(name)
 
     if not matches:
-        kb = [[InlineKeyboardButton("✅ Создать", callback_data=f"cnew|{name}|{action}|{payload[:80]}"),
+        kb = [[InlineKeyboardButton("✅ Создать", callback_data=cb('cnew', name, action, payload)),
                InlineKeyboardButton("❌ Отмена",  callback_data="noop")]]
         await reply_and_delete(msg, f"*{name}* не найден.\nСоздать новое мероприятие?",
                              reply_markup=InlineKeyboardMarkup(kb), parse_mode='Markdown')
@@ -536,8 +561,8 @@ async def process_trigger(upd: Update, ctx: ContextTypes.DEFAULT_TYPE, parsed: d
 
     if len(matches) > 1:
         kb = [[InlineKeyboardButton(
-            f"#{c['id']} {c['artist']}" + (f" • {c['date']}" if c.get('date') else ''),
-            callback_data=f"tsel|{c['id']}|{action}|{payload[:80]}"
+            f"#{c.id} {c.artist}" + (f" • {c.date}" if c.date else ''),
+            callback_data=cb('tsel', c.id, action, payload)
         )] for c in matches]
         kb.append([InlineKeyboardButton("❌ Отмена", callback_data="noop")])
         await reply_and_delete(msg, "Найдено несколько — уточни:",
@@ -547,209 +572,279 @@ async def process_trigger(upd: Update, ctx: ContextTypes.DEFAULT_TYPE, parsed: d
     await apply_action(upd, ctx, matches[0], action, payload)
 
 # ─── CALLBACKS ────────────────────────────────────────────────────────────────
+# callback_data ограничен 64 байтами. Короткие кнопки ('do|cancel|5') несут
+# аргументы как есть; кнопки с пользовательским текстом (имя артиста, URL,
+# текст) несут только токен — сами аргументы лежат в _cb_payloads.
+
+def cb(prefix: str, *args) -> str:
+    """callback_data с произвольными аргументами: prefix|token."""
+    token = secrets.token_urlsafe(6)
+    _cb_payloads.put(token, args)
+    return f"{prefix}|{token}"
+
 
 async def on_callback(upd: Update, ctx: ContextTypes.DEFAULT_TYPE):
     q    = upd.callback_query
     await q.answer()
     data = q.data
 
-    if data == 'noop':
-        await edit_and_delete(q, "Отменено")
+    if data.startswith('edit_menu_'):
+        # Кнопки из старых сообщений
+        data = 'edit_menu|' + data[len('edit_menu_'):]
+    prefix, _, rest = data.partition('|')
+    handler = CALLBACKS.get(prefix)
+    if handler is None:
+        logger.warning(f"unknown callback: {data}")
         return
 
-    if data.startswith('cnew|'):
-        _, name, action, payload = data.split('|', 3)
-        cid = db_save({'artist': name})
-        c   = db_get(cid)
-        sheets.sync_concert(c, _concerts)
-        await edit_and_delete(q, f"✅ Создано: *#{cid} {name}*", parse_mode='Markdown')
-        await apply_action(upd, ctx, c, action, payload)
+    if prefix in TOKEN_CALLBACKS:
+        args = _cb_payloads.get(rest)
+        if args is None:
+            await edit_and_delete(q, "Кнопка устарела — повтори запрос")
+            return
+    else:
+        args = rest.split('|') if rest else ()
+    await handler(upd, ctx, q, *args)
+
+
+async def cb_noop(upd: Update, ctx: ContextTypes.DEFAULT_TYPE, q):
+    await edit_and_delete(q, "Отменено")
+
+
+async def cb_create_then(upd: Update, ctx: ContextTypes.DEFAULT_TYPE, q,
+                         name: str, action: str, payload: str):
+    c = await db_create({'artist': name})
+    await edit_and_delete(q, f"✅ Создано: *#{c.id} {name}*", parse_mode='Markdown')
+    await apply_action(upd, ctx, c, action, payload)
+
+
+async def cb_select_then(upd: Update, ctx: ContextTypes.DEFAULT_TYPE, q,
+                         cid: int, action: str, payload: str):
+    c = db_get(cid)
+    if not c:
+        await edit_and_delete(q, "Не найдено")
         return
+    await edit_and_delete(q, f"#{c.id} {c.artist}")
+    await apply_action(upd, ctx, c, action, payload)
+
 
-    if data.startswith('tsel|'):
-        _, cid_s, action, payload = data.split('|', 3)
-        c = db_get(int(cid_s))
-        await edit_and_delete(q, f"#{c['id']} {c['artist']}")
-        await apply_action(upd, ctx, c, action, payload)
+async def cb_do(upd: Update, ctx: ContextTypes.DEFAULT_TYPE, q, action: str, cid_s: str):
+    cid = int(cid_s)
+    c   = db_get(cid)
+    if not c:
+        await edit_and_delete(q, "Не найдено")
         return
 
-    if data.startswith('do|'):
-        _, action, cid_s = data.split('|')
-        cid = int(cid_s)
-        c   = db_get(cid)
+    if action == 'tickets':
+        url = pend_pop(upd, f'v_{cid}')
+        if url:
+            c = await db_update(cid, tickets_url=url)
+            if not c:
+                await edit_and_delete(q, "Не найдено")
+                return
+            await notify_ready(ctx, c)
+            await edit_and_delete(q, f"✅ Билеты добавлены — *{c.artist}*", parse_mode='Markdown')
+
+    elif action == 'poster':
+        c = await db_update(cid, poster_status='approved')
         if not c:
             await edit_and_delete(q, "Не найдено")
             return
+        await notify_ready(ctx, c)
+        await edit_and_delete(q, f"✅ Афиша одобрена — *{c.artist}*", parse_mode='Markdown')
 
-        if action == 'tickets':
-            url = ctx.user_data.pop(f'v_{cid}', None)
-            if url:
-                c['tickets_url'] = url
-                db_save(c); sheets.sync_concert(c, _concerts)
-                await notify_ready(ctx, c)
-                await edit_and_delete(q, f"✅ Билеты добавлены — *{c['artist']}*", parse_mode='Markdown')
+    elif action == 'text':
+        txt = pend_pop(upd, f'v_{cid}')
+        if txt:
+            c = await db_update(cid, description_text=txt)
+            if not c:
+                await edit_and_delete(q, "Не найдено")
+                return
+            await notify_ready(ctx, c)
+            await edit_and_delete(q, f"✅ Текст добавлен — *{c.artist}*", parse_mode='Markdown')
 
-        elif action == 'poster':
-            c['poster_status'] = 'approved'
-            db_save(c); sheets.sync_concert(c, _concerts)
+    elif action == 'date':
+        val = pend_pop(upd, f'v_{cid}')
+        if val:
+            d, t = val
+            c = await db_update(cid, date=d, **({'time': t} if t else {}))
+            if not c:
+                await edit_and_delete(q, "Не найдено")
+                return
             await notify_ready(ctx, c)
-            await edit_and_delete(q, f"✅ Афиша одобрена — *{c['artist']}*", parse_mode='Markdown')
+            await edit_and_delete(q, f"✅ Дата установлена — *{c.artist}*" + conflict_note(c),
+                                  parse_mode='Markdown')
 
-        elif action == 'text':
-            txt = ctx.user_data.pop(f'v_{cid}', None)
-            if txt:
-                c['description_text'] = txt
-                db_save(c); sheets.sync_concert(c, _concerts)
-                await notify_ready(ctx, c)
-                await edit_and_delete(q, f"✅ Текст добавлен — *{c['artist']}*", parse_mode='Markdown')
-
-        elif action == 'date':
-            val = ctx.user_data.pop(f'v_{cid}', None)
-            if val:
-                d, t = val
-                c['date'] = d
-                if t: c['time'] = t
-                db_save(c); sheets.sync_concert(c, _concerts)
-                await notify_ready(ctx, c)
-                await edit_and_delete(q, f"✅ Дата установлена — *{c['artist']}*", parse_mode='Markdown')
-
-        elif action == 'cancel':
-            c['status'] = 'cancelled'
-            db_save(c); sheets.sync_concert(c, _concerts)
-            kb = [[InlineKeyboardButton("♻️ Восстановить", callback_data=f"do|restore|{cid}")]]
-            await edit_and_delete(q, f"🚫 *{c['artist']}* — отменён", parse_mode='Markdown',
-                                      reply_markup=InlineKeyboardMarkup(kb))
-
-        elif action == 'restore':
-            c['status'] = 'draft'
-            db_save(c); sheets.sync_concert(c, _concerts)
-            await edit_and_delete(q, card(c), reply_markup=edit_kb(cid), parse_mode='Markdown')
-
-        elif action == 'publish':
-            c['status'] = 'published'
-            db_save(c); sheets.sync_concert(c, _concerts)
-            slug = make_slug(c.get('artist', ''))
-            page_url = f"https://mtbarmoscow.com/{slug}"
-            await edit_and_delete(q, 
-                f"⚫ *{c['artist']}* — опубликован\n\n🔗 Ссылка для рекламы:\n{page_url}",
-                parse_mode='Markdown'
-            )
+    elif action == 'cancel':
+        c = await db_update(cid, status='cancelled')
+        if not c:
+            await edit_and_delete(q, "Не найдено")
+            return
+        kb = [[InlineKeyboardButton("♻️ Восстановить", callback_data=f"do|restore|{cid}")]]
+        await edit_and_delete(q, f"🚫 *{c.artist}* — отменён", parse_mode='Markdown',
+                                  reply_markup=InlineKeyboardMarkup(kb))
 
-        elif action == 'delete':
-            name = c['artist']
-            c['status'] = 'cancelled'
-            db_save(c); sheets.sync_concert(c, _concerts)
-            await edit_and_delete(q, f"🗑 *{name}* — перемещён в архив", parse_mode='Markdown')
-        return
+    elif action == 'restore':
+        c = await db_update(cid, status='draft')
+        if not c:
+            await edit_and_delete(q, "Не найдено")
+            return
+        await edit_and_delete(q, card(c), reply_markup=edit_kb(cid), parse_mode='Markdown')
 
-    if data.startswith('clr|'):
-        _, field, cid_s = data.split('|')
-        cid = int(cid_s)
-        c   = db_get(cid)
+    elif action == 'publish':
+        c = await db_update(cid, status='published')
         if not c:
             await edit_and_delete(q, "Не найдено")
             return
-        field_labels = {'date': 'Дата', 'poster': 'Афиша', 'tickets': 'Билеты', 'text': 'Текст'}
-        if field == 'date':
-            c['date'] = None; c['time'] = None
-        elif field == 'poster':
-            c['poster_status'] = 'none'; c['poster_file_id'] = None
-        elif field == 'tickets':
-            c['tickets_url'] = None
-        elif field == 'text':
-            c['description_text'] = None
-        db_save(c); sheets.sync_concert(c, _concerts)
+        slug = make_slug(c.artist)
+        page_url = f"https://mtbarmoscow.com/{slug}"
         await edit_and_delete(q, 
-            f"🗑 *{field_labels.get(field, field)}* сброшена — {c['artist']}\n\n" + card(c),
-            reply_markup=edit_kb(cid), parse_mode='Markdown'
+            f"⚫ *{c.artist}* — опубликован\n\n🔗 Ссылка для рекламы:\n{page_url}",
+            parse_mode='Markdown'
         )
+
+    elif action == 'delete':
+        name = c.artist
+        c = await db_update(cid, status='cancelled')
+        if not c:
+            await edit_and_delete(q, "Не найдено")
+            return
+        await edit_and_delete(q, f"🗑 *{name}* — перемещён в архив", parse_mode='Markdown')
+
+
+async def cb_clear(upd: Update, ctx: ContextTypes.DEFAULT_TYPE, q, field: str, cid_s: str):
+    cid = int(cid_s)
+    c   = db_get(cid)
+    if not c:
+        await edit_and_delete(q, "Не найдено")
         return
+    field_labels = {'date': 'Дата', 'poster': 'Афиша', 'tickets': 'Билеты', 'text': 'Текст'}
+    cleared = {
+        'date':    {'date': None, 'time': None},
+        'poster':  {'poster_status': 'none', 'poster_file_id': None},
+        'tickets': {'tickets_url': None},
+        'text':    {'description_text': None},
+    }
+    c = await db_update(cid, **cleared.get(field, {}))
+    if not c:
+        await edit_and_delete(q, "Не найдено")
+        return
+    await edit_and_delete(q, 
+        f"🗑 *{field_labels.get(field, field)}* сброшена — {c.artist}\n\n" + card(c),
+        reply_markup=edit_kb(cid), parse_mode='Markdown'
+    )
 
-    if data.startswith('edit_menu_'):
-        cid = int(data.replace('edit_menu_', ''))
-        c   = db_get(cid)
-        if c:
-            await edit_and_delete(q, card(c), reply_markup=edit_kb(cid), parse_mode='Markdown')
-        else:
-            await edit_and_delete(q, "Мероприятие не найдено")
+
+async def cb_edit_menu(upd: Update, ctx: ContextTypes.DEFAULT_TYPE, q, cid_s: str):
+    c = db_get(int(cid_s))
+    if c:
+        await edit_and_delete(q, card(c), reply_markup=edit_kb(c.id), parse_mode='Markdown')
+    else:
+        await edit_and_delete(q, "Мероприятие не найдено")
+
+
+async def cb_edit_field(upd: Update, ctx: ContextTypes.DEFAULT_TYPE, q, field: str, cid_s: str):
+    cid = int(cid_s)
+    c   = db_get(cid)
+    if not c:
+        await edit_and_delete(q, "Не найдено")
+        return
+    pend_set(upd, 'aw', (field, cid))
+    prompts = {
+        'date':    f"📅 Дата для *{c.artist}*:\nПример: `15.04.2026 21:00`",
+        'tickets': f"🎟 Ссылка для *{c.artist}*:",
+        'text':    f"📝 Описание для *{c.artist}*:",
+        'artist':  f"✏️ Новое имя (сейчас: {c.artist}):",
+    }
+    await edit_and_delete(q, prompts.get(field, 'Введи:'), parse_mode='Markdown')
+
+
+async def cb_force_create(upd: Update, ctx: ContextTypes.DEFAULT_TYPE, q,
+                          artist: str, d: Optional[str], t: Optional[str]):
+    """«Создать новое» после предупреждения о дубле."""
+    c = await db_create({'artist': artist, 'date': d, 'time': t})
+    await edit_and_delete(q, card(c) + conflict_note(c), reply_markup=edit_kb(c.id),
+                          parse_mode='Markdown')
+
+
+async def cb_new_confirm(upd: Update, ctx: ContextTypes.DEFAULT_TYPE, q,
+                         artist: str, d: Optional[str], t: Optional[str]):
+    # Другая дата того же артиста — это новый концерт; та же дата — скорее дубль
+    same_day = [c for c in store.duplicates(artist, d) if c.date == d]
+    if same_day:
+        text, kb = dup_warning(artist, d, t, same_day)
+        await edit_and_delete(q, text, reply_markup=kb, parse_mode='Markdown')
         return
+    await cb_force_create(upd, ctx, q, artist, d, t)
+
 
-    if data.startswith('ed|'):
-        _, field, cid_s = data.split('|')
-        cid = int(cid_s)
-        c   = db_get(cid)
-        ctx.user_data['aw']    = field
-        ctx.user_data['aw_id'] = cid
-        prompts = {
-            'date':    f"📅 Дата для *{c['artist']}*:\nПример: `15.04.2026 21:00`",
-            'tickets': f"🎟 Ссылка для *{c['artist']}*:",
-            'text':    f"📝 Описание для *{c['artist']}*:",
-            'artist':  f"✏️ Новое имя (сейчас: {c['artist']}):",
-        }
-        await edit_and_delete(q, prompts.get(field, 'Введи:'), parse_mode='Markdown')
+async def cb_merge(upd: Update, ctx: ContextTypes.DEFAULT_TYPE, q, keep_s: str, drop_s: str):
+    c = await db_merge(int(keep_s), int(drop_s))
+    if not c:
+        await edit_and_delete(q, "Не найдено — возможно, уже объединено")
         return
+    await edit_and_delete(q, f"🔀 #{drop_s} влит в #{c.id}\n\n" + card(c),
+                          reply_markup=edit_kb(c.id), parse_mode='Markdown')
 
-    if data.startswith('fc|'):
-        _, name, d, t = data.split('|')
-        cid = db_save({'artist': name, 'date': d or None, 'time': t or None})
-        c   = db_get(cid)
-        sheets.sync_concert(c, _concerts)
-        await edit_and_delete(q, card(c), reply_markup=edit_kb(cid), parse_mode='Markdown')
 
-    if data.startswith('new_confirm|'):
-        parts  = data.split('|')
-        artist = parts[1]
-        d      = parts[2] or None
-        t      = parts[3] or None
-        cid    = db_save({'artist': artist, 'date': d, 'time': t})
-        c      = db_get(cid)
-        sheets.sync_concert(c, _concerts)
-        await edit_and_delete(q, card(c), reply_markup=edit_kb(cid), parse_mode='Markdown')
+async def cb_update_date(upd: Update, ctx: ContextTypes.DEFAULT_TYPE, q,
+                         cid: int, d: Optional[str], t: Optional[str]):
+    """Обновить дату существующего артиста из свободного ввода."""
+    c = await db_update(cid, date=d, **({'time': t} if t else {})) if d else None
+    if c:
+        await notify_ready(ctx, c)
+        await edit_and_delete(q, 
+            f"✅ Дата *{c.artist}* обновлена: `{d} {t or ''}`.strip()" + conflict_note(c),
+            parse_mode='Markdown'
+        )
 
-    if data.startswith('upd_date|'):
-        # Обновить дату существующего артиста из свободного ввода
-        parts = data.split('|')
-        cid   = int(parts[1])
-        d     = parts[2] or None
-        t     = parts[3] or None
-        c     = db_get(cid)
-        if c and d:
-            c['date'] = d
-            if t: c['time'] = t
-            db_save(c); sheets.sync_concert(c, _concerts)
-            await notify_ready(ctx, c)
-            await edit_and_delete(q, 
-                f"✅ Дата *{c['artist']}* обновлена: `{d} {t or ''}`.strip()",
-                parse_mode='Markdown'
-            )
+
+# prefix → обработчик; аргументы — части callback_data после префикса
+CALLBACKS = {
+    'noop':        cb_noop,
+    'cnew':        cb_create_then,
+    'tsel':        cb_select_then,
+    'do':          cb_do,
+    'clr':         cb_clear,
+    'edit_menu':   cb_edit_menu,
+    'ed':          cb_edit_field,
+    'fc':          cb_force_create,
+    'new_confirm': cb_new_confirm,
+    'upd_date':    cb_update_date,
+    'merge':       cb_merge,
+}
+# Префиксы, у которых после '|' токен из cb(), а не сами аргументы
+TOKEN_CALLBACKS = {'cnew', 'tsel', 'fc', 'new_confirm', 'upd_date'}
 
 # ─── ОЖИДАНИЕ ВВОДА ───────────────────────────────────────────────────────────
 
 async def handle_awaiting(upd: Update, ctx: ContextTypes.DEFAULT_TYPE) -> bool:
-    field = ctx.user_data.get('aw')
-    if not field:
+    aw = pend_pop(upd, 'aw')
+    if not aw:
         return False
-    cid = ctx.user_data.pop('aw_id', None)
-    ctx.user_data.pop('aw')
+    field, cid = aw
     text = (upd.message.text or '').strip()
 
     # Время после даты без времени
     if field == 'time_for_date':
         if not cid:
             return False
-        c = db_get(cid)
-        if not c:
-            return False
-        d = ctx.user_data.pop(f'aw_time_{cid}', None)
+        d = pend_pop(upd, f'aw_time_{cid}')
+        pend_pop(upd, f'v_{cid}')   # кнопка «Пропустить» больше не нужна
+        if not d:
+            # Дата истекла или вытеснена раньше 'aw' — date=None стёр бы дату концерта
+            await upd.message.reply_text("Дата не сохранилась — начни заново: «артист дата 15.04.2026»")
+            return True
         _, t = extract_date_time(text)
-        c['date'] = d
-        if t: c['time'] = t
-        db_save(c); sheets.sync_concert(c, _concerts)
+        c = await db_update(cid, date=d, **({'time': t} if t else {}))
+        if not c:
+            await upd.message.reply_text("Мероприятие не найдено")
+            return True
         await notify_ready(ctx, c)
-        kb = [[InlineKeyboardButton("✏️ Редактировать", callback_data=f"edit_menu_{cid}")]]
+        kb = [[InlineKeyboardButton("✏️ Редактировать", callback_data=f"edit_menu|{cid}")]]
         dt = f"{d} {t or ''}".strip()
         await upd.message.reply_text(
-            f"✅ Дата *{c['artist']}*: `{dt}`",
+            f"✅ Дата *{c.artist}*: `{dt}`" + conflict_note(c),
             reply_markup=InlineKeyboardMarkup(kb), parse_mode='Markdown'
         )
         return True
@@ -763,23 +858,23 @@ async def handle_awaiting(upd: Update, ctx: ContextTypes.DEFAULT_TYPE) -> bool:
     if field == 'date':
         d, t = extract_date_time(text)
         if d:
-            c['date'] = d
             if t:
-                c['time'] = t
-                db_save(c); sheets.sync_concert(c, _concerts)
+                c = await db_update(cid, date=d, time=t)
+                if not c:
+                    await upd.message.reply_text("Мероприятие не найдено")
+                    return True
                 await notify_ready(ctx, c)
-                kb = [[InlineKeyboardButton("✏️ Редактировать", callback_data=f"edit_menu_{cid}")]]
+                kb = [[InlineKeyboardButton("✏️ Редактировать", callback_data=f"edit_menu|{cid}")]]
                 await upd.message.reply_text(
-                    f"✅ *{c['artist']}* — сохранено",
+                    f"✅ *{c.artist}* — сохранено" + conflict_note(c),
                     reply_markup=InlineKeyboardMarkup(kb), parse_mode='Markdown'
                 )
             else:
                 # Спросить время
-                ctx.user_data[f'aw_time_{cid}'] = d
-                ctx.user_data['aw']    = 'time_for_date'
-                ctx.user_data['aw_id'] = cid
+                pend_set(upd, f'aw_time_{cid}', d)
+                pend_set(upd, 'aw', ('time_for_date', cid))
                 kb = [[InlineKeyboardButton("Пропустить", callback_data=f"do|date|{cid}")]]
-                ctx.user_data[f'v_{cid}'] = (d, None)
+                pend_set(upd, f'v_{cid}', (d, None))
                 await upd.message.reply_text(
                     f"Дата `{d}` — введи время (например `21:00`) или пропусти:",
                     reply_markup=InlineKeyboardMarkup(kb)
@@ -787,19 +882,22 @@ async def handle_awaiting(upd: Update, ctx: ContextTypes.DEFAULT_TYPE) -> bool:
         return True
 
     elif field == 'tickets':
-        c['tickets_url'] = extract_url(text) or text
+        fields = {'tickets_url': extract_url(text) or text}
     elif field == 'text':
-        c['description_text'] = text
+        fields = {'description_text': text}
     elif field == 'artist':
-        c['artist'] = text
+        fields = {'artist': text}
     else:
         return False
 
-    db_save(c); sheets.sync_concert(c, _concerts)
+    c = await db_update(cid, **fields)
+    if not c:
+        await upd.message.reply_text("Мероприятие не найдено")
+        return True
     await notify_ready(ctx, c)
-    kb = [[InlineKeyboardButton("✏️ Редактировать", callback_data=f"edit_menu_{cid}")]]
+    kb = [[InlineKeyboardButton("✏️ Редактировать", callback_data=f"edit_menu|{cid}")]]
     await upd.message.reply_text(
-        f"✅ *{c['artist']}* — сохранено",
+        f"✅ *{c.artist}* — сохранено",
         reply_markup=InlineKeyboardMarkup(kb), parse_mode='Markdown'
     )
     return True
@@ -829,6 +927,10 @@ async def cmd_start(upd: Update, ctx: ContextTypes.DEFAULT_TYPE):
         "`/publish [номер]` — опубликовать\n"
         "`/cancel [номер]` — отменить\n"
         "`/digest` — сводка\n"
+        "`/find [слова]` — поиск по артисту и описанию\n"
+        "`/dups` — похожие мероприятия в один день\n"
+        "`/merge [номер] [номер]` — влить второе в первое\n"
+        "`/conflicts` — концерты, пересекающиеся по времени\n"
         "`/code [номер]` — HTML для Tilda",
         parse_mode='Markdown'
     )
@@ -839,8 +941,7 @@ async def cmd_new(upd: Update, ctx: ContextTypes.DEFAULT_TYPE):
     args = ' '.join(ctx.args).strip() if ctx.args else ''
 
     if not args:
-        ctx.user_data['aw']    = 'create_name'
-        ctx.user_data['aw_id'] = 0
+        pend_set(upd, 'aw', ('create_name', 0))
         await upd.message.reply_text(
             "Введи имя артиста (можно сразу с датой и временем):\n"
             "Например: `Иван Дорн 15.04.2026 21:00`",
@@ -860,44 +961,47 @@ async def cmd_new(upd: Update, ctx: ContextTypes.DEFAULT_TYPE):
     await _create_or_warn(upd, ctx, artist, d, t)
 
 
+def dup_warning(artist: str, d: Optional[str], t: Optional[str],
+                dups: List[Concert]) -> Tuple[str, InlineKeyboardMarkup]:
+    """Текст и кнопки «уже есть»: до трёх похожих записей, открыть или всё равно создать."""
+    lines = [f"*{artist}* похоже уже есть:"]
+    for c in dups[:3]:
+        lines.append(f"  #{c.id} {c.artist}" + (f" — {c.date}" if c.date else ''))
+    lines.append("Что делаем?")
+    kb = [[InlineKeyboardButton("Создать новое", callback_data=cb('fc', artist, d, t))]]
+    kb += [[InlineKeyboardButton(f"Открыть #{c.id}", callback_data=f"edit_menu|{c.id}")]
+           for c in dups[:3]]
+    return '\n'.join(lines), InlineKeyboardMarkup(kb)
+
 async def _create_or_warn(upd: Update, ctx: ContextTypes.DEFAULT_TYPE,
                            artist: str, d: Optional[str], t: Optional[str]):
     """Проверяет дубли и создаёт или предупреждает."""
-    msg     = upd.effective_message
-    matches = fuzzy_find(artist)
-    exact   = [c for c in matches if norm(c['artist']) == norm(artist)]
-
-    if exact:
-        c  = exact[0]
-        kb = [[
-            InlineKeyboardButton("Создать новое", callback_data=f"fc|{artist}|{d or ''}|{t or ''}"),
-            InlineKeyboardButton(f"Открыть #{c['id']}", callback_data=f"edit_menu_{c['id']}"),
-        ]]
-        await reply_and_delete(msg, 
-            f"*{artist}* уже есть (#{c['id']}).\nЧто делаем?",
-            reply_markup=InlineKeyboardMarkup(kb), parse_mode='Markdown'
-        )
+    msg  = upd.effective_message
+    dups = store.duplicates(artist, d)
+
+    if dups:
+        text, kb = dup_warning(artist, d, t, dups)
+        await reply_and_delete(msg, text, reply_markup=kb, parse_mode='Markdown')
         return
 
-    cid = db_save({'artist': artist, 'date': d, 'time': t})
-    c   = db_get(cid)
-    sheets.sync_concert(c, _concerts)
+    c   = await db_create({'artist': artist, 'date': d, 'time': t})
+    cid = c.id
 
     # Если дата есть но времени нет — спросить время
     if d and not t:
-        ctx.user_data[f'aw_time_{cid}'] = d
-        ctx.user_data['aw']    = 'time_for_date'
-        ctx.user_data['aw_id'] = cid
-        ctx.user_data[f'v_{cid}'] = (d, None)
+        pend_set(upd, f'aw_time_{cid}', d)
+        pend_set(upd, 'aw', ('time_for_date', cid))
+        pend_set(upd, f'v_{cid}', (d, None))
         kb = [[InlineKeyboardButton("Пропустить", callback_data=f"do|date|{cid}")]]
         await reply_and_delete(msg, 
-            card(c) + f"\n\n📅 Введи время (например `21:00`) или пропусти:",
+            card(c) + conflict_note(c) + f"\n\n📅 Введи время (например `21:00`) или пропусти:",
             reply_markup=InlineKeyboardMarkup(kb), parse_mode='Markdown'
         )
         return
 
-    kb = [[InlineKeyboardButton("✏️ Редактировать", callback_data=f"edit_menu_{cid}")]]
-    await reply_and_delete(msg, card(c), reply_markup=InlineKeyboardMarkup(kb), parse_mode='Markdown')
+    kb = [[InlineKeyboardButton("✏️ Редактировать", callback_data=f"edit_menu|{cid}")]]
+    await reply_and_delete(msg, card(c) + conflict_note(c), reply_markup=InlineKeyboardMarkup(kb),
+                           parse_mode='Markdown')
 
 
 async def cmd_edit(upd: Update, ctx: ContextTypes.DEFAULT_TYPE):
@@ -909,7 +1013,7 @@ async def cmd_edit(upd: Update, ctx: ContextTypes.DEFAULT_TYPE):
             if not c:
                 await upd.message.reply_text(f"#{cid} не найдено")
                 return
-            kb = [[InlineKeyboardButton("✏️ Редактировать", callback_data=f"edit_menu_{cid}")]]
+            kb = [[InlineKeyboardButton("✏️ Редактировать", callback_data=f"edit_menu|{cid}")]]
             await upd.message.reply_text(card(c), reply_markup=InlineKeyboardMarkup(kb),
                                          parse_mode='Markdown')
             return
@@ -919,26 +1023,26 @@ async def cmd_edit(upd: Update, ctx: ContextTypes.DEFAULT_TYPE):
             matches = fuzzy_find(name)
             if len(matches) == 1:
                 c  = matches[0]
-                kb = [[InlineKeyboardButton("✏️ Редактировать", callback_data=f"edit_menu_{c['id']}")]]
+                kb = [[InlineKeyboardButton("✏️ Редактировать", callback_data=f"edit_menu|{c.id}")]]
                 await upd.message.reply_text(card(c), reply_markup=InlineKeyboardMarkup(kb),
                                              parse_mode='Markdown')
                 return
             elif len(matches) > 1:
                 kb = [[InlineKeyboardButton(
-                    f"#{c['id']} {c['artist']}" + (f" • {c['date']}" if c.get('date') else ''),
-                    callback_data=f"edit_menu_{c['id']}"
+                    f"#{c.id} {c.artist}" + (f" • {c.date}" if c.date else ''),
+                    callback_data=f"edit_menu|{c.id}"
                 )] for c in matches]
                 await upd.message.reply_text("Уточни:", reply_markup=InlineKeyboardMarkup(kb))
                 return
 
     # /edit без аргументов — показать список
-    concerts = [c for c in db_all() if c['status'] == 'draft']
+    concerts = [c for c in db_all() if c.status == 'draft']
     if not concerts:
         await upd.message.reply_text("Нет активных мероприятий. Создай: `/new`", parse_mode='Markdown')
         return
     kb = [[InlineKeyboardButton(
-        f"{s_icon(c)} #{c['id']} {c['artist']}" + (f" • {c['date']}" if c.get('date') else ''),
-        callback_data=f"edit_menu_{c['id']}"
+        f"{c.icon()} #{c.id} {c.artist}" + (f" • {c.date}" if c.date else ''),
+        callback_data=f"edit_menu|{c.id}"
     )] for c in concerts[:15]]
     await upd.message.reply_text(
         "Выбери мероприятие (или `/edit [номер]`):",
@@ -952,31 +1056,31 @@ async def cmd_list(upd: Update, ctx: ContextTypes.DEFAULT_TYPE):
 
     # Фильтры по отсутствующим полям
     FILTERS = {
-        'afisha': ('афиша', lambda c: c.get('poster_status') != 'approved'),
-        'афиша':  ('афиша', lambda c: c.get('poster_status') != 'approved'),
-        'tickets': ('билеты', lambda c: not c.get('tickets_url')),
-        'билеты':  ('билеты', lambda c: not c.get('tickets_url')),
-        'text':   ('текст',  lambda c: not c.get('description_text')),
-        'текст':  ('текст',  lambda c: not c.get('description_text')),
+        'afisha': ('афиша', lambda c: c.poster_status != 'approved'),
+        'афиша':  ('афиша', lambda c: c.poster_status != 'approved'),
+        'tickets': ('билеты', lambda c: not c.tickets_url),
+        'билеты':  ('билеты', lambda c: not c.tickets_url),
+        'text':   ('текст',  lambda c: not c.description_text),
+        'текст':  ('текст',  lambda c: not c.description_text),
     }
 
     if arg in FILTERS:
         label, fn = FILTERS[arg]
-        concerts  = [c for c in db_all() if c['status'] == 'draft' and fn(c)]
+        concerts  = [c for c in db_all() if c.status == 'draft' and fn(c)]
         if not concerts:
             await upd.message.reply_text(f"✅ У всех мероприятий есть {label}!")
             return
         lines = [f"❌ *Нет {label}: {len(concerts)}*\n"]
         for c in concerts:
-            date_part = c.get('date', '')
-            time_part = c.get('time', '')
+            date_part = c.date
+            time_part = c.time
             if date_part and time_part:
                 d = f" — {date_part} {time_part}"
             elif date_part:
                 d = f" — {date_part}"
             else:
                 d = ''
-            lines.append(f"#{c['id']} *{c['artist']}*{d}")
+            lines.append(f"#{c.id} *{c.artist}*{d}")
         await upd.message.reply_text('\n'.join(lines), parse_mode='Markdown')
         return
 
@@ -987,7 +1091,7 @@ async def cmd_list(upd: Update, ctx: ContextTypes.DEFAULT_TYPE):
 
     if month_filter:
         def in_month(c):
-            d = c.get('date', '')
+            d = c.date
             try: return f"{d.split('.')[2]}-{d.split('.')[1]}" == month_filter
             except: return False
         concerts = [c for c in concerts if in_month(c)]
@@ -996,31 +1100,31 @@ async def cmd_list(upd: Update, ctx: ContextTypes.DEFAULT_TYPE):
         await upd.message.reply_text("Мероприятий нет. Создай: `/new`", parse_mode='Markdown')
         return
 
-    active    = [c for c in concerts if c['status'] == 'draft']
-    published = [c for c in concerts if c['status'] == 'published']
-    cancelled = [c for c in concerts if c['status'] == 'cancelled']
+    active    = [c for c in concerts if c.status == 'draft']
+    published = [c for c in concerts if c.status == 'published']
+    cancelled = [c for c in concerts if c.status == 'cancelled']
 
     lines = [f"📋 *В работе: {len(active)}*\n"]
     for c in active:
-        date_part = c.get('date', '')
-        time_part = c.get('time', '')
+        date_part = c.date
+        time_part = c.time
         if date_part and time_part:
             d = f" — {date_part} {time_part}"
         elif date_part:
             d = f" — {date_part}"
         else:
             d = ''
-        m    = missing(c)
+        m    = c.missing()
         miss = f" | нет: {', '.join(m)}" if m else " | ✅"
-        lines.append(f"{s_icon(c)} #{c['id']} *{c['artist']}*{d}{miss}")
+        lines.append(f"{c.icon()} #{c.id} *{c.artist}*{d}{miss}")
 
     if published:
         lines.append(f"\n⚫ Опубликовано: {len(published)}")
-        for c in published[:5]: lines.append(f"  #{c['id']} *{c['artist']}*")
+        for c in published[:5]: lines.append(f"  #{c.id} *{c.artist}*")
 
     if inc_all and cancelled:
         lines.append(f"\n🚫 Отменены: {len(cancelled)}")
-        for c in cancelled: lines.append(f"  #{c['id']} *{c['artist']}*")
+        for c in cancelled: lines.append(f"  #{c.id} *{c.artist}*")
 
     await upd.message.reply_text('\n'.join(lines), parse_mode='Markdown')
 
@@ -1034,11 +1138,11 @@ async def cmd_status(upd: Update, ctx: ContextTypes.DEFAULT_TYPE):
             name = ' '.join(ctx.args)
             m    = fuzzy_find(name)
             if len(m) == 1:
-                cid = m[0]['id']
+                cid = m[0].id
             elif len(m) > 1:
                 kb = [[InlineKeyboardButton(
-                    f"#{c['id']} {c['artist']}" + (f" • {c['date']}" if c.get('date') else ''),
-                    callback_data=f"edit_menu_{c['id']}"
+                    f"#{c.id} {c.artist}" + (f" • {c.date}" if c.date else ''),
+                    callback_data=f"edit_menu|{c.id}"
                 )] for c in m]
                 await upd.message.reply_text("Уточни:", reply_markup=InlineKeyboardMarkup(kb))
                 return
@@ -1049,7 +1153,7 @@ async def cmd_status(upd: Update, ctx: ContextTypes.DEFAULT_TYPE):
     if not c:
         await upd.message.reply_text(f"#{cid} не найдено")
         return
-    kb = [[InlineKeyboardButton("✏️ Редактировать", callback_data=f"edit_menu_{cid}")]]
+    kb = [[InlineKeyboardButton("✏️ Редактировать", callback_data=f"edit_menu|{cid}")]]
     await upd.message.reply_text(card(c), reply_markup=InlineKeyboardMarkup(kb), parse_mode='Markdown')
 
 
@@ -1064,7 +1168,7 @@ async def cmd_publish(upd: Update, ctx: ContextTypes.DEFAULT_TYPE):
     kb = [[InlineKeyboardButton("✅ Опубликовать", callback_data=f"do|publish|{cid}"),
            InlineKeyboardButton("❌ Отмена",       callback_data="noop")]]
     await upd.message.reply_text(
-        f"Опубликовать *#{cid} {c['artist']}*?",
+        f"Опубликовать *#{cid} {c.artist}*?",
         reply_markup=InlineKeyboardMarkup(kb), parse_mode='Markdown'
     )
 
@@ -1080,45 +1184,97 @@ async def cmd_cancel(upd: Update, ctx: ContextTypes.DEFAULT_TYPE):
     kb = [[InlineKeyboardButton("✅ Отменить", callback_data=f"do|cancel|{cid}"),
            InlineKeyboardButton("❌ Назад",    callback_data="noop")]]
     await upd.message.reply_text(
-        f"Отменить *#{cid} {c['artist']}*?",
+        f"Отменить *#{cid} {c.artist}*?",
         reply_markup=InlineKeyboardMarkup(kb), parse_mode='Markdown'
     )
 
 
 async def cmd_digest(upd: Update, ctx: ContextTypes.DEFAULT_TYPE):
     register_chat(upd.effective_chat.id)
-    all_c = db_all()
-    ready, prog, draft, pub = [], [], [], []
-    for c in all_c:
-        if c['status'] == 'published':   pub.append(c)
-        elif is_ready(c):                ready.append(c)
-        elif any([c.get('date'), c.get('tickets_url'),
-                  c.get('poster_status') == 'approved',
-                  c.get('description_text')]): prog.append(c)
-        else:                            draft.append(c)
-
-    if not any([ready, prog, draft]):
+    text = store.digest.render(datetime.now().strftime('%d.%m.%Y'))
+    if not text:
         await upd.message.reply_text("Активных мероприятий нет.")
         return
+    await upd.message.reply_text(text, parse_mode='Markdown')
+
+
+def _snippet(text: str, words: List[str], width: int = 60) -> str:
+    """Кусок описания вокруг первого найденного слова запроса."""
+    low = text.lower().replace('ё', 'е')
+    pos = min((p for p in (low.find(w) for w in words) if p >= 0), default=0)
+    start = max(0, pos - width // 3)
+    part  = re.sub(r'[*_`\[\]]', '', text[start:start + width]).replace('\n', ' ')
+    return ('…' if start else '') + part + ('…' if start + width < len(text) else '')
+
+async def cmd_find(upd: Update, ctx: ContextTypes.DEFAULT_TYPE):
+    query = ' '.join(ctx.args or [])
+    if not query:
+        await upd.message.reply_text("Что ищем? `/find Дорн акустика`", parse_mode='Markdown')
+        return
+    found = store.find(query, limit=10)
+    if not found:
+        await upd.message.reply_text("Ничего не нашлось")
+        return
+    words = norm(query).split()
+    lines = [f"🔎 *Найдено: {len(found)}*\n"]
+    for c in found:
+        d = f" — {c.date}" if c.date else ''
+        lines.append(f"{c.icon()} #{c.id} *{c.artist}*{d}")
+        if c.description_text:
+            lines.append(f"    _{_snippet(c.description_text, words)}_")
+    kb = [[InlineKeyboardButton(f"#{c.id} {c.artist}", callback_data=f"edit_menu|{c.id}")]
+          for c in found]
+    await upd.message.reply_text('\n'.join(lines), reply_markup=InlineKeyboardMarkup(kb),
+                                 parse_mode='Markdown')
 
-    now = datetime.now()
-    lines = [f"📊 *Статус на {now.strftime('%d.%m.%Y')}*\n"]
-    if ready:
-        lines.append(f"🟢 READY ({len(ready)})")
-        for c in ready: lines.append(f"— *{c['artist']}*" + (f" • {c['date']}" if c.get('date') else ''))
-        lines.append("")
-    if prog:
-        lines.append(f"🟡 IN PROGRESS ({len(prog)})")
-        for c in prog: lines.append(f"— *{c['artist']}* (нет: {', '.join(missing(c))})")
-        lines.append("")
-    if draft:
-        lines.append(f"🔴 DRAFT ({len(draft)})")
-        for c in draft: lines.append(f"— *{c['artist']}*")
-        lines.append("")
-    if pub:
-        lines.append(f"⚫ PUBLISHED ({len(pub)})")
-        for c in pub[:5]: lines.append(f"— *{c['artist']}*")
 
+async def cmd_merge(upd: Update, ctx: ContextTypes.DEFAULT_TYPE):
+    try:
+        keep_id, drop_id = (int(a) for a in ctx.args)
+    except ValueError:
+        await upd.message.reply_text(
+            "Укажи два номера: `/merge 5 7` — #7 вольётся в #5", parse_mode='Markdown')
+        return
+    keep, drop = db_get(keep_id), db_get(drop_id)
+    if not keep or not drop or keep_id == drop_id:
+        await upd.message.reply_text("Нужны два разных существующих мероприятия")
+        return
+    kb = [[InlineKeyboardButton("🔀 Объединить", callback_data=f"merge|{keep_id}|{drop_id}"),
+           InlineKeyboardButton("❌ Отмена",     callback_data="noop")]]
+    await upd.message.reply_text(
+        f"Влить *#{drop_id} {drop.artist}* в *#{keep_id} {keep.artist}*?\n"
+        f"Пустые поля #{keep_id} заполнятся из #{drop_id}, #{drop_id} уйдёт в архив.",
+        reply_markup=InlineKeyboardMarkup(kb), parse_mode='Markdown'
+    )
+
+
+async def cmd_dups(upd: Update, ctx: ContextTypes.DEFAULT_TYPE):
+    pairs = store.dupes.pairs()
+    if not pairs:
+        await upd.message.reply_text("✅ Дублей не найдено")
+        return
+    lines, kb = [f"👯 *Похожие мероприятия в один день: {len(pairs)}*\n"], []
+    for a, b, _ in pairs[:10]:
+        ca, cb_ = db_get(a), db_get(b)
+        # Остаётся более заполненная запись, при равенстве — старшая
+        keep, drop = (ca, cb_) if ca.filled() >= cb_.filled() else (cb_, ca)
+        lines.append(f"#{keep.id} *{keep.artist}* / #{drop.id} *{drop.artist}* — {keep.date}")
+        kb.append([InlineKeyboardButton(f"🔀 #{drop.id} → #{keep.id}",
+                                        callback_data=f"merge|{keep.id}|{drop.id}")])
+    await upd.message.reply_text('\n'.join(lines), reply_markup=InlineKeyboardMarkup(kb),
+                                 parse_mode='Markdown')
+
+
+async def cmd_conflicts(upd: Update, ctx: ContextTypes.DEFAULT_TYPE):
+    groups = store.schedule.report()
+    if not groups:
+        await upd.message.reply_text("✅ Пересечений в зале нет")
+        return
+    lines = [f"⚠️ *Пересечения: {len(groups)}*"]
+    for date, ids in groups:
+        lines.append(f"\n📅 *{date}*")
+        for c in map(db_get, ids):
+            lines.append(f"  {c.time or 'весь день'} — #{c.id} *{c.artist}*")
     await upd.message.reply_text('\n'.join(lines), parse_mode='Markdown')
 
 
@@ -1131,13 +1287,13 @@ async def cmd_code(upd: Update, ctx: ContextTypes.DEFAULT_TYPE):
     c = db_get(cid)
     if not c: await upd.message.reply_text(f"#{cid} не найдено"); return
 
-    artist     = c.get('artist', '')
-    date_str   = c.get('date', '') or ''
-    time_str   = c.get('time', '') or ''
+    artist     = c.artist
+    date_str   = c.date or ''
+    time_str   = c.time or ''
     dt         = (date_str + ' • ' + time_str).strip(' •') if date_str else ''
-    url        = c.get('tickets_url', '') or ''
-    poster_url = c.get('poster_file_id', '') or 'ССЫЛКА_НА_АФИШУ'
-    desc       = c.get('description_text', '') or ''
+    url        = c.tickets_url or ''
+    poster_url = c.poster_file_id or 'ССЫЛКА_НА_АФИШУ'
+    desc       = c.description_text or ''
 
     paragraphs = [p.strip() for p in desc.split('\n\n') if p.strip()]
 
@@ -1323,7 +1479,7 @@ async def cmd_code(upd: Update, ctx: ContextTypes.DEFAULT_TYPE):
 </script>
 {tc_script}"""
 
-    m = missing(c)
+    m = c.missing()
     warnings = []
     if 'афиша'  in m: warnings.append('⚠️ Афиша не добавлена — замени ССЫЛКА_НА_АФИШУ')
     if 'билеты' in m: warnings.append('⚠️ Билеты не добавлены')
@@ -1371,8 +1527,9 @@ async def on_text(upd: Update, ctx: ContextTypes.DEFAULT_TYPE):
     text = (upd.message.text or '').strip()
 
     # Ожидание имени при /new
-    if ctx.user_data.get('aw') == 'create_name':
-        ctx.user_data.pop('aw'); ctx.user_data.pop('aw_id', None)
+    aw = pend_get(upd, 'aw')
+    if aw and aw[0] == 'create_name':
+        pend_pop(upd, 'aw')
         if text:
             d, t   = extract_date_time(text)
             artist = strip_date_time(text).strip() or text
@@ -1400,12 +1557,12 @@ async def on_text(upd: Update, ctx: ContextTypes.DEFAULT_TYPE):
             c  = matches[0]
             dt = f"{d} {t or ''}".strip()
             kb = [[
-                InlineKeyboardButton(f"📅 Обновить дату #{c['id']}", callback_data=f"upd_date|{c['id']}|{d}|{t or ''}"),
-                InlineKeyboardButton("➕ Создать новое",              callback_data=f"new_confirm|{artist}|{d or ''}|{t or ''}"),
+                InlineKeyboardButton(f"📅 Обновить дату #{c.id}", callback_data=cb('upd_date', c.id, d, t)),
+                InlineKeyboardButton("➕ Создать новое",              callback_data=cb('new_confirm', artist, d, t)),
                 InlineKeyboardButton("❌ Отмена",                     callback_data="noop"),
             ]]
             await upd.message.reply_text(
-                f"Найден *#{c['id']} {c['artist']}*.\n"
+                f"Найден *#{c.id} {c.artist}*.\n"
                 f"Обновить дату на `{dt}` или создать новое мероприятие?",
                 reply_markup=InlineKeyboardMarkup(kb), parse_mode='Markdown'
             )
@@ -1413,7 +1570,7 @@ async def on_text(upd: Update, ctx: ContextTypes.DEFAULT_TYPE):
             # Артист не найден → предложить создать
             dt = f"{d} {t or ''}".strip()
             kb = [[
-                InlineKeyboardButton("✅ Создать", callback_data=f"new_confirm|{artist}|{d or ''}|{t or ''}"),
+                InlineKeyboardButton("✅ Создать", callback_data=cb('new_confirm', artist, d, t)),
                 InlineKeyboardButton("❌ Отмена",  callback_data="noop"),
             ]]
             await upd.message.reply_text(
@@ -1424,40 +1581,43 @@ async def on_text(upd: Update, ctx: ContextTypes.DEFAULT_TYPE):
 
     # "Ты имел в виду?" — мягкий fuzzy (60-65) без триггера
     if len(text.split()) <= 5:
-        soft = fuzzy_find(text, soft=True)
-        strict = fuzzy_find(text)
-        if soft and not strict:
-            c  = soft[0]
-            cn = norm(c['artist'])
-            tn = norm(text)
-            score = max(fuzz.token_set_ratio(tn, cn), fuzz.partial_ratio(tn, cn))
-            if 60 <= score < 65:
-                kb = [[
-                    InlineKeyboardButton(f"✅ Да, #{c['id']} {c['artist']}", callback_data=f"edit_menu_{c['id']}"),
-                    InlineKeyboardButton("❌ Нет", callback_data="noop"),
-                ]]
-                await upd.message.reply_text(
-                    f"Ты имел в виду *{c['artist']}*?",
-                    reply_markup=InlineKeyboardMarkup(kb), parse_mode='Markdown'
-                )
+        # Очки — те же, что у fuzzy_find (оба столбца store.artists):
+        # лучший ниже 65 — значит, строгий поиск ничего не нашёл
+        scored = fuzzy_scored(text, 60)
+        if scored and scored[0][1] < 65:
+            c = scored[0][0]
+            kb = [[
+                InlineKeyboardButton(f"✅ Да, #{c.id} {c.artist}", callback_data=f"edit_menu|{c.id}"),
+                InlineKeyboardButton("❌ Нет", callback_data="noop"),
+            ]]
+            await upd.message.reply_text(
+                f"Ты имел в виду *{c.artist}*?",
+                reply_markup=InlineKeyboardMarkup(kb), parse_mode='Markdown'
+            )
 
 
 async def cmd_rebuild(upd: Update, ctx: ContextTypes.DEFAULT_TYPE):
     """Пересобирает все календари и чистит имена артистов в Sheets."""
-    global _concerts
     msg = await upd.message.reply_text("🔄 Пересобираю календари...")
 
-    # Чистим имена артистов в памяти (убираем " —" и лишние пробелы)
-    for c in _concerts:
-        c['artist'] = c['artist'].rstrip(' —').strip()
+    # Чистим имена артистов в памяти (убираем " —" и лишние пробелы).
+    # Только те, что меняются, и под блокировкой концерта — как db_update;
+    # Sheets ниже синхронизируются целиком
+    for cid in [c.id for c in store.raw() if clean_artist(c.artist) != c.artist]:
+        async with store.lock(cid):
+            c = store.get(cid)
+            if c and clean_artist(c.artist) != c.artist:
+                store.update(cid, {'artist': clean_artist(c.artist)})
+    store.take_dirty_months()   # ниже всё равно перерисуем все месяцы
 
     # Пересобираем все месяцы
+    concerts = store.raw()
     months = set()
-    for c in _concerts:
-        if c.get('date'):
+    for c in concerts:
+        if c.date:
             try:
                 from datetime import datetime as _dt
-                dt = _dt.strptime(c['date'], '%d.%m.%Y')
+                dt = _dt.strptime(c.date, '%d.%m.%Y')
                 months.add((dt.month, dt.year))
             except Exception:
                 pass
@@ -1465,24 +1625,80 @@ async def cmd_rebuild(upd: Update, ctx: ContextTypes.DEFAULT_TYPE):
     count = 0
     for month, year in sorted(months):
         try:
-            sheets.rebuild_month_calendar(month, year, _concerts)
+            await sheets.rebuild_month_calendar(month, year, concerts)
             count += 1
         except Exception as e:
             logger.error(f"rebuild {month}/{year}: {e}")
 
     # Синхронизируем все концерты в лист Данные (с чистыми именами)
-    for c in _concerts:
+    for c in concerts:
         try:
-            sheets._sync_data_row(c)
+            await sheets.sync_data_row(c)
         except Exception as e:
-            logger.error(f"sync row {c['id']}: {e}")
+            logger.error(f"sync row {c.id}: {e}")
 
     await msg.edit_text(
         f"✅ Готово!\n"
         f"Пересобрано календарей: {count}\n"
-        f"Концертов обновлено: {len(_concerts)}"
+        f"Концертов обновлено: {len(concerts)}"
+    )
+
+async def cmd_metrics(upd: Update, ctx: ContextTypes.DEFAULT_TYPE):
+    """Задержки хендлеров и вызовов Sheets/Tilda, очереди — только владельцу."""
+    if upd.effective_user.id != OWNER_ID:
+        return
+    await upd.message.reply_text(f"📈 Метрики\n\n{metrics.REGISTRY.summary()}")
+
+async def cmd_profile(upd: Update, ctx: ContextTypes.DEFAULT_TYPE):
+    """/profile on [N] — профилировать следующие N апдейтов; /profile off — отчёт сейчас."""
+    if upd.effective_user.id != OWNER_ID:
+        return
+    arg = ctx.args[0].lower() if ctx.args else ''
+    if arg == 'on':
+        if _profiler.active:
+            await upd.message.reply_text(f"Уже идёт, осталось апдейтов: {_profiler.remaining}")
+            return
+        try:
+            n = int(ctx.args[1]) if len(ctx.args) > 1 else 100
+        except ValueError:
+            n = 100
+        _set_profile_handler(ctx.application, True)
+        _profiler.start(n)
+        await upd.message.reply_text(f"🔬 Профилирую следующие {n} апдейтов")
+    elif arg == 'off':
+        if not _profiler.active:
+            await upd.message.reply_text("Профилирование не запущено")
+            return
+        await _finish_profile(ctx.application)
+    else:
+        await upd.message.reply_text("`/profile on [N]` | `/profile off`", parse_mode='Markdown')
+
+async def _profile_tick(upd: Update, ctx: ContextTypes.DEFAULT_TYPE):
+    if _profiler.active and _profiler.tick():
+        # Последний апдейт ещё обрабатывается — даём ему закончиться
+        await asyncio.sleep(1)
+        if _profiler.active:
+            await _finish_profile(ctx.application)
+
+def _set_profile_handler(app: Application, on: bool):
+    # Новый dict вместо add_handler/remove_handler: те меняют словарь групп,
+    # который в этот момент обходят параллельно обрабатываемые апдейты
+    groups = {g: [h for h in hs if h is not _profile_handler] for g, hs in app.handlers.items()}
+    if on:
+        groups.setdefault(-1, []).insert(0, _profile_handler)
+    app.handlers = dict(sorted((g, hs) for g, hs in groups.items() if hs))
+
+async def _finish_profile(app: Application):
+    _set_profile_handler(app, False)
+    report = _profiler.stop()
+    await app.bot.send_document(
+        OWNER_ID, document=report.encode(), filename='profile.txt',
+        caption="🔬 Профиль: спаны и top функций",
     )
 
+# Подключается только на время /profile on — без него накладных расходов нет
+_profile_handler = TypeHandler(Update, _profile_tick, block=False)
+
 async def cmd_notify_on(upd: Update, ctx: ContextTypes.DEFAULT_TYPE):
     global _notify_enabled
     _notify_enabled = True
@@ -1497,19 +1713,16 @@ async def cmd_notify_off(upd: Update, ctx: ContextTypes.DEFAULT_TYPE):
 # ─── УТРЕННИЙ ДАЙДЖЕСТ ────────────────────────────────────────────────────────
 
 async def morning_digest(ctx: ContextTypes.DEFAULT_TYPE):
-    global _concerts
-
     # Автоархив прошедших опубликованных концертов
     now      = datetime.now()
     archived = []
-    for c in list(_concerts):
-        if c.get('status') == 'published' and c.get('date'):
+    for c in store.raw():
+        if c.status == 'published' and c.date:
             try:
-                event_dt = datetime.strptime(c['date'], '%d.%m.%Y')
+                event_dt = datetime.strptime(c.date, '%d.%m.%Y')
                 if event_dt.date() < now.date():
-                    c['status'] = 'cancelled'
-                    db_save(c); sheets.sync_concert(c, _concerts)
-                    archived.append(c['artist'])
+                    await db_update(c.id, status='cancelled')
+                    archived.append(c.artist)
             except Exception:
                 pass
 
@@ -1526,33 +1739,10 @@ async def morning_digest(ctx: ContextTypes.DEFAULT_TYPE):
     if not _notify_enabled:
         return
 
-    all_c = db_all()
-    ready, prog, draft = [], [], []
-    for c in all_c:
-        if c['status'] != 'draft': continue
-        if is_ready(c): ready.append(c)
-        elif any([c.get('date'), c.get('tickets_url'),
-                  c.get('poster_status') == 'approved',
-                  c.get('description_text')]): prog.append(c)
-        else: draft.append(c)
-
-    if not any([ready, prog, draft]):
+    text = store.digest.render(now.strftime('%d.%m.%Y'), with_published=False)
+    if not text:
         return
 
-    lines = [f"📊 *Статус на {now.strftime('%d.%m.%Y')}*\n"]
-    if ready:
-        lines.append(f"🟢 READY ({len(ready)})")
-        for c in ready: lines.append(f"— *{c['artist']}*" + (f" • {c['date']}" if c.get('date') else ''))
-        lines.append("")
-    if prog:
-        lines.append(f"🟡 IN PROGRESS ({len(prog)})")
-        for c in prog: lines.append(f"— *{c['artist']}* (нет: {', '.join(missing(c))})")
-        lines.append("")
-    if draft:
-        lines.append(f"🔴 DRAFT ({len(draft)})")
-        for c in draft: lines.append(f"— *{c['artist']}*")
-
-    text = '\n'.join(lines)
     for chat_id in get_chats():
         try:
             await ctx.bot.send_message(chat_id, text, parse_mode='Markdown')
@@ -1560,15 +1750,103 @@ async def morning_digest(ctx: ContextTypes.DEFAULT_TYPE):
             logger.error(f"digest {chat_id}: {e}")
 
 
+# ─── ФОНОВОЕ ОБНОВЛЕНИЕ ИЗ SHEETS ─────────────────────────────────────────────
+
+async def refresh_concerts(ctx: ContextTypes.DEFAULT_TYPE):
+    """Подтягивает ручные правки листа 'Данные' без рестарта."""
+    changes = await sheets.poll_changes()
+    if not changes:
+        return
+    changed, removed = changes
+    n = store.merge(changed, removed)
+    months = store.take_dirty_months()
+    if months:
+        await sheets.rebuild_calendars(months, store.raw())
+    logger.info(f"🔄 Правки из Sheets: изменено {len(changed)}, удалено {len(removed)} (всего {n})")
+
+
+async def compact_archive(ctx: ContextTypes.DEFAULT_TYPE):
+    """Ночная уборка: старые отменённые концерты → 'Архив YYYY'."""
+    moved = await sheets.compact_archive(ARCHIVE_AFTER_DAYS)
+    if moved:
+        store.merge([], moved)
+        # Это прошедшие месяцы — их календари не перерисовываем
+        store.take_dirty_months()
+
+
+async def flush_chats(ctx: Optional[ContextTypes.DEFAULT_TYPE] = None):
+    """Дописывает новые чаты в Sheets одной пачкой; при ошибке — повтор в следующий раз."""
+    batch = _chats.take_unsaved()
+    if batch and not await sheets.save_chats(batch):
+        _chats.requeue(batch)
+
+async def purge_pending(ctx: ContextTypes.DEFAULT_TYPE):
+    """Выбрасывает просроченные незавершённые действия и токены кнопок."""
+    n = _pending.purge() + _cb_payloads.purge()
+    st = _pending.stats()
+    logger.info(f"pending: {st['entries']} записей у {st['users']} польз., "
+                f"кнопок: {len(_cb_payloads)}, удалено: {n}, "
+                f"на автоудаление: {_deleter.backlog}")
+
+
 # ─── MAIN ─────────────────────────────────────────────────────────────────────
 
-def main():
-    global _concerts, _chats
+async def load_concerts_or_fail() -> List[Concert]:
+    """
+    Концерты из Sheets с повторами. Пустой старт вместо ошибки опасен:
+    next_id() начнёт с 1 и перезапишет существующие ID.
+    """
+    for attempt in range(1, SHEETS_STARTUP_RETRIES + 1):
+        try:
+            return await sheets.load_all_concerts()
+        except Exception as e:
+            if attempt >= SHEETS_STARTUP_RETRIES:
+                logger.critical(f"Не удалось загрузить концерты из Sheets: {e!r}")
+                raise
+            logger.warning(f"Загрузка концертов, попытка {attempt}: {e!r} — повтор")
+            await asyncio.sleep(5 * attempt)
+
+async def post_init(app: Application):
     # Загружаем данные из Google Sheets — это и есть наша БД
-    _concerts = sheets.load_all_concerts()
-    _chats    = sheets.load_chats()
-    logger.info(f"🎸 Загружено концертов: {len(_concerts)}, чатов: {len(_chats)}")
-    app = Application.builder().token(TOKEN).build()
+    if not await sheets.connect() and SHEETS_ID:
+        logger.critical("Google Sheets не подключён — запуск без данных перезаписал бы ID")
+        raise RuntimeError("Google Sheets не подключён")
+    store.load(await load_concerts_or_fail())
+    _chats.load(await sheets.load_chats())
+    logger.info(f"🎸 Загружено концертов: {len(store)}, чатов: {len(_chats)}")
+    n = _deleter.load()
+    if n:
+        logger.info(f"Очередь автоудаления восстановлена: {n}")
+
+    metrics.gauge('update_queue',    lambda: app.update_queue.qsize())
+    metrics.gauge('sheets_in_flight', lambda: sheets.in_flight)
+    metrics.gauge('delete_backlog',  lambda: _deleter.backlog)
+    metrics.gauge('pending_actions', lambda: len(_pending))
+    metrics.gauge('callback_tokens', lambda: len(_cb_payloads))
+    metrics.gauge('concerts',        lambda: len(store))
+    metrics.gauge('chats_unsaved',   lambda: _chats.unsaved)
+    if METRICS_PORT:
+        from webhook import start_metrics_server
+        app.bot_data['metrics_runner'] = await start_metrics_server(METRICS_LISTEN, METRICS_PORT)
+
+async def post_shutdown(app: Application):
+    _deleter.save()
+    await flush_chats()
+    runner = app.bot_data.get('metrics_runner')
+    if runner:
+        await runner.cleanup()
+    sheets.shutdown()
+
+def build_app(builder=None) -> Application:
+    """
+    Application со всеми хендлерами и задачами. builder — для load_sim.py:
+    туда передаётся билдер с фейковым сетевым слоем Telegram.
+    """
+    # Апдейты разных чатов обрабатываются параллельно; правки одного
+    # концерта сериализует его блокировка в store
+    builder = builder or Application.builder().token(TOKEN)
+    app = (builder.concurrent_updates(True)
+           .post_init(post_init).post_shutdown(post_shutdown).build())
 
     for cmd, fn in [
         ('start',   cmd_start),
@@ -1579,23 +1857,48 @@ def main():
         ('publish', cmd_publish),
         ('cancel',  cmd_cancel),
         ('digest',     cmd_digest),
+        ('find',       cmd_find),
+        ('merge',      cmd_merge),
+        ('dups',       cmd_dups),
+        ('conflicts',  cmd_conflicts),
         ('code',       cmd_code),
         ('help',       cmd_start),
         ('notify_on',  cmd_notify_on),
         ('notify_off', cmd_notify_off),
         ('rebuild',    cmd_rebuild),
+        ('metrics',    cmd_metrics),
+        ('profile',    cmd_profile),
     ]:
-        app.add_handler(CommandHandler(cmd, fn))
+        app.add_handler(CommandHandler(cmd, metrics.timed('handler')(fn)))
 
-    app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, on_text))
-    app.add_handler(CallbackQueryHandler(on_callback))
+    app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, metrics.timed('handler')(on_text)))
+    app.add_handler(CallbackQueryHandler(metrics.timed('handler')(on_callback)))
 
     jq = app.job_queue
     if jq:
         jq.run_daily(morning_digest, time=dtime(hour=9, minute=0))
+        if REFRESH_SEC > 0:
+            jq.run_repeating(refresh_concerts, interval=REFRESH_SEC, first=REFRESH_SEC)
+        jq.run_daily(compact_archive, time=dtime(hour=4, minute=0))
+        jq.run_repeating(purge_pending, interval=600, first=600)
+        jq.run_repeating(run_deletes, interval=DELETE_TICK_SEC, first=DELETE_TICK_SEC)
+        jq.run_repeating(flush_chats, interval=CHATS_FLUSH_SEC, first=CHATS_FLUSH_SEC)
+    return app
+
 
+def main():
+    app = build_app()
     logger.info("🎸 MTB Concerts Bot v5 запущен!")
-    app.run_polling(allowed_updates=Update.ALL_TYPES)
+    if BOT_MODE == 'webhook':
+        from webhook import run_webhook
+        secret = WEBHOOK_SECRET
+        if not secret:
+            secret = secrets.token_urlsafe(32)
+            logger.warning("WEBHOOK_SECRET не задан — сгенерирован случайный")
+        asyncio.run(run_webhook(app, WEBHOOK_LISTEN, WEBHOOK_PORT, WEBHOOK_PATH, secret,
+                                url=WEBHOOK_URL, allowed_updates=Update.ALL_TYPES))
+    else:
+        app.run_polling(allowed_updates=Update.ALL_TYPES)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Реестр чатов для рассылок — MTB Concerts Bot
+Известные chat_id — множество в памяти: проверка «уже знаем?» — O(1),
+без запросов к Sheets. Новые чаты копятся в очереди и уходят в лист
+'Чаты' пачкой — одной дозаписью (см. flush_chats в bot.py).
+"""
+
+from typing import Iterable, List, Set
+
+
+class ChatRegistry:
+    def __init__(self):
+        self._known:   Set[int]  = set()
+        self._unsaved: List[int] = []     # новые, ещё не записанные в Sheets
+
+    def __len__(self) -> int:
+        return len(self._known)
+
+    def __contains__(self, chat_id: int) -> bool:
+        return chat_id in self._known
+
+    def __iter__(self):
+        return iter(list(self._known))
+
+    @property
+    def unsaved(self) -> int:
+        return len(self._unsaved)
+
+    def load(self, chat_ids: Iterable[int]):
+        """Чаты из Sheets при старте. Дубли в листе схлопываются."""
+        self._known = set(chat_ids)
+        self._unsaved.clear()
+
+    def add(self, chat_id: int) -> bool:
+        """True — чат новый и поставлен в очередь на запись."""
+        if chat_id in self._known:
+            return False
+        self._known.add(chat_id)
+        self._unsaved.append(chat_id)
+        return True
+
+    def take_unsaved(self) -> List[int]:
+        """Забирает очередь на запись. При ошибке записи — вернуть через requeue()."""
+        batch, self._unsaved = self._unsaved, []
+        return batch
+
+    def requeue(self, chat_ids: List[int]):
+        self._unsaved[:0] = chat_ids
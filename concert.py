@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Concert — запись о мероприятии (MTB Concerts Bot)
+Одна модель для bot.py, store.py и google_sheets.py вместо dict с разными
+ключами. slots=True — без __dict__ на каждый концерт.
+Строка листа 'Данные' (11 колонок):
+  Сайт, Дата, Время, Страничка, Артист, Билеты, Картинка, Текст, Афиша, Статус, ID
+"""
+
+from dataclasses import dataclass, field
+from typing import Optional, List, Tuple, NamedTuple
+
+# Поля, которые хранятся в листе и меняются через store.update()
+FIELDS = (
+    'artist', 'date', 'time', 'poster_status', 'poster_file_id',
+    'tickets_url', 'description_text', 'status',
+)
+STATUSES = ('draft', 'published', 'cancelled', 'archived')
+SITE_URL = 'https://mtbarmoscow.com'
+
+
+class Readiness(NamedTuple):
+    """Сводка готовности концерта — считается один раз на версию."""
+    missing:     Tuple[str, ...]   # ('дата', 'афиша', 'билеты', 'текст')
+    filled:      int               # 0..4
+    ready:       bool
+    icon:        str               # 🚫 ⚫ 🟢 🟡 🔴
+    status_text: str               # колонка 'Статус' / подпись в календаре
+    cal_code:    str               # G / O / R — цвет ячейки календаря
+
+
+def _summarize(c: 'Concert') -> Readiness:
+    m = []
+    if not c.date:                      m.append('дата')
+    if c.poster_status != 'approved':   m.append('афиша')
+    if not c.tickets_url:               m.append('билеты')
+    if not c.description_text:          m.append('текст')
+    filled = 4 - len(m)
+
+    if c.status == 'cancelled':   icon = '🚫'
+    elif c.status == 'published': icon = '⚫'
+    elif filled == 4:             icon = '🟢'
+    else:                         icon = '🟡' if filled >= 2 else '🔴'
+
+    # Дата в колонке 'Статус' не учитывается — она видна в соседней колонке
+    m_text = [x for x in m if x != 'дата']
+    status_text = '✅ Готово' if not m_text else '❌ ' + ', '.join(m_text)
+
+    if filled == 4:   cal_code = 'G'
+    elif filled >= 2: cal_code = 'O'
+    else:             cal_code = 'R'
+
+    return Readiness(tuple(m), filled, filled == 4, icon, status_text, cal_code)
+
+
+@dataclass(slots=True)
+class Concert:
+    id:               int
+    artist:           str = ''
+    date:             Optional[str] = None   # 'DD.MM.YYYY'
+    time:             Optional[str] = None   # 'HH:MM'
+    poster_status:    str = 'none'
+    poster_file_id:   Optional[str] = None
+    tickets_url:      Optional[str] = None
+    description_text: Optional[str] = None
+    status:           str = 'draft'
+    slug:             str = ''
+    created_at:       str = ''
+    updated_at:       str = ''
+    row:              Optional[int] = None   # номер строки в 'Данные'
+    # Растёт при каждой правке через touch() (store.update) — по ней
+    # инвалидируется сводка готовности
+    version:          int = field(default=0, init=False, compare=False)
+    _ready: Optional[Tuple[int, Readiness]] = field(default=None, init=False, repr=False, compare=False)
+
+    def touch(self):
+        self.version += 1
+
+    # ── ГОТОВНОСТЬ ───────────────────────────────────────────────────────────
+
+    @property
+    def readiness(self) -> Readiness:
+        if self._ready is None or self._ready[0] != self.version:
+            self._ready = (self.version, _summarize(self))
+        return self._ready[1]
+
+    def missing(self) -> List[str]:
+        return list(self.readiness.missing)
+
+    def filled(self) -> int:
+        return self.readiness.filled
+
+    def is_ready(self) -> bool:
+        return self.readiness.ready
+
+    def icon(self) -> str:
+        return self.readiness.icon
+
+    def status_text(self) -> str:
+        """Колонка 'Статус' и подпись в календаре (дата тут не учитывается)."""
+        return self.readiness.status_text
+
+    def cal_code(self) -> str:
+        """Код цвета ячейки календаря: G — всё есть, O — частично, R — мало."""
+        return self.readiness.cal_code
+
+    # ── СТРОКА ЛИСТА ─────────────────────────────────────────────────────────
+
+    def fields(self) -> dict:
+        return {f: getattr(self, f) for f in FIELDS}
+
+    def to_row(self) -> List[str]:
+        return [
+            '✅' if self.status != 'cancelled' else '🚫',
+            self.date or '',
+            self.time or '',
+            f"{SITE_URL}/{self.slug}" if self.slug else '',
+            self.artist,
+            self.tickets_url or '',
+            self.poster_file_id or '',
+            (self.description_text or '')[:200],
+            '✅' if self.poster_status == 'approved' else '❌',
+            self.status_text(),
+            str(self.id),
+        ]
+
+    @classmethod
+    def from_row(cls, row: List[str], i: Optional[int] = None) -> Optional['Concert']:
+        row = list(row) + [''] * (11 - len(row))
+        cid = row[10].strip()
+        if not cid.isdigit():
+            return None
+        status = row[9].strip()
+        if status not in STATUSES:
+            status = 'cancelled' if row[0].strip() == '🚫' else 'draft'
+        return cls(
+            id               = int(cid),
+            artist           = row[4].strip().rstrip(' —').strip(),
+            date             = row[1].strip() or None,
+            time             = row[2].strip() or None,
+            poster_status    = 'approved' if row[8].strip() == '✅' else 'none',
+            poster_file_id   = row[6].strip() or None,
+            tickets_url      = row[5].strip() or None,
+            description_text = row[7].strip() or None,
+            status           = status,
+            row              = i,
+        )
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Пересечения концертов в зале — MTB Concerts Bot
+Площадка одна, поэтому конфликт — два живых концерта, чьи интервалы
+[начало, начало + длительность) в один день пересекаются. Концерт без
+времени занимает весь день: с ним конфликтует любой концерт той же даты.
+
+Индекс ведёт ConcertStore (place/discard на каждой мутации):
+  день → интервалы, отсортированные по началу (bisect.insort).
+  - overlaps() для одного концерта — только интервалы его дня;
+  - report() — сортировка дней и проход по каждому: O(n log n).
+"""
+
+from bisect import insort
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from concert import Concert
+
+INACTIVE = ('cancelled', 'archived')
+WHOLE_DAY = (0, 24 * 60)
+
+
+def parse_minutes(t: Optional[str]) -> Optional[int]:
+    """'21:30' → 1290"""
+    try:
+        h, m = (t or '').split(':')
+        return int(h) * 60 + int(m)
+    except ValueError:
+        return None
+
+
+def _day_order(date: str):
+    try:
+        return datetime.strptime(date, '%d.%m.%Y')
+    except ValueError:
+        return datetime.max
+
+
+class ScheduleIndex:
+    def __init__(self, duration_min: int = 180):
+        self.duration_min = duration_min
+        self._by_day:   Dict[str, List[Tuple[int, int, int]]] = {}   # дата → [(начало, конец, id)]
+        self._interval: Dict[int, Tuple[str, Tuple[int, int, int]]] = {}
+        self._source:   Dict[int, Tuple] = {}
+
+    def __len__(self) -> int:
+        return len(self._interval)
+
+    def interval(self, time: Optional[str]) -> Tuple[int, int]:
+        start = parse_minutes(time)
+        if start is None:
+            return WHOLE_DAY
+        return start, start + self.duration_min
+
+    # ── ОБНОВЛЕНИЕ ───────────────────────────────────────────────────────────
+
+    def clear(self):
+        self._by_day.clear()
+        self._interval.clear()
+        self._source.clear()
+
+    def place(self, c: Concert):
+        source = (c.date, c.time, c.status)
+        if self._source.get(c.id) == source:
+            return
+        self.discard(c.id)
+        self._source[c.id] = source
+        if not c.date or c.status in INACTIVE:
+            return
+        item = (*self.interval(c.time), c.id)
+        insort(self._by_day.setdefault(c.date, []), item)
+        self._interval[c.id] = (c.date, item)
+
+    def discard(self, cid: int):
+        self._source.pop(cid, None)
+        entry = self._interval.pop(cid, None)
+        if entry is None:
+            return
+        date, item = entry
+        day = self._by_day[date]
+        day.remove(item)
+        if not day:
+            del self._by_day[date]
+
+    # ── ПРОВЕРКИ ─────────────────────────────────────────────────────────────
+
+    def overlaps(self, date: Optional[str], time: Optional[str],
+                 exclude: Optional[int] = None) -> List[int]:
+        """id концертов, пересекающихся с (date, time)."""
+        if not date:
+            return []
+        start, end = self.interval(time)
+        out = []
+        for s, e, cid in self._by_day.get(date, ()):
+            if s >= end:
+                break           # дальше начинаются ещё позже
+            if e > start and cid != exclude:
+                out.append(cid)
+        return out
+
+    def report(self) -> List[Tuple[str, List[int]]]:
+        """
+        [(дата, [id...])] — группы пересекающихся концертов по дням.
+        Интервалы дня уже отсортированы по началу: группа тянется, пока
+        следующее начало раньше самого позднего конца в ней.
+        """
+        out = []
+        for date in sorted(self._by_day, key=_day_order):
+            group, group_end = [], -1
+            for s, e, cid in self._by_day[date]:
+                if s < group_end:
+                    group.append(cid)
+                    group_end = max(group_end, e)
+                    continue
+                if len(group) > 1:
+                    out.append((date, group))
+                group, group_end = [cid], e
+            if len(group) > 1:
+                out.append((date, group))
+        return out
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Планировщик автоудаления сообщений — MTB Concerts Bot
+Вместо отдельной спящей задачи на каждый ответ бота — одна куча
+(срок, chat_id, message_id). Задача JobQueue раз в тик забирает всё,
+что созрело, и удаляет пачкой. Очередь сохраняется в локальный JSON,
+чтобы после рестарта сообщения всё равно удалились: не чаще раза в
+save_every секунд, в потоке, и синхронно — при остановке бота.
+"""
+
+import os
+import json
+import time
+import heapq
+import asyncio
+import logging
+from typing import List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Telegram не даёт ботам удалять сообщения старше 48 часов
+MAX_AGE_SEC = 48 * 3600
+
+
+class DeleteScheduler:
+    def __init__(self, snapshot_path: str = '', save_every: float = 30):
+        self.snapshot_path = snapshot_path
+        self.save_every    = save_every
+        # (срок по time.time(), chat_id, message_id) — wall clock, чтобы пережить рестарт
+        self._heap: List[Tuple[float, int, int]] = []
+        self._dirty = False
+        self._saved_at = 0.0     # time.monotonic() последней записи снимка
+
+    @property
+    def backlog(self) -> int:
+        return len(self._heap)
+
+    def schedule(self, chat_id: int, message_id: int, delay: float):
+        heapq.heappush(self._heap, (time.time() + delay, chat_id, message_id))
+        self._dirty = True
+
+    def take_due(self) -> List[Tuple[int, int]]:
+        now, due = time.time(), []
+        while self._heap and self._heap[0][0] <= now:
+            when, chat_id, message_id = heapq.heappop(self._heap)
+            if now - when < MAX_AGE_SEC:
+                due.append((chat_id, message_id))
+        if due:
+            self._dirty = True
+        return due
+
+    async def run_due(self, bot) -> int:
+        """Удаляет созревшие сообщения одной пачкой. Возвращает число попыток."""
+        due = self.take_due()
+        if due:
+            results = await asyncio.gather(
+                *(bot.delete_message(chat_id, message_id) for chat_id, message_id in due),
+                return_exceptions=True,
+            )
+            failed = sum(isinstance(r, Exception) for r in results)
+            if failed:
+                logger.debug(f"auto delete: {failed} of {len(due)} failed")
+        if self._dirty and time.monotonic() - self._saved_at >= self.save_every:
+            await self.save_async()
+        return len(due)
+
+    # ── СНИМОК НА ДИСКЕ ──────────────────────────────────────────────────────
+
+    async def save_async(self):
+        """Запись в потоке: event loop не ждёт диск. Копия кучи снимается здесь."""
+        self._dirty, self._saved_at = False, time.monotonic()
+        if not await asyncio.to_thread(self._write, list(self._heap)):
+            self._dirty = True
+
+    def save(self):
+        """Синхронная запись — при остановке бота."""
+        if self._write(list(self._heap)):
+            self._dirty = False
+
+    def _write(self, items: List[Tuple[float, int, int]]) -> bool:
+        if not self.snapshot_path:
+            return True
+        try:
+            tmp = self.snapshot_path + '.tmp'
+            with open(tmp, 'w') as f:
+                json.dump(items, f)
+            os.replace(tmp, self.snapshot_path)
+            return True
+        except OSError as e:
+            logger.error(f"save delete queue: {e}")
+            return False
+
+    def load(self) -> int:
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return 0
+        try:
+            with open(self.snapshot_path) as f:
+                items = [(float(w), int(c), int(m)) for w, c, m in json.load(f)]
+        except (OSError, ValueError, TypeError) as e:
+            logger.error(f"load delete queue: {e}")
+            return 0
+        self._heap.extend(items)
+        heapq.heapify(self._heap)
+        return len(items)
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Дайджест статусов — MTB Concerts Bot
+Корзины READY / IN PROGRESS / DRAFT / PUBLISHED ведутся инкрементально:
+ConcertStore вызывает place()/discard() на каждой мутации, поэтому /digest
+и утренняя рассылка не обходят все концерты. Текст кэшируется до следующего
+изменения корзин (и смены дня — дата в заголовке).
+"""
+
+from typing import Optional, Dict, List, Tuple
+
+from concert import Concert
+
+READY, PROGRESS, DRAFT, PUBLISHED = 'ready', 'progress', 'draft', 'published'
+BUCKETS = (READY, PROGRESS, DRAFT, PUBLISHED)
+
+
+def bucket_of(c: Concert) -> Optional[str]:
+    """Корзина концерта. Отменённые и архивные в дайджест не попадают."""
+    if c.status == 'published':
+        return PUBLISHED
+    if c.status != 'draft':
+        return None
+    if c.is_ready():
+        return READY
+    return PROGRESS if c.filled() else DRAFT
+
+
+class Digest:
+    def __init__(self):
+        self._members: Dict[str, Dict[int, Concert]] = {b: {} for b in BUCKETS}
+        self._bucket:  Dict[int, str] = {}
+        self._version: int = 0
+        # (версия, день, с опубликованными) → текст
+        self._cache: Dict[Tuple[int, str, bool], Optional[str]] = {}
+
+    # ── КОРЗИНЫ ──────────────────────────────────────────────────────────────
+
+    def clear(self):
+        for m in self._members.values():
+            m.clear()
+        self._bucket.clear()
+        self._changed()
+
+    def place(self, c: Concert):
+        """Переложить концерт в актуальную корзину (после создания/правки)."""
+        old = self._bucket.get(c.id)
+        new = bucket_of(c)
+        if old:
+            del self._members[old][c.id]
+        if new:
+            self._members[new][c.id] = c
+            self._bucket[c.id] = new
+        else:
+            self._bucket.pop(c.id, None)
+        # Правка внутри корзины тоже меняет текст (артист, дата, чего не хватает)
+        if old or new:
+            self._changed()
+
+    def discard(self, cid: int):
+        old = self._bucket.pop(cid, None)
+        if old:
+            del self._members[old][cid]
+            self._changed()
+
+    def counts(self) -> Dict[str, int]:
+        return {b: len(m) for b, m in self._members.items()}
+
+    def members(self, bucket: str) -> List[Concert]:
+        return sorted(self._members[bucket].values(), key=lambda c: (c.date or '9999', -c.id))
+
+    def _changed(self):
+        self._version += 1
+        self._cache.clear()
+
+    # ── ТЕКСТ ────────────────────────────────────────────────────────────────
+
+    def render(self, day: str, with_published: bool = True) -> Optional[str]:
+        """Markdown-текст дайджеста на день 'DD.MM.YYYY'. None — активных нет."""
+        key = (self._version, day, with_published)
+        if key not in self._cache:
+            self._cache[key] = self._render(day, with_published)
+        return self._cache[key]
+
+    def _render(self, day: str, with_published: bool) -> Optional[str]:
+        ready, prog, draft = (self.members(b) for b in (READY, PROGRESS, DRAFT))
+        if not any([ready, prog, draft]):
+            return None
+
+        lines = [f"📊 *Статус на {day}*\n"]
+        if ready:
+            lines.append(f"🟢 READY ({len(ready)})")
+            for c in ready: lines.append(f"— *{c.artist}*" + (f" • {c.date}" if c.date else ''))
+            lines.append("")
+        if prog:
+            lines.append(f"🟡 IN PROGRESS ({len(prog)})")
+            for c in prog: lines.append(f"— *{c.artist}* (нет: {', '.join(c.missing())})")
+            lines.append("")
+        if draft:
+            lines.append(f"🔴 DRAFT ({len(draft)})")
+            for c in draft: lines.append(f"— *{c.artist}*")
+            lines.append("")
+        pub = self.members(PUBLISHED) if with_published else []
+        if pub:
+            lines.append(f"⚫ PUBLISHED ({len(pub)})")
+            for c in pub[:5]: lines.append(f"— *{c.artist}*")
+        return '\n'.join(lines).rstrip()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Поиск дублей мероприятий — MTB Concerts Bot
+Индекс ведёт ConcertStore (place/discard на каждой мутации), в нём только
+живые концерты — отменённые и архивные дублями не считаются.
+  - ключ имени — latin_key без пробелов: «Иван Дорн» = «Ivan Dorn»;
+  - имя → id и дата → id — точное совпадение за O(1);
+  - блоки по первым буквам слов имени — кандидаты для похожих имён,
+    когда даты нет: сравниваются только k концертов из общих блоков.
+Похожесть — fuzz.token_set_ratio латинских ключей.
+"""
+
+from typing import Dict, List, Optional, Set, Tuple
+
+from rapidfuzz import fuzz
+
+from concert import Concert
+from textnorm import latin_key
+
+SIMILAR   = 90      # порог похожести имён
+BLOCK_LEN = 4       # блок — первые буквы слова
+INACTIVE  = ('cancelled', 'archived')
+# Что переносится из дубля в оставшуюся запись, если там пусто
+MERGE_FIELDS = ('date', 'time', 'tickets_url', 'description_text', 'poster_file_id')
+
+
+def name_key(artist: str) -> str:
+    return latin_key(artist or '').replace(' ', '')
+
+
+def blocks_of(artist: str) -> Set[str]:
+    return {w[:BLOCK_LEN] for w in latin_key(artist or '').split() if len(w) >= 3}
+
+
+def merge_fields(keep: Concert, drop: Concert) -> dict:
+    """Поля для keep: пустые берутся из drop, одобренная афиша не теряется."""
+    fields = {f: getattr(drop, f) for f in MERGE_FIELDS
+              if not getattr(keep, f) and getattr(drop, f)}
+    # Время — только вместе со своей датой
+    if 'time' in fields and (keep.date or drop.date) != drop.date:
+        del fields['time']
+    if drop.poster_status == 'approved' and keep.poster_status != 'approved':
+        fields['poster_status'] = 'approved'
+        if drop.poster_file_id:
+            fields['poster_file_id'] = drop.poster_file_id
+    return fields
+
+
+class DuplicateIndex:
+    def __init__(self):
+        self._by_key:   Dict[str, Set[int]] = {}
+        self._by_date:  Dict[str, Set[int]] = {}
+        self._by_block: Dict[str, Set[int]] = {}
+        # id → (артист, дата, статус) при индексации и посчитанные ключи
+        self._source: Dict[int, Tuple] = {}
+        self._entry:  Dict[int, Tuple[str, str, Set[str], str]] = {}   # ключ, дата, блоки, латиница
+
+    def __len__(self) -> int:
+        return len(self._entry)
+
+    # ── ОБНОВЛЕНИЕ ───────────────────────────────────────────────────────────
+
+    def clear(self):
+        self._by_key.clear()
+        self._by_date.clear()
+        self._by_block.clear()
+        self._source.clear()
+        self._entry.clear()
+
+    def place(self, c: Concert):
+        source = (c.artist, c.date, c.status)
+        if self._source.get(c.id) == source:
+            return
+        self.discard(c.id)
+        self._source[c.id] = source
+        key = name_key(c.artist)
+        # Пустой ключ (имя без кириллицы и латиницы: CJK, эмодзи) — сравнивать не с чем
+        if c.status in INACTIVE or not key:
+            return
+        blocks = blocks_of(c.artist)
+        self._entry[c.id] = (key, c.date or '', blocks, latin_key(c.artist))
+        self._by_key.setdefault(key, set()).add(c.id)
+        if c.date:
+            self._by_date.setdefault(c.date, set()).add(c.id)
+        for b in blocks:
+            self._by_block.setdefault(b, set()).add(c.id)
+
+    def discard(self, cid: int):
+        self._source.pop(cid, None)
+        entry = self._entry.pop(cid, None)
+        if entry is None:
+            return
+        key, date, blocks, _ = entry
+        _drop(self._by_key, key, cid)
+        if date:
+            _drop(self._by_date, date, cid)
+        for b in blocks:
+            _drop(self._by_block, b, cid)
+
+    # ── ПОИСК ────────────────────────────────────────────────────────────────
+
+    def candidates(self, artist: str, date: Optional[str] = None,
+                   exclude: Optional[int] = None) -> List[Tuple[int, float]]:
+        """
+        [(id, похожесть)] для нового мероприятия:
+          - то же имя — всегда (100), на любую дату;
+          - похожее имя — среди концертов той же даты, а без даты — из общих блоков.
+        """
+        key = name_key(artist)
+        if not key:
+            return []
+        found: Dict[int, float] = {cid: 100.0 for cid in self._by_key.get(key, ())}
+        lat = latin_key(artist or '')
+        if date:
+            pool = self._by_date.get(date, set())
+        else:
+            pool = set().union(*(self._by_block.get(b, ()) for b in blocks_of(artist)))
+        for cid in pool:
+            if cid in found:
+                continue
+            score = fuzz.token_set_ratio(lat, self._entry[cid][3])
+            if score >= SIMILAR:
+                found[cid] = score
+        found.pop(exclude, None)
+        return list(found.items())
+
+    def pairs(self) -> List[Tuple[int, int, float]]:
+        """
+        Вероятные дубли среди уже созданных: похожие имена в один день.
+        Сравниваются только концерты одной даты — O(Σ k²) по дням.
+        """
+        out = []
+        for ids in self._by_date.values():
+            ids = sorted(ids)
+            for i, a in enumerate(ids):
+                for b in ids[i + 1:]:
+                    ea, eb = self._entry[a], self._entry[b]
+                    score = 100.0 if ea[0] == eb[0] else fuzz.token_set_ratio(ea[3], eb[3])
+                    if score >= SIMILAR:
+                        out.append((a, b, score))
+        return out
+
+
+def _drop(index: Dict[str, Set[int]], key: str, cid: int):
+    ids = index.get(key)
+    if ids is not None:
+        ids.discard(cid)
+        if not ids:
+            del index[key]
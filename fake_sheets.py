@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Фейковый Google Sheets в памяти процесса — MTB Concerts Bot
+Повторяет ту часть gspread, которой пользуется GoogleSheetsManager:
+  Spreadsheet: worksheet, add_worksheet, worksheets, batch_update,
+               fetch_sheet_metadata, get_lastUpdateTime
+  Worksheet:   get_all_values, get, update, append_row, append_rows,
+               batch_update, format, merge_cells, clear, id, col_count
+Значения ячеек хранятся по-настоящему — после прогона можно смотреть, что
+легло в лист. Каждый вызов считается (FakeBackend.calls), можно задать
+задержку и долю ошибок квоты (429), чтобы гонять нагрузку без сети.
+
+    manager, sheet = fake_manager(latency=0.05)
+    manager.sync_concert(concert, concerts, months=[(2026, 4)])
+    sheet.backend.calls['values.update'], sheet.sheet('Данные').values()
+"""
+
+import re
+import time
+import random
+import threading
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from google_sheets import GoogleSheetsManager, _col_letter
+
+
+class WorksheetNotFound(Exception):
+    pass
+
+
+class QuotaExceeded(Exception):
+    """Как APIError 429 от Sheets API: 'Quota exceeded for quota metric ...'."""
+    code = 429
+
+
+def _col_index(letters: str) -> int:
+    n = 0
+    for ch in letters:
+        n = n * 26 + ord(ch) - 64
+    return n - 1
+
+
+def _parse_range(a1: str) -> Tuple[int, int, Optional[int], Optional[int]]:
+    """'A3:N6' → (2, 0, 5, 13); 'J5' → (4, 9, 4, 9). Индексы с нуля, включительно."""
+    a1 = a1.split('!')[-1]
+    cells = []
+    for part in a1.split(':'):
+        m = re.fullmatch(r'([A-Z]+)(\d+)', part)
+        if not m:
+            raise ValueError(f"Неподдерживаемый диапазон: {a1}")
+        cells.append((int(m.group(2)) - 1, _col_index(m.group(1))))
+    r0, c0 = cells[0]
+    r1, c1 = cells[-1]
+    return r0, c0, r1, c1
+
+
+# ─── БЭКЕНД: СЧЁТЧИКИ, ЗАДЕРЖКА, ОШИБКИ ──────────────────────────────────────
+
+class FakeBackend:
+    """
+    Общая точка для всех листов: считает HTTP-запросы, которые сделал бы gspread.
+      - latency — секунд на запрос (time.sleep, как у блокирующего gspread);
+      - error_rate — доля запросов, падающих с QuotaExceeded;
+      - seed — для воспроизводимых ошибок.
+    """
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, seed: int = 0):
+        self.latency    = latency
+        self.error_rate = error_rate
+        self.calls: Counter = Counter()
+        self.errors: Counter = Counter()
+        self._rng  = random.Random(seed)
+        self._lock = threading.Lock()
+        self.modified = datetime.now().isoformat()
+
+    @property
+    def total(self) -> int:
+        return sum(self.calls.values())
+
+    def request(self, kind: str, write: bool = False):
+        with self._lock:
+            self.calls[kind] += 1
+            fail = self.error_rate and self._rng.random() < self.error_rate
+            if fail:
+                self.errors[kind] += 1
+            elif write:
+                self.modified = datetime.now().isoformat()
+        if self.latency:
+            time.sleep(self.latency)
+        if fail:
+            raise QuotaExceeded(f"Quota exceeded for quota metric 'Write requests' ({kind})")
+
+    def reset(self):
+        self.calls.clear()
+        self.errors.clear()
+
+
+# ─── ЛИСТ ────────────────────────────────────────────────────────────────────
+
+class FakeWorksheet:
+    def __init__(self, backend: FakeBackend, sheet_id: int, title: str, rows: int, cols: int):
+        self._backend  = backend
+        self.id        = sheet_id
+        self.title     = title
+        self.row_count = rows
+        self.col_count = cols
+        self.cells: List[List[str]] = []
+        self.formats: List[Tuple[str, dict]] = []
+        self.merges:  List[str] = []
+        self.banded   = False
+        self.conditional_formats: List[dict] = []
+
+    # ── ячейки ──
+
+    def _ensure(self, row: int, col: int):
+        while len(self.cells) <= row:
+            self.cells.append([])
+        line = self.cells[row]
+        if len(line) <= col:
+            line.extend([''] * (col + 1 - len(line)))
+        self.row_count = max(self.row_count, row + 1)
+        self.col_count = max(self.col_count, col + 1)
+
+    def _write(self, a1: str, values: List[List]):
+        r0, c0, _, _ = _parse_range(a1)
+        for i, row in enumerate(values):
+            for j, v in enumerate(row):
+                self._ensure(r0 + i, c0 + j)
+                self.cells[r0 + i][c0 + j] = '' if v is None else str(v)
+
+    def _last_row(self) -> int:
+        """Индекс (с нуля) строки после последней непустой."""
+        n = len(self.cells)
+        while n and not any(self.cells[n - 1]):
+            n -= 1
+        return n
+
+    def values(self) -> List[List[str]]:
+        """Содержимое как у get_all_values(), без счёта запроса — для проверок."""
+        rows  = [list(r) for r in self.cells[:self._last_row()]]
+        width = max((len(r) for r in rows), default=0)
+        for r in rows:
+            r.extend([''] * (width - len(r)))
+        # get_all_values обрезает пустые колонки справа
+        while width and not any(r[width - 1] for r in rows):
+            width -= 1
+            for r in rows:
+                r.pop()
+        return rows
+
+    # ── API gspread ──
+
+    def get_all_values(self) -> List[List[str]]:
+        self._backend.request('values.get')
+        return self.values()
+
+    def get(self, range_name: str, **kwargs) -> List[List[str]]:
+        self._backend.request('values.get')
+        r0, c0, r1, c1 = _parse_range(range_name)
+        return [[(self.cells[r][c] if c < len(self.cells[r]) else '') for c in range(c0, c1 + 1)]
+                for r in range(r0, min(r1 + 1, len(self.cells)))]
+
+    def update(self, range_name, values=None, **kwargs):
+        # gspread 5: update(range, values); gspread 6: update(values, range_name)
+        if not isinstance(range_name, str):
+            range_name, values = values, range_name
+        self._backend.request('values.update', write=True)
+        self._write(range_name, values)
+        return {'updatedRange': f"'{self.title}'!{range_name}"}
+
+    def append_row(self, values: List, **kwargs):
+        return self.append_rows([values], **kwargs)
+
+    def append_rows(self, values: List[List], **kwargs):
+        self._backend.request('values.append', write=True)
+        start = self._last_row()
+        for i, row in enumerate(values):
+            for j, v in enumerate(row):
+                self._ensure(start + i, j)
+                self.cells[start + i][j] = '' if v is None else str(v)
+        width = max((len(r) for r in values), default=1)
+        rng = f"A{start + 1}:{_col_letter(width)}{start + len(values)}"
+        return {'updates': {'updatedRange': f"'{self.title}'!{rng}",
+                            'updatedRows': len(values)}}
+
+    def batch_update(self, data: List[dict], **kwargs):
+        self._backend.request('values.batchUpdate', write=True)
+        for item in data:
+            self._write(item['range'], item['values'])
+        return {'totalUpdatedCells': sum(len(r) for d in data for r in d['values'])}
+
+    def format(self, ranges, fmt: dict, **kwargs):
+        self._backend.request('spreadsheets.batchUpdate', write=True)
+        self.formats.append((ranges, fmt))
+
+    def merge_cells(self, name: str, merge_type: str = 'MERGE_ALL'):
+        self._backend.request('spreadsheets.batchUpdate', write=True)
+        self.merges.append(name)
+
+    def clear(self):
+        self._backend.request('values.clear', write=True)
+        self.cells = []
+
+
+# ─── ТАБЛИЦА ─────────────────────────────────────────────────────────────────
+
+class FakeSpreadsheet:
+    def __init__(self, backend: FakeBackend):
+        self.backend  = backend
+        self._sheets: Dict[str, FakeWorksheet] = {}
+        self._next_id = 1
+
+    def worksheets(self) -> List[FakeWorksheet]:
+        self.backend.request('spreadsheets.get')
+        return list(self._sheets.values())
+
+    def worksheet(self, title: str) -> FakeWorksheet:
+        self.backend.request('spreadsheets.get')
+        try:
+            return self._sheets[title]
+        except KeyError:
+            raise WorksheetNotFound(title)
+
+    def add_worksheet(self, title: str, rows: int = 100, cols: int = 26, **kwargs) -> FakeWorksheet:
+        self.backend.request('spreadsheets.batchUpdate', write=True)
+        ws = FakeWorksheet(self.backend, self._next_id, title, rows, cols)
+        self._next_id += 1
+        self._sheets[title] = ws
+        return ws
+
+    def get_lastUpdateTime(self) -> str:
+        self.backend.request('drive.files.get')
+        return self.backend.modified
+
+    def fetch_sheet_metadata(self, params: dict = None) -> dict:
+        self.backend.request('spreadsheets.get')
+        return {'sheets': [{
+            'properties': {'sheetId': ws.id, 'title': ws.title,
+                           'gridProperties': {'rowCount': ws.row_count,
+                                              'columnCount': ws.col_count}},
+            'bandedRanges': [{'bandedRangeId': ws.id}] if ws.banded else [],
+            'conditionalFormats': list(ws.conditional_formats),
+        } for ws in self._sheets.values()]}
+
+    def batch_update(self, body: dict) -> dict:
+        """Структурные запросы spreadsheets.batchUpdate: то, что влияет на состояние."""
+        self.backend.request('spreadsheets.batchUpdate', write=True)
+        by_id = {ws.id: ws for ws in self._sheets.values()}
+        for req in body.get('requests', []):
+            kind, args = next(iter(req.items()))
+            if kind == 'deleteDimension':
+                r = args['range']
+                ws = by_id[r['sheetId']]
+                if r['dimension'] == 'ROWS':
+                    del ws.cells[r['startIndex']:r['endIndex']]
+            elif kind == 'appendDimension':
+                ws = by_id[args['sheetId']]
+                if args['dimension'] == 'COLUMNS':
+                    ws.col_count += args['length']
+                else:
+                    ws.row_count += args['length']
+            elif kind == 'addBanding':
+                by_id[args['bandedRange']['range']['sheetId']].banded = True
+            elif kind == 'addConditionalFormatRule':
+                rule = args['rule']
+                by_id[rule['ranges'][0]['sheetId']].conditional_formats.insert(args.get('index', 0), rule)
+            elif kind == 'deleteConditionalFormatRule':
+                by_id[args['sheetId']].conditional_formats.pop(args['index'])
+            elif kind == 'mergeCells':
+                by_id[args['range']['sheetId']].merges.append(args['range'])
+        return {'replies': [{} for _ in body.get('requests', [])]}
+
+    # ── для проверок ──
+
+    def sheet(self, title: str) -> FakeWorksheet:
+        """Лист без счёта запроса."""
+        return self._sheets[title]
+
+
+def fake_manager(latency: float = 0.0, error_rate: float = 0.0,
+                 seed: int = 0) -> Tuple[GoogleSheetsManager, FakeSpreadsheet]:
+    """GoogleSheetsManager, подключённый к фейковой таблице вместо Google."""
+    backend = FakeBackend(latency=latency, error_rate=error_rate, seed=seed)
+    manager = GoogleSheetsManager(spreadsheet_id=None)
+    manager.client      = backend
+    manager.spreadsheet = FakeSpreadsheet(backend)
+    return manager, manager.spreadsheet
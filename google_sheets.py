@@ -6,24 +6,31 @@ Google Sheets Manager — MTB Concerts Bot
   - Credentials из переменной окружения GOOGLE_CREDENTIALS_JSON (JSON-строка)
   - Убран циклический импорт from bot import ...
   - Стиль таблицы как в оригинальном xlsx (тёмный фон, жёлтые ссылки)
+  - gspread и авторизация — лениво, в connect(); модуль импортируется без credentials
 """
 
 import os
+import re
 import json
+import time
 import logging
 import calendar
+import hashlib
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Tuple
+
+import metrics
+from concert import Concert
 
 logger = logging.getLogger(__name__)
 
-try:
-    import gspread
-    from google.oauth2.service_account import Credentials
-    GSPREAD_AVAILABLE = True
-except ImportError:
-    GSPREAD_AVAILABLE = False
-    logger.warning("gspread не установлен. Google Sheets отключены.")
+# gspread и google-auth импортируются в connect(), а не здесь: они тянут
+# requests/urllib3/cryptography и заметно удлиняют старт бота. Модуль
+# импортируется и без них, и без credentials — Sheets просто отключены.
 
 SCOPES = [
     'https://www.googleapis.com/auth/spreadsheets',
@@ -52,6 +59,11 @@ C_CAL_GREEN  = {'red': 0.400, 'green': 0.859, 'blue': 0.498}  # готово
 C_CAL_ORANGE = {'red': 0.957, 'green': 0.800, 'blue': 0.600}  # частично
 C_CAL_RED    = {'red': 0.957, 'green': 0.329, 'blue': 0.329}  # мало
 
+# Коды статуса в скрытых колонках календаря → условные правила цвета
+CAL_HELPER_COLS   = 7        # H:N — по коду под каждой ячейкой A:G
+CAL_CODE_DATE     = 'D'      # ячейка с числом дня
+CAL_STATUS_COLORS = {'G': C_CAL_GREEN, 'O': C_CAL_ORANGE, 'R': C_CAL_RED}
+
 # Обратная совместимость
 C_BLACK    = C_ROW_EVEN
 C_DARKGRAY = C_ROW_ODD
@@ -62,25 +74,10 @@ MONTHS_RU   = [
     'Июль', 'Август', 'Сентябрь', 'Октябрь', 'Ноябрь', 'Декабрь'
 ]
 
-# ─── ВСПОМОГАТЕЛЬНОЕ ─────────────────────────────────────────────────────────
+DATA_HEADERS = [['Сайт', 'Дата', 'Время', 'Страничка', 'Артист',
+                 'Покупка билета', 'Картинка', 'Текст', 'Афиша', 'Статус', 'ID']]
 
-def _status_color_cal(c: Dict) -> Dict:
-    filled = sum([
-        c.get('poster_status') == 'approved',
-        bool(c.get('tickets_url')),
-        bool(c.get('description_text')),
-        bool(c.get('date')),
-    ])
-    if filled == 4: return C_CAL_GREEN
-    if filled >= 2: return C_CAL_ORANGE
-    return C_CAL_RED
-
-def _status_text(c: Dict) -> str:
-    missing = []
-    if c.get('poster_status') != 'approved': missing.append('афиша')
-    if not c.get('tickets_url'):             missing.append('билеты')
-    if not c.get('description_text'):        missing.append('текст')
-    return '✅ Готово' if not missing else '❌ ' + ', '.join(missing)
+# ─── ВСПОМОГАТЕЛЬНОЕ ─────────────────────────────────────────────────────────
 
 def _col_letter(n: int) -> str:
     result = ''
@@ -96,6 +93,16 @@ def _rgb(hex_str: str) -> Dict:
     r, g, b = int(h[0:2], 16), int(h[2:4], 16), int(h[4:6], 16)
     return {'red': r/255, 'green': g/255, 'blue': b/255}
 
+def _with_lock(name: str):
+    """Метод менеджера под threading-блокировкой: вызовы идут из пула потоков."""
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(self, *args, **kwargs):
+            with getattr(self, name):
+                return fn(self, *args, **kwargs)
+        return wrapper
+    return deco
+
 # ─── МЕНЕДЖЕР ────────────────────────────────────────────────────────────────
 
 class GoogleSheetsManager:
@@ -103,29 +110,65 @@ class GoogleSheetsManager:
         self.spreadsheet_id = spreadsheet_id
         self.client         = None
         self.spreadsheet    = None
+        # Лист 'Данные' и календари правятся из разных потоков AsyncSheetsManager
+        self._data_lock = threading.RLock()
+        self._cal_lock  = threading.RLock()
+        # Снимок листа 'Данные' для poll_changes
+        self._data_modified: Optional[str] = None
+        self._data_checksum: Optional[str] = None
+        self._data_snapshot: Dict[int, Concert] = {}
+        # Кэш листа 'Данные': номер строки по ID и последний применённый стиль строки
+        self._data_ws = None
+        self._data_styled = False
+        self._row_index:  Dict[str, int] = {}
+        self._row_index_full = False   # индекс построен по всему листу → промах = новой строки нет
+        self._row_styles: Dict[int, Tuple[str, Tuple]] = {}
+        # Кэш листов-календарей и месяцев, оформленных в этом процессе
+        self._cal_ws:     Dict[Tuple[int, int], object] = {}
+        self._cal_styled: set = set()
+        self._chats_ws = None
+        # Подключение — в connect(), один раз за процесс
+        self._connect_lock  = threading.Lock()
+        self._connect_tried = False
+
+    def connect(self) -> bool:
+        """
+        Импорт gspread, авторизация и open_by_key — при первом вызове.
+        Повторные вызовы ничего не делают: неудачная попытка не повторяется,
+        Sheets остаются отключены до перезапуска, как и раньше.
+        Блокирующий: из бота вызывается через AsyncSheetsManager.connect().
+        """
+        with self._connect_lock:
+            if self._connect_tried or self._is_connected():
+                return self._is_connected()
+            self._connect_tried = True
+            if not self.spreadsheet_id:
+                logger.info("GOOGLE_SHEETS_ID не задан — Sheets отключены")
+                return False
+            try:
+                import gspread
+                from google.oauth2.service_account import Credentials
+            except ImportError:
+                logger.warning("gspread не установлен. Google Sheets отключены.")
+                return False
 
-        if not GSPREAD_AVAILABLE:
-            return
-        if not spreadsheet_id:
-            logger.info("GOOGLE_SHEETS_ID не задан — Sheets отключены")
-            return
+            try:
+                # ✅ Берём credentials из переменной окружения, не из файла
+                creds_json = os.getenv('GOOGLE_CREDENTIALS_JSON')
+                if creds_json:
+                    creds_info = json.loads(creds_json)
+                    creds = Credentials.from_service_account_info(creds_info, scopes=SCOPES)
+                else:
+                    # Фолбэк на файл если есть
+                    creds_file = os.getenv('GOOGLE_CREDENTIALS_FILE', 'credentials.json')
+                    creds = Credentials.from_service_account_file(creds_file, scopes=SCOPES)
 
-        try:
-            # ✅ Берём credentials из переменной окружения, не из файла
-            creds_json = os.getenv('GOOGLE_CREDENTIALS_JSON')
-            if creds_json:
-                creds_info = json.loads(creds_json)
-                creds = Credentials.from_service_account_info(creds_info, scopes=SCOPES)
-            else:
-                # Фолбэк на файл если есть
-                creds_file = os.getenv('GOOGLE_CREDENTIALS_FILE', 'credentials.json')
-                creds = Credentials.from_service_account_file(creds_file, scopes=SCOPES)
-
-            self.client      = gspread.authorize(creds)
-            self.spreadsheet = self.client.open_by_key(spreadsheet_id)
-            logger.info("✅ Google Sheets подключён")
-        except Exception as e:
-            logger.error(f"Google Sheets init error: {e}")
+                self.client      = gspread.authorize(creds)
+                self.spreadsheet = self.client.open_by_key(self.spreadsheet_id)
+                logger.info("✅ Google Sheets подключён")
+            except Exception as e:
+                logger.error(f"Google Sheets init error: {e}")
+            return self._is_connected()
 
     def _is_connected(self) -> bool:
         return self.client is not None and self.spreadsheet is not None
@@ -133,13 +176,15 @@ class GoogleSheetsManager:
     # ── ЛИСТ "ДАННЫЕ" ────────────────────────────────────────────────────────
 
     def _get_or_create_data_sheet(self):
+        if self._data_ws is not None:
+            return self._data_ws
         try:
-            return self.spreadsheet.worksheet('Данные')
+            self._data_ws = self.spreadsheet.worksheet('Данные')
+            return self._data_ws
         except Exception:
             ws = self.spreadsheet.add_worksheet('Данные', rows=500, cols=11)
-            headers = [['Сайт', 'Дата', 'Время', 'Страничка', 'Артист',
-                        'Покупка билета', 'Картинка', 'Текст', 'Афиша', 'Статус', 'ID']]
-            ws.update('A1:K1', headers)
+            self._data_ws = ws
+            ws.update('A1:K1', DATA_HEADERS)
             # Стиль заголовка — как в оригинале: тёмно-серый фон, белый жирный
             ws.format('A1:K1', {
                 'backgroundColor': C_HEADER,
@@ -165,146 +210,183 @@ class GoogleSheetsManager:
                 pass
             return ws
 
-    def sync_concert(self, concert: Dict):
+    def sync_concert(self, concert: Concert):
         """Обновляет строку в листе Данные + пересобирает календарь месяца."""
         if not self._is_connected():
             return
         try:
             self._sync_data_row(concert)
-            if concert.get('date'):
+            if concert.date:
                 self._rebuild_calendar_for_concert(concert)
         except Exception as e:
             logger.error(f"sync_concert error: {e}")
 
-    def _sync_data_row(self, concert: Dict):
-        ws = self._get_or_create_data_sheet()
+    def _ensure_data_style(self, ws):
+        """
+        Разовое оформление листа 'Данные': чередование фона — banding листа,
+        жёлтые ссылки — формат колонок. Строки больше не красятся по одной.
+        """
+        if self._data_styled:
+            return
+        meta = self.spreadsheet.fetch_sheet_metadata(
+            {'fields': 'sheets(properties.sheetId,bandedRanges)'})
+        banded = any(sh.get('bandedRanges') for sh in meta.get('sheets', [])
+                     if sh.get('properties', {}).get('sheetId') == ws.id)
+        if not banded:
+            sheet_id = ws.id
+            requests = []
+            # Снять ручной фон со строк (иначе он перекрывает banding) + обычный текст
+            requests.append({'repeatCell': {
+                'range': {'sheetId': sheet_id, 'startRowIndex': 1,
+                          'startColumnIndex': 0, 'endColumnIndex': 11},
+                'cell': {'userEnteredFormat': {
+                    'textFormat': {'foregroundColor': C_LIGHT, 'fontSize': 9},
+                    'verticalAlignment': 'TOP',
+                    'wrapStrategy': 'WRAP',
+                }},
+                'fields': 'userEnteredFormat(backgroundColor,textFormat,verticalAlignment,wrapStrategy)',
+            }})
+            # Ссылки жёлтым (D=3, F=5, G=6 — 0-based)
+            for col_idx in [3, 5, 6]:
+                requests.append({'repeatCell': {
+                    'range': {'sheetId': sheet_id, 'startRowIndex': 1,
+                              'startColumnIndex': col_idx, 'endColumnIndex': col_idx + 1},
+                    'cell': {'userEnteredFormat': {
+                        'textFormat': {'foregroundColor': C_YELLOW, 'fontSize': 9},
+                    }},
+                    'fields': 'userEnteredFormat.textFormat',
+                }})
+            # Чередование: строка 2 (первая данных) = #424242, дальше через одну #070707
+            requests.append({'addBanding': {'bandedRange': {
+                'range': {'sheetId': sheet_id, 'startRowIndex': 1,
+                          'startColumnIndex': 0, 'endColumnIndex': 11},
+                'rowProperties': {
+                    'firstBandColor':  C_ROW_ODD,
+                    'secondBandColor': C_ROW_EVEN,
+                },
+            }}})
+            self.spreadsheet.batch_update({'requests': requests})
+        self._data_styled = True
+
+    def _remember_row(self, row: List[str], row_idx: int):
+        """
+        Собственная запись бота — не ручная правка: обновляем снимок,
+        чтобы poll_changes не вернул её обратно в память как изменение.
+        """
+        parsed = Concert.from_row(row, row_idx)
+        if parsed:
+            self._data_snapshot[parsed.id] = parsed
+
+    @staticmethod
+    def _row_holds(ws, row_idx: int, cid: str) -> bool:
+        """В колонке K строки row_idx всё ещё этот ID — один лёгкий запрос."""
+        values = ws.get(f'K{row_idx}')
+        return bool(values and values[0]) and str(values[0][0]).strip() == cid
+
+    def _find_data_row(self, ws, cid: str) -> Optional[int]:
+        row_idx = self._row_index.get(cid)
+        # Строки могли отсортировать или вставить руками — перед записью
+        # сверяем ID в кэшированной строке, при расхождении пересобираем индекс
+        if row_idx and self._row_holds(ws, row_idx, cid):
+            return row_idx
+        if not row_idx and self._row_index_full:
+            return None
+        # Индекс неполный или устарел — один полный проход, заодно обновляем индекс
         all_values = ws.get_all_values()
-        cid = str(concert.get('id', ''))
+        self._row_index = {
+            row[10]: i for i, row in enumerate(all_values[1:], start=2) if len(row) >= 11 and row[10]
+        }
+        self._row_index_full = True
+        return self._row_index.get(cid)
+
+    @_with_lock('_data_lock')
+    def _sync_data_row(self, concert: Concert):
+        ws = self._get_or_create_data_sheet()
+        self._ensure_data_style(ws)
+        cid = str(concert.id)
 
         # Ищем строку по ID (последняя колонка)
-        row_idx = None
-        for i, row in enumerate(all_values[1:], start=2):
-            if len(row) >= 11 and row[10] == cid:
-                row_idx = i
-                break
-
-        date_str = concert.get('date', '') or ''
-        time_str = concert.get('time', '') or ''
-        slug     = concert.get('slug', '')
-
-        row_data = [[
-            '✅' if concert.get('status') != 'cancelled' else '🚫',
-            date_str,
-            time_str,
-            f"https://mtbarmoscow.com/{slug}" if slug else '',
-            concert.get('artist', ''),
-            concert.get('tickets_url', '') or '',
-            concert.get('poster_file_id', '') or '',
-            (concert.get('description_text', '') or '')[:200],
-            '✅' if concert.get('poster_status') == 'approved' else '❌',
-            _status_text(concert),
-            cid,
-        ]]
-
-        # Чередование цветов строк
+        row_idx = self._find_data_row(ws, cid)
+
+        row_data = [concert.to_row()]
+
         if row_idx:
             ws.update(f'A{row_idx}:K{row_idx}', row_data)
-            bg = C_BLACK if row_idx % 2 == 0 else C_DARKGRAY
         else:
-            ws.append_row(row_data[0])
-            row_idx = len(ws.get_all_values())
-            bg = C_BLACK if row_idx % 2 == 0 else C_DARKGRAY
-
-        # Чередование: нечётные строки = #424242, чётные = #000000
-        # (строка 1 — заголовок, строка 2 = первая данных = нечётная)
-        bg = C_ROW_ODD if row_idx % 2 == 0 else C_ROW_EVEN
+            resp = ws.append_row(row_data[0])
+            m = re.search(r'![A-Z]+(\d+)', (resp or {}).get('updates', {}).get('updatedRange', ''))
+            row_idx = int(m.group(1)) if m else len(ws.get_all_values())
+            self._row_index[cid] = row_idx
+
+        self._remember_row(row_data[0], row_idx)
+
+        # Фон строки даёт banding листа, поэтому сигнатура стиля строки —
+        # только цвет статуса. Совпала с прошлой → ни одного format-запроса.
+        status_ok = concert.status_text() == '✅ Готово'
+        signature = (status_ok,)
+        applied   = self._row_styles.get(row_idx)
+        if applied == (cid, signature):
+            return
 
-        # Базовый стиль строки — через batchUpdate для точного контроля
         sheet_id = ws.id
         requests = []
 
-        # Весь ряд: фон + обычный текст
+        # Статус (J=9) — зелёный или красный
         requests.append({'repeatCell': {
             'range': {
                 'sheetId': sheet_id,
                 'startRowIndex': row_idx - 1, 'endRowIndex': row_idx,
-                'startColumnIndex': 0, 'endColumnIndex': 11,
+                'startColumnIndex': 9, 'endColumnIndex': 10,
             },
             'cell': {'userEnteredFormat': {
-                'backgroundColor': bg,
-                'textFormat': {'foregroundColor': C_LIGHT, 'fontSize': 9},
-                'verticalAlignment': 'TOP',
-                'wrapStrategy': 'WRAP',
+                'textFormat': {'foregroundColor': C_GREEN_TEXT if status_ok else C_RED_TEXT},
             }},
-            'fields': 'userEnteredFormat(backgroundColor,textFormat,verticalAlignment,wrapStrategy)',
+            'fields': 'userEnteredFormat.textFormat.foregroundColor',
         }})
 
-        # Ссылки жёлтым (D=3, F=5, G=6 — 0-based)
-        for col_idx in [3, 5, 6]:
-            requests.append({'repeatCell': {
+        # Высота строки — 49.5px как в оригинале (≈66 пикселей API = 49.5pt);
+        # только для строки, которую в этом процессе ещё не трогали
+        if applied is None or applied[0] != cid:
+            requests.append({'updateDimensionProperties': {
                 'range': {
                     'sheetId': sheet_id,
-                    'startRowIndex': row_idx - 1, 'endRowIndex': row_idx,
-                    'startColumnIndex': col_idx, 'endColumnIndex': col_idx + 1,
+                    'dimension': 'ROWS',
+                    'startIndex': row_idx - 1,
+                    'endIndex': row_idx,
                 },
-                'cell': {'userEnteredFormat': {
-                    'backgroundColor': bg,
-                    'textFormat': {'foregroundColor': C_YELLOW, 'fontSize': 9},
-                }},
-                'fields': 'userEnteredFormat(backgroundColor,textFormat)',
+                'properties': {'pixelSize': 66},
+                'fields': 'pixelSize',
             }})
 
-        # Статус (J=9) — зелёный или красный
-        status_ok = (concert.get('poster_status') == 'approved' and
-                     concert.get('tickets_url') and concert.get('description_text'))
-        requests.append({'repeatCell': {
-            'range': {
-                'sheetId': sheet_id,
-                'startRowIndex': row_idx - 1, 'endRowIndex': row_idx,
-                'startColumnIndex': 9, 'endColumnIndex': 10,
-            },
-            'cell': {'userEnteredFormat': {
-                'backgroundColor': bg,
-                'textFormat': {
-                    'foregroundColor': C_GREEN_TEXT if status_ok else C_RED_TEXT,
-                    'fontSize': 9,
-                },
-            }},
-            'fields': 'userEnteredFormat(backgroundColor,textFormat)',
-        }})
-
-        # Высота строки — 49.5px как в оригинале (≈66 пикселей API = 49.5pt)
-        requests.append({'updateDimensionProperties': {
-            'range': {
-                'sheetId': sheet_id,
-                'dimension': 'ROWS',
-                'startIndex': row_idx - 1,
-                'endIndex': row_idx,
-            },
-            'properties': {'pixelSize': 66},
-            'fields': 'pixelSize',
-        }})
-
-        if requests:
-            self.spreadsheet.batch_update({'requests': requests})
+        self.spreadsheet.batch_update({'requests': requests})
+        self._row_styles[row_idx] = (cid, signature)
 
     # ── CALENDAR ─────────────────────────────────────────────────────────────
+    # Цвета ячеек календаря — фиксированный набор условных правил по скрытым
+    # колонкам H:N (код статуса под каждой ячейкой A:G). Перерисовка месяца
+    # пишет только значения; оформление — один раз на лист за процесс.
 
     def _get_or_create_calendar_sheet(self, month: int, year: int):
+        ws = self._cal_ws.get((month, year))
+        if ws is not None:
+            return ws
         sheet_name = f"{MONTHS_RU[month]} {year}"
         try:
-            return self.spreadsheet.worksheet(sheet_name)
+            ws = self.spreadsheet.worksheet(sheet_name)
         except Exception:
-            return self.spreadsheet.add_worksheet(sheet_name, rows=50, cols=7)
+            ws = self.spreadsheet.add_worksheet(sheet_name, rows=50, cols=7 + CAL_HELPER_COLS)
+        self._cal_ws[(month, year)] = ws
+        return ws
 
-    def _rebuild_calendar_for_concert(self, concert: Dict):
+    def _rebuild_calendar_for_concert(self, concert: Concert):
         try:
-            dt = datetime.strptime(concert['date'], '%d.%m.%Y')
+            dt = datetime.strptime(concert.date, '%d.%m.%Y')
         except Exception:
             return
         self.rebuild_month_calendar(dt.month, dt.year)
 
-    def rebuild_month_calendar(self, month: int, year: int, all_concerts: List[Dict] = None):
+    @_with_lock('_cal_lock')
+    def rebuild_month_calendar(self, month: int, year: int, all_concerts: List[Concert] = None):
         """
         Перестраивает лист-календарь.
         all_concerts передаётся снаружи чтобы избежать циклического импорта.
@@ -313,130 +395,153 @@ class GoogleSheetsManager:
             return
         try:
             ws = self._get_or_create_calendar_sheet(month, year)
-            ws.clear()
+            if (month, year) not in self._cal_styled:
+                ws.clear()
+                self._style_calendar(ws, month, year)
+                self._cal_styled.add((month, year))
             self._draw_calendar(ws, month, year, all_concerts or [])
         except Exception as e:
             logger.error(f"rebuild_month_calendar error: {e}")
 
-    def _draw_calendar(self, ws, month: int, year: int, all_concerts: List[Dict]):
+    def _draw_calendar(self, ws, month: int, year: int, all_concerts: List[Concert]):
+        """Только значения: сетка A:G + коды статусов H:N — один запрос."""
         sheet_name = f"{MONTHS_RU[month]} {year}"
 
         # Концерты по дням этого месяца
-        concerts_by_day: Dict[int, List[Dict]] = {}
+        concerts_by_day: Dict[int, List[Concert]] = {}
         for c in all_concerts:
-            if not c.get('date'):
+            if not c.date:
                 continue
             try:
-                dt = datetime.strptime(c['date'], '%d.%m.%Y')
+                dt = datetime.strptime(c.date, '%d.%m.%Y')
                 if dt.month == month and dt.year == year:
                     concerts_by_day.setdefault(dt.day, []).append(c)
             except Exception:
                 pass
 
-        # Строка 1 — заголовок месяца (bg=#000000, fg=#F4CC99, bold, 16px)
-        ws.merge_cells('A1:G1')
-        ws.update('A1', [[f"АФИША МЕРОПРИЯТИЙ — {MONTHS_RU[month].upper()} {year}"]])
-        ws.format('A1:G1', {
-            'backgroundColor': C_TITLE_BG,
-            'textFormat': {'bold': True, 'fontSize': 16, 'foregroundColor': C_YELLOW},
-            'horizontalAlignment': 'CENTER',
-            'verticalAlignment': 'MIDDLE',
-        })
+        batch = [
+            {'range': 'A1', 'values': [[f"АФИША МЕРОПРИЯТИЙ — {MONTHS_RU[month].upper()} {year}"]]},
+            {'range': 'A2:G2', 'values': [WEEKDAYS_RU]},
+        ]
 
-        # Строка 2 — дни недели (bg=#424242, fg=#FFFFFF, bold, 11px)
-        ws.update('A2:G2', [WEEKDAYS_RU])
-        ws.format('A2:G2', {
-            'backgroundColor': C_HEADER,
-            'textFormat': {'bold': True, 'foregroundColor': C_WHITE, 'fontSize': 11},
-            'horizontalAlignment': 'CENTER',
-        })
-
-        # Сетка дней
-        cal        = calendar.monthcalendar(year, month)
-        batch      = []
+        # Сетка дней: на неделю 4 строки (число + 3 концерта), справа — коды
+        cal         = calendar.monthcalendar(year, month)
         current_row = 3
+        last_col    = _col_letter(7 + CAL_HELPER_COLS)
 
         for week in cal:
-            row_days  = [''] * 7
-            row_info1 = [''] * 7
-            row_info2 = [''] * 7
-            row_info3 = [''] * 7
-
+            block = [[''] * (7 + CAL_HELPER_COLS) for _ in range(4)]
             for day_idx, day in enumerate(week):
                 if day == 0:
-                    pass  # оставляем пустые строки
-                else:
-                    row_days[day_idx] = str(day)
-                    day_cs = concerts_by_day.get(day, [])
-                    info   = ['', '', '']
-                    for i, c in enumerate(day_cs[:3]):
-                        t = f" {c['time']}" if c.get('time') else ''
-                        info[i] = f"{c.get('artist','')}{t}\n{_status_text(c)}"
-                    row_info1[day_idx] = info[0]
-                    row_info2[day_idx] = info[1]
-                    row_info3[day_idx] = info[2]
+                    continue  # оставляем пустые строки
+                block[0][day_idx]     = str(day)
+                block[0][7 + day_idx] = CAL_CODE_DATE
+                for i, c in enumerate(concerts_by_day.get(day, [])[:3]):
+                    t = f" {c.time}" if c.time else ''
+                    block[i + 1][day_idx]     = f"{c.artist}{t}\n{c.status_text()}"
+                    block[i + 1][7 + day_idx] = c.cal_code()
 
             r = current_row
-            batch += [
-                {'range': f'A{r}:G{r}',     'values': [row_days]},
-                {'range': f'A{r+1}:G{r+1}', 'values': [row_info1]},
-                {'range': f'A{r+2}:G{r+2}', 'values': [row_info2]},
-                {'range': f'A{r+3}:G{r+3}', 'values': [row_info3]},
-            ]
+            batch.append({'range': f'A{r}:{last_col}{r+3}', 'values': block})
             current_row += 4
 
         ws.batch_update(batch)
+        logger.info(f"✅ Календарь '{sheet_name}' обновлён")
 
-        # Форматирование через Sheets API
+    def _style_calendar(self, ws, month: int, year: int):
+        """Разовое оформление листа-календаря. Число запросов не зависит от концертов."""
         sheet_id  = ws.id
+        cal       = calendar.monthcalendar(year, month)
+        grid_end  = 2 + len(cal) * 4
         requests  = []
-        current_row = 3
 
-        for week in cal:
-            for col_idx, day in enumerate(week):
-                if day == 0:
-                    current_row_unused = None
-                else:
-                    day_cs = concerts_by_day.get(day, [])
-
-                    # Номер дня
-                    requests.append({'repeatCell': {
-                        'range': {
-                            'sheetId': sheet_id,
-                            'startRowIndex': current_row - 1,
-                            'endRowIndex': current_row,
-                            'startColumnIndex': col_idx,
-                            'endColumnIndex': col_idx + 1,
-                        },
-                        'cell': {'userEnteredFormat': {
-                            'backgroundColor': C_CAL_DATE,
-                            'textFormat': {'bold': True, 'fontSize': 11},
-                            'horizontalAlignment': 'LEFT',
-                            'verticalAlignment': 'MIDDLE',
-                        }},
-                        'fields': 'userEnteredFormat(backgroundColor,textFormat,horizontalAlignment,verticalAlignment)',
-                    }})
-
-                    # Ячейки концертов
-                    for i, c in enumerate(day_cs[:3]):
-                        requests.append({'repeatCell': {
-                            'range': {
-                                'sheetId': sheet_id,
-                                'startRowIndex': current_row + i,
-                                'endRowIndex': current_row + i + 1,
-                                'startColumnIndex': col_idx,
-                                'endColumnIndex': col_idx + 1,
-                            },
-                            'cell': {'userEnteredFormat': {
-                                'backgroundColor': _status_color_cal(c),
-                                'textFormat': {'fontSize': 9, 'foregroundColor': C_BLACK},
-                                'wrapStrategy': 'WRAP',
-                                'verticalAlignment': 'TOP',
-                            }},
-                            'fields': 'userEnteredFormat(backgroundColor,textFormat,wrapStrategy,verticalAlignment)',
-                        }})
+        # Старые условные правила листа — удалить, иначе набор будет расти
+        meta = self.spreadsheet.fetch_sheet_metadata(
+            {'fields': 'sheets(properties.sheetId,conditionalFormats)'})
+        for sh in meta.get('sheets', []):
+            if sh.get('properties', {}).get('sheetId') == sheet_id:
+                for idx in reversed(range(len(sh.get('conditionalFormats', [])))):
+                    requests.append({'deleteConditionalFormatRule': {'sheetId': sheet_id, 'index': idx}})
+
+        # Место под скрытые колонки кодов
+        if ws.col_count < 7 + CAL_HELPER_COLS:
+            requests.append({'appendDimension': {
+                'sheetId': sheet_id, 'dimension': 'COLUMNS',
+                'length': 7 + CAL_HELPER_COLS - ws.col_count,
+            }})
 
-            current_row += 4
+        # Строка 1 — заголовок месяца (bg=#000000, fg=#F4CC99, bold, 16px)
+        requests.append({'mergeCells': {
+            'range': {'sheetId': sheet_id, 'startRowIndex': 0, 'endRowIndex': 1,
+                      'startColumnIndex': 0, 'endColumnIndex': 7},
+            'mergeType': 'MERGE_ALL',
+        }})
+        requests.append({'repeatCell': {
+            'range': {'sheetId': sheet_id, 'startRowIndex': 0, 'endRowIndex': 1,
+                      'startColumnIndex': 0, 'endColumnIndex': 7},
+            'cell': {'userEnteredFormat': {
+                'backgroundColor': C_TITLE_BG,
+                'textFormat': {'bold': True, 'fontSize': 16, 'foregroundColor': C_YELLOW},
+                'horizontalAlignment': 'CENTER',
+                'verticalAlignment': 'MIDDLE',
+            }},
+            'fields': 'userEnteredFormat(backgroundColor,textFormat,horizontalAlignment,verticalAlignment)',
+        }})
+
+        # Строка 2 — дни недели (bg=#424242, fg=#FFFFFF, bold, 11px)
+        requests.append({'repeatCell': {
+            'range': {'sheetId': sheet_id, 'startRowIndex': 1, 'endRowIndex': 2,
+                      'startColumnIndex': 0, 'endColumnIndex': 7},
+            'cell': {'userEnteredFormat': {
+                'backgroundColor': C_HEADER,
+                'textFormat': {'bold': True, 'foregroundColor': C_WHITE, 'fontSize': 11},
+                'horizontalAlignment': 'CENTER',
+            }},
+            'fields': 'userEnteredFormat(backgroundColor,textFormat,horizontalAlignment)',
+        }})
+
+        # Фон всех ячеек сетки = #000000
+        requests.append({'repeatCell': {
+            'range': {'sheetId': sheet_id, 'startRowIndex': 2, 'endRowIndex': grid_end,
+                      'startColumnIndex': 0, 'endColumnIndex': 7},
+            'cell': {'userEnteredFormat': {
+                'backgroundColor': C_CAL_CELL,
+                'textFormat': {'foregroundColor': C_LIGHT, 'fontSize': 9},
+                'wrapStrategy': 'WRAP',
+                'verticalAlignment': 'TOP',
+            }},
+            'fields': 'userEnteredFormat(backgroundColor,textFormat,wrapStrategy,verticalAlignment)',
+        }})
+
+        # Строки с числами — крупнее (размер шрифта условным форматом не задать)
+        r = 3
+        for _ in cal:
+            requests.append({'repeatCell': {
+                'range': {'sheetId': sheet_id, 'startRowIndex': r - 1, 'endRowIndex': r,
+                          'startColumnIndex': 0, 'endColumnIndex': 7},
+                'cell': {'userEnteredFormat': {
+                    'textFormat': {'bold': True, 'fontSize': 11},
+                    'horizontalAlignment': 'LEFT',
+                    'verticalAlignment': 'MIDDLE',
+                }},
+                'fields': 'userEnteredFormat(textFormat,horizontalAlignment,verticalAlignment)',
+            }})
+            r += 4
+
+        # Условные правила: код в H:N красит соседнюю ячейку A:G
+        grid = {'sheetId': sheet_id, 'startRowIndex': 2, 'endRowIndex': grid_end,
+                'startColumnIndex': 0, 'endColumnIndex': 7}
+        rules = [(CAL_CODE_DATE, C_CAL_DATE, C_CAL_TEXT)]
+        rules += [(code, color, C_BLACK) for code, color in CAL_STATUS_COLORS.items()]
+        for code, bg, fg in rules:
+            requests.append({'addConditionalFormatRule': {'rule': {
+                'ranges': [grid],
+                'booleanRule': {
+                    'condition': {'type': 'CUSTOM_FORMULA',
+                                  'values': [{'userEnteredValue': f'=H3="{code}"'}]},
+                    'format': {'backgroundColor': bg, 'textFormat': {'foregroundColor': fg}},
+                },
+            }}})
 
         # Высоты строк (точно как в xlsx)
         # row 1 заголовок = 33.75pt ≈ 45px
@@ -450,9 +555,7 @@ class GoogleSheetsManager:
         for _ in cal:
             requests += [
                 {'updateDimensionProperties': {'range': {'sheetId': sheet_id, 'dimension': 'ROWS', 'startIndex': r-1, 'endIndex': r},   'properties': {'pixelSize': 22}, 'fields': 'pixelSize'}},
-                {'updateDimensionProperties': {'range': {'sheetId': sheet_id, 'dimension': 'ROWS', 'startIndex': r,   'endIndex': r+1}, 'properties': {'pixelSize': 55}, 'fields': 'pixelSize'}},
-                {'updateDimensionProperties': {'range': {'sheetId': sheet_id, 'dimension': 'ROWS', 'startIndex': r+1, 'endIndex': r+2}, 'properties': {'pixelSize': 55}, 'fields': 'pixelSize'}},
-                {'updateDimensionProperties': {'range': {'sheetId': sheet_id, 'dimension': 'ROWS', 'startIndex': r+2, 'endIndex': r+3}, 'properties': {'pixelSize': 55}, 'fields': 'pixelSize'}},
+                {'updateDimensionProperties': {'range': {'sheetId': sheet_id, 'dimension': 'ROWS', 'startIndex': r,   'endIndex': r+3}, 'properties': {'pixelSize': 55}, 'fields': 'pixelSize'}},
             ]
             r += 4
 
@@ -462,152 +565,299 @@ class GoogleSheetsManager:
             'properties': {'pixelSize': 160}, 'fields': 'pixelSize',
         }})
 
-        # Фон всех пустых ячеек = #000000
-        requests.append({'repeatCell': {
-            'range': {'sheetId': sheet_id, 'startRowIndex': 2, 'endRowIndex': 2 + len(cal) * 4,
-                      'startColumnIndex': 0, 'endColumnIndex': 7},
-            'cell': {'userEnteredFormat': {
-                'backgroundColor': C_CAL_CELL,
-                'textFormat': {'foregroundColor': C_LIGHT, 'fontSize': 9},
-            }},
-            'fields': 'userEnteredFormat(backgroundColor,textFormat)',
+        # Колонки с кодами статусов скрыты
+        requests.append({'updateDimensionProperties': {
+            'range': {'sheetId': sheet_id, 'dimension': 'COLUMNS',
+                      'startIndex': 7, 'endIndex': 7 + CAL_HELPER_COLS},
+            'properties': {'hiddenByUser': True}, 'fields': 'hiddenByUser',
         }})
 
-        if requests:
-            self.spreadsheet.batch_update({'requests': requests})
+        self.spreadsheet.batch_update({'requests': requests})
 
-        logger.info(f"✅ Календарь '{sheet_name}' обновлён")
+    def rebuild_calendars(self, months: List[Tuple[int, int]], all_concerts: List[Concert]):
+        """Перерисовывает перечисленные (год, месяц) — каждый ровно один раз."""
+        if not self._is_connected():
+            return
+        for year, month in sorted(set(months)):
+            self.rebuild_month_calendar(month, year, all_concerts)
 
-    def rebuild_all_calendars(self, all_concerts: List[Dict]):
+    def rebuild_all_calendars(self, all_concerts: List[Concert]):
         """Пересобирает все календари. Концерты передаются снаружи."""
         if not self._is_connected():
             return
         try:
             months = set()
             for c in all_concerts:
-                if c.get('date'):
+                if c.date:
                     try:
-                        dt = datetime.strptime(c['date'], '%d.%m.%Y')
-                        months.add((dt.month, dt.year))
+                        dt = datetime.strptime(c.date, '%d.%m.%Y')
+                        months.add((dt.year, dt.month))
                     except Exception:
                         pass
-            for month, year in months:
-                month_concerts = [
-                    c for c in all_concerts
-                    if c.get('date') and datetime.strptime(c['date'], '%d.%m.%Y').month == month
-                ]
-                self.rebuild_month_calendar(month, year, month_concerts)
+            # _draw_calendar сам отбирает концерты по месяцу и году
+            self.rebuild_calendars(list(months), all_concerts)
         except Exception as e:
             logger.error(f"rebuild_all_calendars error: {e}")
 
+    # ── АРХИВ ────────────────────────────────────────────────────────────────
+
+    def _get_or_create_archive_sheet(self, year: int):
+        sheet_name = f"Архив {year}"
+        try:
+            return self.spreadsheet.worksheet(sheet_name)
+        except Exception:
+            ws = self.spreadsheet.add_worksheet(sheet_name, rows=100, cols=11)
+            ws.update('A1:K1', DATA_HEADERS)
+            ws.format('A1:K1', {
+                'backgroundColor': C_HEADER,
+                'textFormat': {'bold': True, 'foregroundColor': C_WHITE, 'fontSize': 10},
+                'horizontalAlignment': 'CENTER',
+            })
+            return ws
+
+    @_with_lock('_data_lock')
+    def compact_archive(self, older_than_days: int) -> List[int]:
+        """
+        Переносит отменённые/архивные строки с датой старше N дней
+        из 'Данные' в листы 'Архив YYYY'. Возвращает id перенесённых концертов.
+        Одна дозапись на каждый год + один batch_update на удаление строк.
+        """
+        if not self._is_connected():
+            return []
+        try:
+            ws   = self._get_or_create_data_sheet()
+            rows = ws.get_all_values()
+            today = datetime.now().date()
+
+            ids = [int(r[10]) for r in rows[1:] if len(r) >= 11 and r[10].strip().isdigit()]
+            # Строку с максимальным ID не трогаем: после перезапуска ConcertStore.next_id
+            # считает от максимума в листе
+            max_id = max(ids, default=0)
+
+            by_year: Dict[int, List[List[str]]] = {}
+            moved_rows: List[int] = []
+            moved_ids:  List[int] = []
+            for i, row in enumerate(rows[1:], start=2):
+                row = list(row) + [''] * (11 - len(row))
+                cid = row[10].strip()
+                if not cid.isdigit() or int(cid) == max_id:
+                    continue
+                if row[0].strip() != '🚫' and row[9].strip() != 'archived':
+                    continue
+                try:
+                    dt = datetime.strptime(row[1].strip(), '%d.%m.%Y').date()
+                except ValueError:
+                    continue
+                if (today - dt).days < older_than_days:
+                    continue
+                by_year.setdefault(dt.year, []).append(row[:11])
+                moved_rows.append(i)
+                moved_ids.append(int(cid))
+
+            if not moved_rows:
+                return []
+
+            for year, year_rows in sorted(by_year.items()):
+                self._get_or_create_archive_sheet(year).append_rows(year_rows)
+
+            # Удаляем снизу вверх, чтобы индексы не съезжали
+            self.spreadsheet.batch_update({'requests': [
+                {'deleteDimension': {'range': {
+                    'sheetId': ws.id, 'dimension': 'ROWS',
+                    'startIndex': i - 1, 'endIndex': i,
+                }}}
+                for i in sorted(moved_rows, reverse=True)
+            ]})
+
+            for cid in moved_ids:
+                self._data_snapshot.pop(cid, None)
+            self._data_checksum = None
+            # Строки сдвинулись — индекс и стили строк пересоберутся при следующей записи
+            self._row_index  = {}
+            self._row_index_full = False
+            self._row_styles = {}
+            logger.info(f"📦 В архив перенесено строк: {len(moved_ids)}")
+            return moved_ids
+        except Exception as e:
+            logger.error(f"compact_archive error: {e}")
+            return []
+
     # ── МЕТОДЫ КОТОРЫЕ НУЖНЫ bot.py (in-memory режим) ───────────────────────
 
     def is_connected(self) -> bool:
         return self._is_connected()
 
-    def next_id(self, concerts: list) -> int:
-        """Следующий ID — максимальный существующий + 1."""
-        if not concerts:
-            return 1
-        return max((c.get('id', 0) for c in concerts), default=0) + 1
-
+    @_with_lock('_data_lock')
     def load_all_concerts(self) -> list:
         """
         Загружает все концерты из листа 'Данные'.
-        Возвращает список dict совместимых с bot.py.
+        Возвращает список Concert.
+        Заодно запоминает снимок листа для poll_changes.
+        Ошибка чтения — исключение, не пустой список (см. AsyncSheetsManager).
+        Пустой список — только когда таблица не задана вовсе.
         """
         if not self._is_connected():
-            logger.warning("Sheets не подключён — стартуем с пустым списком")
+            if self.spreadsheet_id:
+                raise RuntimeError("Sheets не подключён — концерты не загрузить")
+            logger.warning("GOOGLE_SHEETS_ID не задан — стартуем с пустым списком")
             return []
         try:
             ws   = self._get_or_create_data_sheet()
             rows = ws.get_all_values()
-            if len(rows) <= 1:
-                return []
-
-            concerts = []
-            for i, row in enumerate(rows[1:], start=2):
-                # Колонки: Сайт, Дата, Время, Страничка, Артист, Билеты, Картинка, Текст, Афиша, Статус, ID
-                while len(row) < 11:
-                    row.append('')
-                cid = row[10].strip()
-                if not cid.isdigit():
-                    continue
-                concerts.append({
-                    'id':               int(cid),
-                    'artist':           row[4].strip().rstrip(' —').strip(),
-                    'date':             row[1].strip() or None,
-                    'time':             row[2].strip() or None,
-                    'poster_status':    'approved' if row[8].strip() == '✅' else 'none',
-                    'poster_file_id':   row[6].strip() or None,
-                    'tickets_url':      row[5].strip() or None,
-                    'description_text': row[7].strip() or None,
-                    'status':           row[9].strip() if row[9].strip() in ('draft','published','cancelled','archived') else 'draft',
-                    '_row':             i,
-                })
+            concerts = self._parse_data_rows(rows)
+            self._remember_snapshot(rows, concerts)
             logger.info(f"✅ Загружено концертов из Sheets: {len(concerts)}")
             return concerts
         except Exception as e:
             logger.error(f"load_all_concerts error: {e}")
-            return []
+            raise
+
+    def _parse_data_rows(self, rows: List[List[str]]) -> List[Concert]:
+        concerts = []
+        for i, row in enumerate(rows[1:], start=2):
+            c = Concert.from_row(row, i)
+            if c:
+                concerts.append(c)
+        return concerts
+
+    # ── ФОНОВОЕ ОБНОВЛЕНИЕ (ручные правки в "Данные") ──────────────────────
+
+    @staticmethod
+    def _checksum(rows: List[List[str]]) -> str:
+        raw = json.dumps(rows, ensure_ascii=False, separators=(',', ':'))
+        return hashlib.blake2b(raw.encode('utf-8'), digest_size=16).hexdigest()
+
+    def _remember_snapshot(self, rows: List[List[str]], concerts: List[Concert]):
+        self._data_checksum = self._checksum(rows)
+        self._data_snapshot = {c.id: c for c in concerts}
+        self._row_index     = {str(c.id): c.row for c in concerts}
+        self._row_index_full = True
+
+    def _modified_time(self) -> Optional[str]:
+        """Время последнего изменения таблицы из Drive — один лёгкий запрос."""
+        try:
+            if hasattr(self.spreadsheet, 'get_lastUpdateTime'):
+                return self.spreadsheet.get_lastUpdateTime()
+            self.spreadsheet.update_drive_metadata()
+            return self.spreadsheet._properties.get('modifiedTime')
+        except Exception as e:
+            logger.debug(f"modifiedTime недоступен: {e}")
+            return None
+
+    @_with_lock('_data_lock')
+    def poll_changes(self) -> Optional[Tuple[List[Dict], List[int]]]:
+        """
+        Дешёвая проверка ручных правок листа 'Данные':
+          1. время изменения таблицы — не менялось → выходим без чтения значений;
+          2. контрольная сумма значений — совпала → выходим;
+          3. построчный diff с прошлым снимком.
+        Возвращает (изменения, удалённые id) или None.
+        В изменениях — id + только изменившиеся поля (для новых строк — все поля).
+        """
+        if not self._is_connected():
+            return None
+        try:
+            modified = self._modified_time()
+            if modified and modified == self._data_modified:
+                return None
+
+            ws   = self._get_or_create_data_sheet()
+            rows = ws.get_all_values()
+            self._data_modified = modified
+            checksum = self._checksum(rows)
+            if checksum == self._data_checksum:
+                return None
+
+            old      = self._data_snapshot
+            concerts = self._parse_data_rows(rows)
+            changed  = []
+            for c in concerts:
+                prev = old.get(c.id)
+                if prev is None:
+                    changed.append(dict(c.fields(), id=c.id, row=c.row))
+                    continue
+                diff = {k: v for k, v in c.fields().items() if getattr(prev, k) != v}
+                if diff:
+                    diff['id'] = c.id
+                    changed.append(diff)
+            seen    = {c.id for c in concerts}
+            removed = [cid for cid in old if cid not in seen]
+
+            self._remember_snapshot(rows, concerts)
+            if not changed and not removed:
+                return None
+            return changed, removed
+        except Exception as e:
+            logger.error(f"poll_changes error: {e}")
+            return None
+
+    def _get_or_create_chats_sheet(self):
+        if self._chats_ws is None:
+            try:
+                self._chats_ws = self.spreadsheet.worksheet('Чаты')
+            except Exception:
+                self._chats_ws = self.spreadsheet.add_worksheet('Чаты', rows=100, cols=1)
+                self._chats_ws.update('A1', [['chat_id']])
+        return self._chats_ws
 
     def load_chats(self) -> list:
         """Загружает зарегистрированные chat_id из листа 'Чаты'."""
         if not self._is_connected():
             return []
         try:
-            try:
-                ws = self.spreadsheet.worksheet('Чаты')
-            except Exception:
-                ws = self.spreadsheet.add_worksheet('Чаты', rows=100, cols=1)
-                ws.update('A1', [['chat_id']])
-                return []
-            rows = ws.get_all_values()
+            rows = self._get_or_create_chats_sheet().get_all_values()
             return [int(r[0]) for r in rows[1:] if r and r[0].lstrip('-').isdigit()]
         except Exception as e:
             logger.error(f"load_chats error: {e}")
             return []
 
-    def save_chat(self, chat_id: int, all_chats: list):
-        """Добавляет chat_id в лист 'Чаты' если его там нет."""
+    def save_chats(self, chat_ids: List[int]) -> bool:
+        """
+        Дописывает новые chat_id в лист 'Чаты' одним append.
+        Лист не перечитывается: что новое, решает ChatRegistry в боте.
+        False — запись не удалась, пачку стоит повторить.
+        """
         if not self._is_connected():
-            return
+            return True
+        if not chat_ids:
+            return True
         try:
-            try:
-                ws = self.spreadsheet.worksheet('Чаты')
-            except Exception:
-                ws = self.spreadsheet.add_worksheet('Чаты', rows=100, cols=1)
-                ws.update('A1', [['chat_id']])
-            existing = [r[0] for r in ws.get_all_values()[1:] if r]
-            if str(chat_id) not in existing:
-                ws.append_row([chat_id])
+            self._get_or_create_chats_sheet().append_rows([[cid] for cid in chat_ids])
+            return True
         except Exception as e:
-            logger.error(f"save_chat error: {e}")
+            logger.error(f"save_chats error: {e}")
+            return False
 
-    def sync_concert(self, concert: dict, all_concerts: list = None):
+    def sync_concert(self, concert: Concert, all_concerts: list = None,
+                     months: Optional[List[Tuple[int, int]]] = None):
         """
         Обновляет строку концерта в листе 'Данные' + пересобирает календарь.
         all_concerts используется для календаря (чтобы показать все события).
+        months — грязные (год, месяц) из хранилища: перерисовываются они,
+        включая старый месяц при переносе даты.
         """
         if not self._is_connected():
             return
         try:
             self._sync_data_row(concert)
-            if concert.get('date') and all_concerts is not None:
+            if months is not None:
+                self.rebuild_calendars(months, all_concerts or [])
+            elif concert.date and all_concerts is not None:
                 self._rebuild_calendar_for_concert_with_list(concert, all_concerts)
-            elif concert.get('date'):
+            elif concert.date:
                 self._rebuild_calendar_for_concert(concert)
         except Exception as e:
             logger.error(f"sync_concert error: {e}")
 
-    def _rebuild_calendar_for_concert_with_list(self, concert: dict, all_concerts: list):
+    def _rebuild_calendar_for_concert_with_list(self, concert: Concert, all_concerts: list):
         try:
-            dt = datetime.strptime(concert['date'], '%d.%m.%Y')
+            dt = datetime.strptime(concert.date, '%d.%m.%Y')
         except Exception:
             return
         self.rebuild_month_calendar(dt.month, dt.year, all_concerts)
 
-    def delete_concert(self, concert: dict, all_concerts: list):
+    @_with_lock('_data_lock')
+    def delete_concert(self, concert: Concert, all_concerts: list):
         """
         Помечает концерт как 'archived' в листе 'Данные' (не удаляет строку).
         """
@@ -615,15 +865,134 @@ class GoogleSheetsManager:
             return
         try:
             ws      = self._get_or_create_data_sheet()
-            cid     = str(concert.get('id', ''))
-            all_val = ws.get_all_values()
-            for i, row in enumerate(all_val[1:], start=2):
-                if len(row) >= 11 and row[10] == cid:
-                    # Статус в колонку J (индекс 9)
-                    ws.update(f'J{i}', [['archived']])
-                    ws.format(f'A{i}:K{i}', {
-                        'textFormat': {'strikethrough': True, 'foregroundColor': C_DARKGRAY},
-                    })
-                    break
+            cid     = str(concert.id)
+            i       = self._find_data_row(ws, cid)
+            if i:
+                # Статус в колонку J (индекс 9)
+                ws.update(f'J{i}', [['archived']])
+                row = concert.to_row()
+                row[9] = 'archived'
+                self._remember_row(row, i)
+                ws.format(f'A{i}:K{i}', {
+                    'textFormat': {'strikethrough': True, 'foregroundColor': C_DARKGRAY},
+                })
         except Exception as e:
             logger.error(f"delete_concert error: {e}")
+
+
+# ─── ASYNC ФАСАД ─────────────────────────────────────────────────────────────
+
+class AsyncSheetsManager:
+    """
+    Асинхронный фасад над GoogleSheetsManager для bot.py.
+    Каждый вызов gspread уходит в собственный ограниченный пул потоков,
+    event loop не ждёт ответа Google.
+      - max_workers — потоков в пуле;
+      - max_pending — вызовов в работе/очереди; сверх — await до освобождения;
+      - timeout — сколько ждём результат. По таймауту или отмене вызывающего
+        поток не прерывается: слот освобождается, только когда вызов
+        действительно завершился, а вызывающий получает None.
+    """
+
+    def __init__(self, manager: GoogleSheetsManager, max_workers: int = 4,
+                 timeout: float = 30.0, max_pending: int = 32):
+        self.sync     = manager
+        self.timeout  = timeout
+        self.max_pending = max_pending
+        self._pool    = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='sheets')
+        self._slots   = asyncio.Semaphore(max_pending)
+
+    async def _submit(self, fn, *args, **kwargs) -> asyncio.Future:
+        """Ставит вызов в пул (ждёт свободный слот) и возвращает его future."""
+        await self._slots.acquire()
+        loop = asyncio.get_running_loop()
+        try:
+            fut = loop.run_in_executor(self._pool, functools.partial(fn, *args, **kwargs))
+        except Exception:
+            self._slots.release()
+            raise
+        name = fn.__name__
+        t0   = time.perf_counter()
+
+        def done(f):
+            self._slots.release()
+            # Полное время вызова в потоке, даже если вызывающий не дождался
+            metrics.observe('sheets', name, time.perf_counter() - t0)
+            if not f.cancelled() and f.exception() is not None:
+                metrics.inc('sheets_errors', name)
+
+        fut.add_done_callback(done)
+        return fut
+
+    async def _call(self, fn, *args, **kwargs):
+        fut = await self._submit(fn, *args, **kwargs)
+        try:
+            # shield: таймаут/отмена не трогают уже запущенный в потоке вызов
+            return await asyncio.wait_for(asyncio.shield(fut), self.timeout)
+        except asyncio.TimeoutError:
+            metrics.inc('sheets_timeouts', fn.__name__)
+            logger.error(f"Sheets {fn.__name__}: нет ответа за {self.timeout:g}s")
+            return None
+
+    @property
+    def in_flight(self) -> int:
+        """Вызовов в работе и в очереди пула."""
+        return self.max_pending - self._slots._value
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False)
+
+    def is_connected(self) -> bool:
+        return self.sync.is_connected()
+
+    async def connect(self) -> bool:
+        """
+        Подключение в потоке пула: импорт gspread и авторизация не держат event loop.
+        Без таймаута: брошенное по таймауту подключение доехало бы в фоне
+        уже после загрузки концертов (см. load_all_concerts).
+        """
+        return bool(await (await self._submit(self.sync.connect)))
+
+    async def load_all_concerts(self) -> list:
+        """
+        Без подмены ошибки пустым списком: пустое хранилище начало бы ID
+        с 1 поверх существующих строк. Таймаут и ошибка Sheets — исключение,
+        повторяет вызывающий (post_init).
+        """
+        fut = await self._submit(self.sync.load_all_concerts)
+        try:
+            return await asyncio.wait_for(asyncio.shield(fut), self.timeout)
+        except asyncio.TimeoutError:
+            metrics.inc('sheets_timeouts', 'load_all_concerts')
+            raise
+
+    async def load_chats(self) -> list:
+        return await self._call(self.sync.load_chats) or []
+
+    async def save_chats(self, chat_ids: List[int]) -> bool:
+        # None — таймаут: исход неизвестен, повторим (дубль в листе безвреден)
+        return bool(await self._call(self.sync.save_chats, chat_ids))
+
+    async def sync_concert(self, concert: Concert, all_concerts: list = None,
+                           months: Optional[List[Tuple[int, int]]] = None):
+        await self._call(self.sync.sync_concert, concert, all_concerts, months=months)
+
+    async def sync_data_row(self, concert: Concert):
+        await self._call(self.sync._sync_data_row, concert)
+
+    async def delete_concert(self, concert: Concert, all_concerts: list):
+        await self._call(self.sync.delete_concert, concert, all_concerts)
+
+    async def rebuild_month_calendar(self, month: int, year: int, all_concerts: List[Concert] = None):
+        await self._call(self.sync.rebuild_month_calendar, month, year, all_concerts)
+
+    async def rebuild_calendars(self, months: List[Tuple[int, int]], all_concerts: List[Concert]):
+        await self._call(self.sync.rebuild_calendars, months, all_concerts)
+
+    async def poll_changes(self) -> Optional[Tuple[List[Dict], List[int]]]:
+        return await self._call(self.sync.poll_changes)
+
+    async def compact_archive(self, older_than_days: int) -> List[int]:
+        # Без таймаута: удалённые в потоке строки должны дойти до хранилища,
+        # иначе оно разойдётся с листом
+        return await (await self._submit(self.sync.compact_archive, older_than_days)) or []
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Нагрузочный симулятор — MTB Concerts Bot
+Гоняет настоящий Application из bot.py (все хендлеры, store, блокировки,
+AsyncSheetsManager) без сети:
+  - Telegram — FakeTelegram: подменённый сетевой слой Bot, отвечает на
+    sendMessage/editMessageText/... локально и запоминает клавиатуры;
+  - Sheets — fake_sheets.py с задержкой на запрос.
+
+Режимы:
+  python load_sim.py --users 20 --steps 10
+      синтетические менеджеры: /new, триггеры «билеты/афиша/текст/дата»,
+      нажатие «✅ Да» на присланной ботом кнопке, /list, /digest;
+  python load_sim.py --replay updates.jsonl
+      повтор записанных апдейтов (по одному Update JSON на строку;
+      строки, которые не являются апдейтами, пропускаются).
+
+Отчёт (JSON): апдейтов в секунду, p50/p99 задержки обработки, ошибки
+хендлеров, запросы к Sheets и к Bot API.
+"""
+
+import sys
+import json
+import time
+import random
+import asyncio
+import logging
+import argparse
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from telegram import Update
+from telegram.ext import Application
+from telegram.request import BaseRequest, RequestData
+
+import bot
+from concert import Concert
+from fake_sheets import fake_manager
+from google_sheets import AsyncSheetsManager
+
+BOT_USER = {'id': 1000000, 'is_bot': True, 'first_name': 'MTB', 'username': 'mtb_sim_bot'}
+DESC = "Большой сольный концерт с новой программой, специальные гости и живой звук."
+
+
+# ─── ФЕЙКОВЫЙ TELEGRAM ───────────────────────────────────────────────────────
+
+class FakeTelegram(BaseRequest):
+    """Сетевой слой Bot: отвечает на методы Bot API из памяти."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls: Counter = Counter()
+        self._next_id = 1
+        # Последнее сообщение бота в чате (с клавиатурой) — его «нажимает» пользователь
+        self.last_message: Dict[int, dict] = {}
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    def _message(self, chat_id: int, text: str, reply_markup=None, message_id: int = None) -> dict:
+        if message_id is None:
+            message_id, self._next_id = self._next_id, self._next_id + 1
+        msg = {'message_id': message_id, 'date': int(time.time()), 'from': BOT_USER,
+               'chat': {'id': chat_id, 'type': 'private'}, 'text': text}
+        if reply_markup:
+            msg['reply_markup'] = reply_markup if isinstance(reply_markup, dict) else json.loads(reply_markup)
+        self.last_message[chat_id] = msg
+        return msg
+
+    async def do_request(self, url: str, method: str, request_data: Optional[RequestData] = None,
+                         read_timeout=None, write_timeout=None, connect_timeout=None,
+                         pool_timeout=None) -> Tuple[int, bytes]:
+        api = url.rsplit('/', 1)[-1]
+        self.calls[api] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        p = request_data.parameters if request_data else {}
+
+        if api == 'getMe':
+            result = dict(BOT_USER, can_join_groups=True, can_read_all_group_messages=False,
+                          supports_inline_queries=False)
+        elif api == 'sendMessage':
+            result = self._message(int(p['chat_id']), p['text'], p.get('reply_markup'))
+        elif api == 'editMessageText':
+            result = self._message(int(p['chat_id']), p['text'], p.get('reply_markup'),
+                                   message_id=int(p['message_id']))
+        else:   # answerCallbackQuery, deleteMessage, setWebhook, ...
+            result = True
+        return 200, json.dumps({'ok': True, 'result': result}).encode()
+
+
+# ─── ПОСТРОЕНИЕ АПДЕЙТОВ ─────────────────────────────────────────────────────
+
+class UpdateFactory:
+    def __init__(self):
+        self._update_id  = 1
+        self._message_id = 10 ** 6
+
+    def _next(self) -> int:
+        self._update_id += 1
+        return self._update_id
+
+    @staticmethod
+    def _user(uid: int) -> dict:
+        return {'id': uid, 'is_bot': False, 'first_name': f"Менеджер {uid}"}
+
+    def text(self, uid: int, text: str) -> dict:
+        self._message_id += 1
+        msg = {'message_id': self._message_id, 'date': int(time.time()),
+               'chat': {'id': uid, 'type': 'private'}, 'from': self._user(uid), 'text': text}
+        if text.startswith('/'):
+            msg['entities'] = [{'type': 'bot_command', 'offset': 0,
+                                'length': len(text.split()[0])}]
+        return {'update_id': self._next(), 'message': msg}
+
+    def callback(self, uid: int, message: dict, data: str) -> dict:
+        return {'update_id': self._next(), 'callback_query': {
+            'id': str(self._update_id), 'from': self._user(uid),
+            'chat_instance': str(uid), 'message': message, 'data': data,
+        }}
+
+
+# ─── СИМУЛЯТОР ───────────────────────────────────────────────────────────────
+
+class Simulator:
+    def __init__(self, sheets_latency: float, tg_latency: float, concerts: int, seed: int):
+        self.tg      = FakeTelegram(tg_latency)
+        self.updates = UpdateFactory()
+        self.rng     = random.Random(seed)
+        self.latencies: List[float] = []
+        self.errors: Counter = Counter()
+
+        manager, self.sheet = fake_manager(latency=sheets_latency, seed=seed)
+        self._seed_sheet(manager, concerts)
+        bot.sheets = AsyncSheetsManager(manager, max_workers=bot.SHEETS_WORKERS,
+                                        timeout=bot.SHEETS_TIMEOUT)
+        self.app: Application = bot.build_app(
+            Application.builder().token('1000000:SIMULATED').request(self.tg)
+            .get_updates_request(FakeTelegram()))
+        self.app.add_error_handler(self._on_error)
+
+    def _seed_sheet(self, manager, n: int):
+        """Заранее заполненный лист 'Данные' — без счёта запросов."""
+        ws = manager.spreadsheet.add_worksheet('Данные', rows=n + 1, cols=11)
+        ws._write('A1', [['Сайт', 'Дата', 'Время', 'Страничка', 'Артист', 'Покупка билета',
+                          'Картинка', 'Текст', 'Афиша', 'Статус', 'ID']])
+        rows = [Concert(id=i + 1, artist=f"Сезон {i + 1}",
+                        date=f"{self.rng.randint(1, 28):02d}.{self.rng.randint(1, 12):02d}.2026").to_row()
+                for i in range(n)]
+        if rows:
+            ws._write('A2', rows)
+        self.sheet.backend.reset()
+
+    async def _on_error(self, update, ctx):
+        self.errors[type(ctx.error).__name__] += 1
+
+    async def dispatch(self, data: dict):
+        update = Update.de_json(data, self.app.bot)
+        t0 = time.perf_counter()
+        await self.app.process_update(update)
+        self.latencies.append(time.perf_counter() - t0)
+
+    async def press_yes(self, uid: int):
+        """Нажать первую кнопку последнего сообщения бота, если она есть."""
+        msg = self.tg.last_message.get(uid)
+        kb  = (msg or {}).get('reply_markup', {}).get('inline_keyboard')
+        if kb and kb[0] and kb[0][0].get('callback_data'):
+            await self.dispatch(self.updates.callback(uid, msg, kb[0][0]['callback_data']))
+
+    async def user(self, uid: int, steps: int):
+        """Один менеджер: ведёт свои концерты от создания до готовности."""
+        artists: List[str] = []
+        for _ in range(steps):
+            if not artists or self.rng.random() < 0.2:
+                name = f"Артист {uid}-{len(artists) + 1}"
+                artists.append(name)
+                d = f"{self.rng.randint(1, 28):02d}.{self.rng.randint(1, 12):02d}.2026"
+                await self.dispatch(self.updates.text(uid, f"/new {name} {d} 20:00"))
+                continue
+            name = self.rng.choice(artists)
+            kind = self.rng.choice(['tickets', 'poster', 'text', 'date', 'list', 'digest'])
+            if kind == 'list':
+                await self.dispatch(self.updates.text(uid, '/list'))
+                continue
+            if kind == 'digest':
+                await self.dispatch(self.updates.text(uid, '/digest'))
+                continue
+            text = {
+                'tickets': f"{name} билеты https://mtbarmoscow.com/t/{self.rng.randint(1, 99999)}",
+                'poster':  f"{name} афиша одобрена",
+                'text':    f"{name} текст {DESC}",
+                'date':    f"{name} дата {self.rng.randint(1, 28):02d}.05.2026 21:00",
+            }[kind]
+            await self.dispatch(self.updates.text(uid, text))
+            await self.press_yes(uid)
+
+    async def run_users(self, users: int, steps: int, base_uid: int = 100):
+        await asyncio.gather(*(self.user(base_uid + i, steps) for i in range(users)))
+
+    async def run_replay(self, path: str, concurrency: int) -> int:
+        """Повтор апдейтов из JSONL: concurrency апдейтов в работе одновременно."""
+        slots, tasks, skipped = asyncio.Semaphore(concurrency), [], 0
+
+        async def one(data):
+            async with slots:
+                await self.dispatch(data)
+
+        with open(path) as f:
+            for line in f:
+                try:
+                    data = json.loads(line)
+                except ValueError:
+                    skipped += 1
+                    continue
+                if not isinstance(data, dict) or 'update_id' not in data:
+                    skipped += 1
+                    continue
+                tasks.append(asyncio.create_task(one(data)))
+        await asyncio.gather(*tasks)
+        return skipped
+
+    def report(self, elapsed: float, **extra) -> dict:
+        lat = sorted(self.latencies)
+
+        def pct(q: float) -> float:
+            return round(lat[min(len(lat) - 1, int(q * len(lat)))] * 1000, 2) if lat else 0.0
+
+        return dict({
+            'updates':          len(lat),
+            'elapsed_s':        round(elapsed, 3),
+            'updates_per_sec':  round(len(lat) / elapsed, 1) if elapsed else 0.0,
+            'latency_ms':       {'p50': pct(0.50), 'p99': pct(0.99), 'max': pct(1.0)},
+            'handler_errors':   dict(self.errors),
+            'sheets_requests':  self.sheet.backend.total,
+            'sheets_by_kind':   dict(self.sheet.backend.calls),
+            'sheets_errors':    dict(self.sheet.backend.errors),
+            'bot_api_requests': dict(self.tg.calls),
+            'concerts':         len(bot.store),
+        }, **extra)
+
+
+async def amain(args) -> dict:
+    sim = Simulator(args.sheets_latency, args.tg_latency, args.concerts, args.seed)
+    sim.sheet.backend.error_rate = args.error_rate
+    await sim.app.initialize()
+    await sim.app.post_init(sim.app)
+    sim.sheet.backend.reset()
+    try:
+        t0 = time.perf_counter()
+        extra = {}
+        if args.replay:
+            extra['skipped_lines'] = await sim.run_replay(args.replay, args.concurrency)
+        else:
+            await sim.run_users(args.users, args.steps)
+        return sim.report(time.perf_counter() - t0, **extra)
+    finally:
+        await sim.app.post_shutdown(sim.app)
+        await sim.app.shutdown()
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument('--users', type=int, default=20, help='одновременных менеджеров')
+    p.add_argument('--steps', type=int, default=10, help='действий на менеджера')
+    p.add_argument('--concerts', type=int, default=200, help='концертов в таблице до старта')
+    p.add_argument('--sheets-latency', type=float, default=0.05, help='секунд на запрос к Sheets')
+    p.add_argument('--tg-latency', type=float, default=0.0, help='секунд на запрос к Bot API')
+    p.add_argument('--error-rate', type=float, default=0.0, help='доля запросов Sheets с 429')
+    p.add_argument('--replay', default='', help='JSONL с записанными апдейтами')
+    p.add_argument('--concurrency', type=int, default=16, help='апдейтов в работе при --replay')
+    p.add_argument('--seed', type=int, default=1)
+    p.add_argument('-o', '--output', default='')
+    args = p.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    bot._deleter.snapshot_path = ''   # очередь автоудаления симуляции не сохраняем
+    result = asyncio.run(amain(args))
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    print(f"{result['updates']} апдейтов, {result['updates_per_sec']}/с, "
+          f"p50 {result['latency_ms']['p50']} мс, p99 {result['latency_ms']['p99']} мс",
+          file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
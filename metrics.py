@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Метрики — MTB Concerts Bot
+Гистограммы задержек (хендлеры, вызовы Sheets и Tilda), счётчики ошибок и
+gauges (очереди, бэклоги). Всё в памяти процесса, без внешних зависимостей.
+Отдаётся двумя способами:
+  - summary()    — короткая таблица для owner-only /metrics в Telegram;
+  - prometheus() — text exposition format для GET /metrics.
+"""
+
+import time
+import functools
+import asyncio
+from typing import Callable, Dict, List, Tuple
+
+PREFIX  = 'mtb_'
+# Границы корзин гистограммы, сек
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)   # последняя — +Inf
+        self.sum    = 0.0
+        self.count  = 0
+
+    def observe(self, value: float):
+        i = 0
+        while i < len(BUCKETS) and value > BUCKETS[i]:
+            i += 1
+        self.counts[i] += 1
+        self.sum   += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Оценка квантиля по верхней границе корзины."""
+        if not self.count:
+            return 0.0
+        need, acc = q * self.count, 0
+        for i, n in enumerate(self.counts):
+            acc += n
+            if acc >= need:
+                return BUCKETS[i] if i < len(BUCKETS) else float('inf')
+        return float('inf')
+
+
+class Registry:
+    def __init__(self):
+        # (метрика, имя) → гистограмма / счётчик; имя — хендлер или метод
+        self._hist:     Dict[Tuple[str, str], Histogram] = {}
+        self._counters: Dict[Tuple[str, str], int] = {}
+        self._gauges:   Dict[str, Callable[[], float]] = {}
+
+    def observe(self, metric: str, name: str, seconds: float):
+        h = self._hist.get((metric, name))
+        if h is None:
+            h = self._hist[(metric, name)] = Histogram()
+        h.observe(seconds)
+
+    def inc(self, metric: str, name: str, n: int = 1):
+        key = (metric, name)
+        self._counters[key] = self._counters.get(key, 0) + n
+
+    def gauge(self, name: str, fn: Callable[[], float]):
+        """Регистрирует gauge: fn вызывается в момент чтения метрик."""
+        self._gauges[name] = fn
+
+    def timed(self, metric: str, name: str = None):
+        """Декоратор: задержка вызова → гистограмма metric, исключения → metric_errors."""
+        def deco(fn):
+            label = name or fn.__name__
+            if asyncio.iscoroutinefunction(fn):
+                @functools.wraps(fn)
+                async def wrapper(*args, **kwargs):
+                    t0 = time.perf_counter()
+                    try:
+                        return await fn(*args, **kwargs)
+                    except Exception:
+                        self.inc(metric + '_errors', label)
+                        raise
+                    finally:
+                        self.observe(metric, label, time.perf_counter() - t0)
+            else:
+                @functools.wraps(fn)
+                def wrapper(*args, **kwargs):
+                    t0 = time.perf_counter()
+                    try:
+                        return fn(*args, **kwargs)
+                    except Exception:
+                        self.inc(metric + '_errors', label)
+                        raise
+                    finally:
+                        self.observe(metric, label, time.perf_counter() - t0)
+            return wrapper
+        return deco
+
+    def snapshot(self) -> Dict[Tuple[str, str], Tuple[int, float]]:
+        """(метрика, имя) → (число вызовов, суммарное время) — для разницы «до/после»."""
+        return {k: (h.count, h.sum) for k, h in self._hist.items()}
+
+    def _read_gauges(self) -> Dict[str, float]:
+        values = {}
+        for name, fn in self._gauges.items():
+            try:
+                values[name] = float(fn())
+            except Exception:
+                continue
+        return values
+
+    # ── ВЫВОД ────────────────────────────────────────────────────────────────
+
+    def summary(self) -> str:
+        lines: List[str] = []
+        last = None
+        for (metric, name), h in sorted(self._hist.items()):
+            if metric != last:
+                lines.append(f"\n{metric}:")
+                last = metric
+            errors = self._counters.get((metric + '_errors', name), 0)
+            lines.append(
+                f"  {name}: n={h.count} avg={h.sum / h.count * 1000:.0f}ms "
+                f"p50≤{_fmt(h.quantile(0.5))} p95≤{_fmt(h.quantile(0.95))}"
+                + (f" err={errors}" if errors else '')
+            )
+        # Ошибки уже показаны рядом с гистограммой
+        other = {k: v for k, v in self._counters.items() if not k[0].endswith('_errors')}
+        if other:
+            lines.append("\ncounters:")
+            for (metric, name), v in sorted(other.items()):
+                lines.append(f"  {metric}{{{name}}}: {v}")
+        gauges = self._read_gauges()
+        if gauges:
+            lines.append("\ngauges:")
+            for name, v in sorted(gauges.items()):
+                lines.append(f"  {name}: {v:g}")
+        return '\n'.join(lines).strip() or 'Метрик пока нет'
+
+    def prometheus(self) -> str:
+        out: List[str] = []
+        last = None
+        for (metric, name), h in sorted(self._hist.items()):
+            full = PREFIX + metric + '_seconds'
+            if metric != last:
+                out.append(f"# TYPE {full} histogram")
+                last = metric
+            acc = 0
+            for i, n in enumerate(h.counts):
+                acc += n
+                le = f"{BUCKETS[i]:g}" if i < len(BUCKETS) else '+Inf'
+                out.append(f'{full}_bucket{{name="{name}",le="{le}"}} {acc}')
+            out.append(f'{full}_sum{{name="{name}"}} {h.sum:.6f}')
+            out.append(f'{full}_count{{name="{name}"}} {h.count}')
+        last = None
+        for (metric, name), v in sorted(self._counters.items()):
+            full = PREFIX + metric + '_total'
+            if metric != last:
+                out.append(f"# TYPE {full} counter")
+                last = metric
+            out.append(f'{full}{{name="{name}"}} {v}')
+        for name, v in sorted(self._read_gauges().items()):
+            out.append(f"# TYPE {PREFIX}{name} gauge")
+            out.append(f"{PREFIX}{name} {v:g}")
+        return '\n'.join(out) + '\n'
+
+
+def _fmt(seconds: float) -> str:
+    if seconds == float('inf'):
+        return f">{BUCKETS[-1]:g}s"
+    return f"{seconds * 1000:.0f}ms" if seconds < 1 else f"{seconds:g}s"
+
+
+REGISTRY = Registry()
+observe  = REGISTRY.observe
+inc      = REGISTRY.inc
+gauge    = REGISTRY.gauge
+timed    = REGISTRY.timed
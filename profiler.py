@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Профилирование по запросу владельца — MTB Concerts Bot
+/profile on [N] включает cProfile на следующие N апдейтов, /profile off —
+останавливает досрочно. Отчёт:
+  - wall-clock по спанам из metrics.py (хендлеры, вызовы Sheets и Tilda)
+    за время профилирования — там видно и то, что идёт в потоках gspread;
+  - top-N функций event loop по cProfile (on_text, process_trigger,
+    fuzzy_find, отправка в Telegram и т.д.).
+Когда профилирование выключено, ничего не подключено: хендлер-счётчик
+добавляется в Application только на время сеанса.
+"""
+
+import io
+import time
+import pstats
+import cProfile
+from typing import Optional
+
+import metrics
+
+
+class UpdateProfiler:
+    def __init__(self):
+        self._profile: Optional[cProfile.Profile] = None
+        self.remaining = 0
+        self._updates  = 0
+        self._started  = 0.0
+        self._before   = {}
+
+    @property
+    def active(self) -> bool:
+        return self._profile is not None
+
+    def start(self, updates: int):
+        self.remaining = updates
+        self._updates  = 0
+        self._started  = time.perf_counter()
+        self._before   = metrics.REGISTRY.snapshot()
+        self._profile  = cProfile.Profile()
+        self._profile.enable()
+
+    def tick(self) -> bool:
+        """Отметить апдейт. True — лимит исчерпан, пора останавливать."""
+        self._updates  += 1
+        self.remaining -= 1
+        return self.remaining <= 0
+
+    def stop(self, top: int = 30) -> str:
+        """Останавливает профилирование и возвращает текст отчёта."""
+        prof, self._profile = self._profile, None
+        prof.disable()
+        elapsed = time.perf_counter() - self._started
+
+        out = io.StringIO()
+        out.write(f"Апдейтов: {self._updates}, длительность: {elapsed:.1f}s\n\n")
+
+        out.write("Спаны (wall clock):\n")
+        out.write(f"  {'метрика/имя':<40} {'n':>6} {'всего, ms':>11} {'средн., ms':>11}\n")
+        after = metrics.REGISTRY.snapshot()
+        spans = []
+        for key, (count, total) in after.items():
+            c0, t0 = self._before.get(key, (0, 0.0))
+            if count > c0:
+                spans.append((total - t0, count - c0, f"{key[0]}/{key[1]}"))
+        for total, count, name in sorted(spans, reverse=True):
+            out.write(f"  {name:<40} {count:>6} {total * 1000:>11.1f} {total / count * 1000:>11.1f}\n")
+
+        for sort in ('cumulative', 'tottime'):
+            out.write(f"\ncProfile — top {top} по {sort}:\n")
+            stats = pstats.Stats(prof, stream=out)
+            stats.strip_dirs().sort_stats(sort).print_stats(top)
+        return out.getvalue()
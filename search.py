@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Полнотекстовый поиск для /find — MTB Concerts Bot
+Обратный индекс: токен norm() → {id концерта: вес}. ConcertStore вызывает
+place()/discard() на каждой мутации, индекс обновляется только по
+изменившемуся концерту. Запрос трогает лишь списки своих токенов.
+
+Ранжирование:
+  - сначала — сколько слов запроса нашлось, потом — сумма tf·idf;
+  - совпадение в имени артиста весит больше, чем в описании;
+  - слово запроса от 3 букв совпадает и с началом токена
+    («концерт» → «концертом»), с половинным весом.
+"""
+
+import math
+import heapq
+from bisect import bisect_left, insort
+from typing import Dict, List, Tuple
+
+from concert import Concert
+from textnorm import norm
+
+ARTIST_WEIGHT = 3
+PREFIX_MIN    = 3
+PREFIX_FACTOR = 0.5
+
+
+def tokens_of(c: Concert) -> Dict[str, int]:
+    """Токен → вес (частота, артист с множителем)."""
+    weights: Dict[str, int] = {}
+    for text, w in ((c.artist, ARTIST_WEIGHT), (c.description_text, 1)):
+        for tok in norm(text or '').split():
+            if len(tok) > 1:
+                weights[tok] = weights.get(tok, 0) + w
+    return weights
+
+
+class SearchIndex:
+    def __init__(self):
+        self._postings: Dict[str, Dict[int, int]] = {}   # токен → {id: вес}
+        self._terms:    Dict[int, Dict[str, int]] = {}   # id → его токены (для удаления)
+        self._source:   Dict[int, Tuple] = {}            # id → (артист, описание) при индексации
+        self._vocab:    List[str] = []                   # отсортированные токены — для префиксов
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    # ── ОБНОВЛЕНИЕ ───────────────────────────────────────────────────────────
+
+    def clear(self):
+        self._postings.clear()
+        self._terms.clear()
+        self._source.clear()
+        self._vocab.clear()
+
+    def place(self, c: Concert):
+        """Переиндексировать концерт, если поменялись артист или описание."""
+        source = (c.artist, c.description_text)
+        if self._source.get(c.id) == source:
+            return
+        self.discard(c.id)
+        terms = tokens_of(c)
+        for tok, w in terms.items():
+            posting = self._postings.get(tok)
+            if posting is None:
+                posting = self._postings[tok] = {}
+                insort(self._vocab, tok)
+            posting[c.id] = w
+        self._terms[c.id]  = terms
+        self._source[c.id] = source
+
+    def discard(self, cid: int):
+        self._source.pop(cid, None)
+        for tok in self._terms.pop(cid, ()):
+            posting = self._postings[tok]
+            del posting[cid]
+            if not posting:
+                del self._postings[tok]
+                del self._vocab[bisect_left(self._vocab, tok)]
+
+    # ── ПОИСК ────────────────────────────────────────────────────────────────
+
+    def _expand(self, word: str) -> List[Tuple[str, float]]:
+        """Токены индекса для слова запроса: само слово и (от 3 букв) продолжения."""
+        found = [(word, 1.0)] if word in self._postings else []
+        if len(word) >= PREFIX_MIN:
+            i = bisect_left(self._vocab, word)
+            while i < len(self._vocab) and self._vocab[i].startswith(word):
+                if self._vocab[i] != word:
+                    found.append((self._vocab[i], PREFIX_FACTOR))
+                i += 1
+        return found
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[int, float]]:
+        """[(id, очки)] по убыванию релевантности."""
+        words = [w for w in dict.fromkeys(norm(query).split()) if len(w) > 1]
+        n = len(self._terms)
+        if not words or not n:
+            return []
+        scores:  Dict[int, float] = {}
+        matched: Dict[int, int]   = {}
+        for word in words:
+            best: Dict[int, float] = {}   # по каждому слову — лучший из его токенов
+            for tok, factor in self._expand(word):
+                posting = self._postings[tok]
+                idf = math.log(1 + n / len(posting))
+                for cid, w in posting.items():
+                    s = w * idf * factor
+                    if s > best.get(cid, 0.0):
+                        best[cid] = s
+            for cid, s in best.items():
+                scores[cid]  = scores.get(cid, 0.0) + s
+                matched[cid] = matched.get(cid, 0) + 1
+        top = heapq.nlargest(limit, scores, key=lambda cid: (matched[cid], scores[cid], cid))
+        return [(cid, scores[cid]) for cid in top]
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+In-memory хранилище концертов — MTB Concerts Bot
+Загружается из Google Sheets при старте. Sheets = источник правды.
+
+Модель конкурентности (Application с concurrent_updates):
+  - у каждого концерта своя asyncio.Lock — правки одного концерта
+    выполняются по очереди, разных концертов — параллельно;
+  - мутации делаются только через update/create/remove/merge: между
+    чтением и записью нет await, поэтому обновление атомарно;
+  - каждая мутация помечает месяцы календаря (старый и новый) грязными
+    и поднимает версию концерта (Concert.touch) — сводка готовности
+    пересчитывается один раз на версию;
+  - корзины дайджеста (digest.Digest), поисковый индекс /find
+    (search.SearchIndex), индекс имён для fuzzy_find
+    (artist_index.ArtistIndex), индекс дублей (dupes.DuplicateIndex) и
+    интервалы занятости зала (conflicts.ScheduleIndex) обновляются там же,
+    инкрементально.
+"""
+
+import asyncio
+from datetime import datetime
+from typing import Optional, Dict, List, Tuple
+
+from concert import Concert, FIELDS
+from digest import Digest
+from search import SearchIndex
+from artist_index import ArtistIndex
+from dupes import DuplicateIndex
+from conflicts import ScheduleIndex
+
+
+def month_key(c: Concert) -> Optional[Tuple[int, int]]:
+    """'15.04.2026' → (2026, 4)"""
+    try:
+        dt = datetime.strptime(c.date or '', '%d.%m.%Y')
+    except ValueError:
+        return None
+    return dt.year, dt.month
+
+
+class ConcertStore:
+    def __init__(self, concert_minutes: int = 180):
+        self._by_id:  Dict[int, Concert] = {}
+        self._locks:  Dict[int, asyncio.Lock] = {}
+        self._max_id: int = 0
+        # Месяцы календаря, которые надо перерисовать: (год, месяц).
+        # Перенос даты с апреля на май перерисует оба листа ровно один раз.
+        self._month_of:     Dict[int, Tuple[int, int]] = {}
+        self._dirty_months: set = set()
+        self.digest  = Digest()
+        self.search  = SearchIndex()
+        self.artists = ArtistIndex()
+        self.dupes   = DuplicateIndex()
+        # Сколько зал занят одним концертом — для поиска пересечений
+        self.schedule = ScheduleIndex(concert_minutes)
+
+    # ── ЧТЕНИЕ ───────────────────────────────────────────────────────────────
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def get(self, cid: int) -> Optional[Concert]:
+        return self._by_id.get(cid)
+
+    def raw(self) -> List[Concert]:
+        """Все концерты включая отменённые, без сортировки (снимок списка)."""
+        return list(self._by_id.values())
+
+    def all(self, include_cancelled: bool = False) -> List[Concert]:
+        items = self._by_id.values()
+        if not include_cancelled:
+            items = [c for c in items if c.status != 'cancelled']
+        return sorted(items, key=lambda c: (c.date or '9999', -c.id))
+
+    def find(self, query: str, limit: int = 10) -> List[Concert]:
+        """Поиск по артисту и описанию, лучшие совпадения первыми."""
+        return [self._by_id[cid] for cid, _ in self.search.search(query, limit)]
+
+    def duplicates(self, artist: str, date: Optional[str] = None,
+                   exclude: Optional[int] = None) -> List[Concert]:
+        """Возможные дубли нового мероприятия: сначала на ту же дату, потом по похожести."""
+        found = self.dupes.candidates(artist, date, exclude)
+        found.sort(key=lambda x: (self._by_id[x[0]].date != date, -x[1], x[0]))
+        return [self._by_id[cid] for cid, _ in found]
+
+    def conflicts(self, c: Concert) -> List[Concert]:
+        """Живые концерты, которые идут в зале одновременно с c."""
+        return [self._by_id[cid] for cid in self.schedule.overlaps(c.date, c.time, exclude=c.id)]
+
+    def lock(self, cid: int) -> asyncio.Lock:
+        lock = self._locks.get(cid)
+        if lock is None:
+            lock = self._locks[cid] = asyncio.Lock()
+        return lock
+
+    # ── МУТАЦИИ ──────────────────────────────────────────────────────────────
+
+    def load(self, concerts: List[Concert]):
+        # Архивные строки (удалённые и слитые дубли) в памяти не держим,
+        # но их ID заняты в листе — next_id считает и по ним
+        self._max_id = max((c.id for c in concerts), default=0)
+        concerts = [c for c in concerts if c.status != 'archived']
+        self._by_id = {c.id: c for c in concerts}
+        self._locks = {}
+        self._month_of.clear()
+        self._dirty_months.clear()
+        self.digest.clear()
+        self.search.clear()
+        self.artists.clear()
+        self.dupes.clear()
+        self.schedule.clear()
+        for c in concerts:
+            m = month_key(c)
+            if m:
+                self._month_of[c.id] = m
+            self.digest.place(c)
+            self.search.place(c)
+            self.artists.place(c)
+            self.dupes.place(c)
+            self.schedule.place(c)
+
+    def next_id(self) -> int:
+        # Не уменьшается при удалении/архивации — ID не переиспользуются
+        return self._max_id + 1
+
+    def create(self, data: dict) -> Concert:
+        now = datetime.now().isoformat()
+        c = Concert(id=self.next_id(), created_at=now, updated_at=now,
+                    **{k: v for k, v in data.items() if k in FIELDS and v is not None})
+        self._add(c)
+        return c
+
+    def update(self, cid: int, fields: dict) -> Optional[Concert]:
+        c = self._by_id.get(cid)
+        if c is None:
+            return None
+        for k, v in fields.items():
+            if k in FIELDS:
+                setattr(c, k, v)
+        c.touch()
+        c.updated_at = datetime.now().isoformat()
+        self._track_month(c)
+        self.digest.place(c)
+        self.search.place(c)
+        self.artists.place(c)
+        self.dupes.place(c)
+        self.schedule.place(c)
+        return c
+
+    def remove(self, cid: int) -> Optional[Concert]:
+        c = self._by_id.pop(cid, None)
+        if c is not None:
+            self._locks.pop(cid, None)
+            self._track_month(c, removed=True)
+            self.digest.discard(cid)
+            self.search.discard(cid)
+            self.artists.discard(cid)
+            self.dupes.discard(cid)
+            self.schedule.discard(cid)
+        return c
+
+    def merge(self, changed: List[dict], removed: List[int]) -> int:
+        """Вливает ручные правки из Sheets. Возвращает число затронутых концертов."""
+        n = 0
+        for data in changed:
+            if data['id'] in self._by_id:
+                # Архивирована вручную в листе — из памяти уходит, как при load
+                if data.get('status') == 'archived':
+                    self.remove(data['id'])
+                else:
+                    self.update(data['id'], data)
+            # Новый концерт — только из полной строки: частичный diff по id,
+            # которого в памяти нет (уже удалён ботом), — не повод заводить запись
+            elif all(k in data for k in FIELDS) and data['status'] != 'archived':
+                self._add(Concert(**data))
+            else:
+                continue
+            n += 1
+        for cid in removed:
+            if self.remove(cid):
+                n += 1
+        return n
+
+    def _add(self, c: Concert):
+        self._by_id[c.id] = c
+        self._max_id = max(self._max_id, c.id)
+        self._track_month(c)
+        self.digest.place(c)
+        self.search.place(c)
+        self.artists.place(c)
+        self.dupes.place(c)
+        self.schedule.place(c)
+
+    # ── ГРЯЗНЫЕ МЕСЯЦЫ ───────────────────────────────────────────────────────
+
+    def _track_month(self, c: Concert, removed: bool = False):
+        old = self._month_of.pop(c.id, None)
+        new = None if removed else month_key(c)
+        if new:
+            self._month_of[c.id] = new
+        self._dirty_months.update(m for m in (old, new) if m)
+
+    def take_dirty_months(self) -> List[Tuple[int, int]]:
+        months = sorted(self._dirty_months)
+        self._dirty_months.clear()
+        return months
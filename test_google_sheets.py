@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Запись в лист 'Данные' на фейковой таблице (fake_sheets.py).
+  python -m pytest -q test_google_sheets.py
+"""
+
+import pytest
+
+from concert import Concert
+from fake_sheets import fake_manager
+from google_sheets import GoogleSheetsManager
+
+
+def _ids(sheet):
+    return [r[10] for r in sheet.sheet('Данные').values()[1:]]
+
+
+def test_sync_after_manual_reorder_keeps_other_rows():
+    manager, sheet = fake_manager()
+    manager.load_all_concerts()
+    alpha = Concert(id=1, artist='Alpha', date='01.05.2026')
+    beta  = Concert(id=2, artist='Beta',  date='02.05.2026')
+    manager._sync_data_row(alpha)
+    manager._sync_data_row(beta)
+
+    # Ручная сортировка листа: строки меняются местами, кэш строк бота устарел
+    ws = sheet.sheet('Данные')
+    ws.cells[1], ws.cells[2] = ws.cells[2], ws.cells[1]
+    assert _ids(sheet) == ['2', '1']
+
+    alpha.tickets_url = 'https://t.example/a'
+    manager._sync_data_row(alpha)
+
+    rows = {r[10]: r for r in ws.values()[1:]}
+    assert _ids(sheet) == ['2', '1']
+    assert rows['2'][4] == 'Beta'
+    assert rows['1'][4] == 'Alpha' and rows['1'][5] == 'https://t.example/a'
+
+
+def test_load_without_connection_raises_when_sheet_configured():
+    manager = GoogleSheetsManager(spreadsheet_id='configured-but-offline')
+    with pytest.raises(RuntimeError):
+        manager.load_all_concerts()
+    assert GoogleSheetsManager(spreadsheet_id=None).load_all_concerts() == []
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Хранилище и слияние дублей на фейковой таблице (fake_sheets.py).
+  python -m pytest -q test_store.py
+"""
+
+import asyncio
+
+import bot
+from concert import Concert
+from fake_sheets import fake_manager
+from google_sheets import AsyncSheetsManager
+from store import ConcertStore
+
+
+def test_merged_duplicate_stays_gone_after_reload():
+    manager, _ = fake_manager()
+    manager.load_all_concerts()
+    bot.sheets = AsyncSheetsManager(manager)
+    keep = Concert(id=1, artist='Иван Дорн', date='15.05.2026')
+    drop = Concert(id=2, artist='Иван Дорн', date='15.05.2026', tickets_url='https://t.example/d')
+    for c in (keep, drop):
+        manager._sync_data_row(c)
+    bot.store.load(manager.load_all_concerts())
+
+    merged = asyncio.run(bot.db_merge(1, 2))
+    assert merged.tickets_url == 'https://t.example/d'
+
+    # Перезапуск: строка дубля осталась в листе со статусом 'archived'
+    bot.store.load(manager.load_all_concerts())
+    assert [c.id for c in bot.fuzzy_find('Иван Дорн')] == [1]
+    assert [c.id for c in bot.store.all(include_cancelled=True)] == [1]
+    assert bot.store.next_id() == 3
+    bot.sheets.shutdown()
+
+
+def test_names_without_latin_or_cyrillic_are_not_duplicates():
+    store = ConcertStore()
+    store.load([Concert(id=1, artist='東京事変', date='15.05.2026'),
+                Concert(id=2, artist='🎸🎸', date='15.05.2026')])
+    assert store.duplicates('Ωλ', '15.05.2026') == []
+    assert store.duplicates('東京事変') == []
+    assert store.dupes.pairs() == []
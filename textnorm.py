@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Нормализация текста — MTB Concerts Bot
+norm() и transliterate() общие для разбора сообщений (bot.py) и индексов
+хранилища (store.py), поэтому живут отдельно от bot.py.
+"""
+
+import re
+
+
+# Латиница → кириллица для часто путаемых символов
+_CYR_LAT = str.maketrans('aceopxyABCEHKMOPTX', 'асеорхуАВСЕНКМОРТХ')
+
+def norm(text: str) -> str:
+    """Нормализация с заменой латиницы на кириллицу."""
+    text = text.lower()
+    text = text.translate(_CYR_LAT)
+    text = text.replace('ё', 'е')
+    text = text.replace('`', '').replace("'", '').replace('\u2019', '').replace('\u02bc', '')  # апострофы
+    text = re.sub(r'[^\w\s]', ' ', text)
+    return re.sub(r'\s+', ' ', text).strip()
+
+def transliterate(text: str) -> str:
+    """ИВАН ДОРН → ivan-dorn"""
+    table = {
+        'а':'a','б':'b','в':'v','г':'g','д':'d','е':'e','ё':'e',
+        'ж':'zh','з':'z','и':'i','й':'y','к':'k','л':'l','м':'m',
+        'н':'n','о':'o','п':'p','р':'r','с':'s','т':'t','у':'u',
+        'ф':'f','х':'kh','ц':'ts','ч':'ch','ш':'sh','щ':'sch',
+        'ъ':'','ы':'y','ь':'','э':'e','ю':'yu','я':'ya',
+    }
+    result = ''
+    for ch in text.lower():
+        if ch in table:
+            result += table[ch]
+        elif ch.isascii() and (ch.isalnum() or ch == ' '):
+            result += ch
+    result = re.sub(r'\s+', '-', result.strip())
+    return re.sub(r'-+', '-', result)
+
+# Латинский ключ: разные записи одного имени сводятся к одной
+# (Oxxxymiron / Оксимирон, Little / Литл, Джаз / Jazz)
+_LAT_FOLD = [('dzh', 'j'), ('kh', 'h'), ('ph', 'f'), ('ck', 'k'), ('ks', 'x'), ('w', 'v')]
+
+def latin_key(text: str) -> str:
+    """Иван Дорн → 'ivan dorn', Ivan Dorn → 'ivan dorn'."""
+    key = transliterate(text.replace('-', ' '))
+    for src, dst in _LAT_FOLD:
+        key = key.replace(src, dst)
+    key = re.sub(r'(.)\1+', r'\1', key)    # двойные буквы: Little → litle ≈ Литл
+    return key.replace('-', ' ')
@@ -6,6 +6,8 @@ import aiohttp
 import logging
 from typing import Optional, Dict, Any
 
+import metrics
+
 logger = logging.getLogger(__name__)
 
 
@@ -18,6 +20,7 @@ class TildaAPI:
         self.project_id = project_id
         self.base_url = "https://api.tildacdn.info/v1"
     
+    @metrics.timed('tilda')
     async def upload_image(self, file_path: str) -> Optional[str]:
         """
         Загрузить изображение в Tilda
@@ -51,6 +54,7 @@ class TildaAPI:
             logger.error(f"Upload image error: {e}")
             return None
     
+    @metrics.timed('tilda')
     async def create_page(self, title: str, html: str) -> Optional[Dict[str, Any]]:
         """
         Создать страницу в Tilda
@@ -114,6 +118,7 @@ class TildaAPI:
             logger.error(f"Create page error: {e}")
             return None
     
+    @metrics.timed('tilda')
     async def publish_page(self, page_id: str) -> bool:
         """
         Опубликовать страницу
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+TTLStore — ограниченный по размеру словарь с истечением срока (MTB Concerts Bot)
+Ключи хранятся в порядке записи: самые старые — в начале, поэтому чистка
+просроченных и вытеснение при переполнении — O(1) на элемент.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable
+
+
+class TTLStore:
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl      = ttl
+        self._items: 'OrderedDict[Hashable, tuple]' = OrderedDict()   # key → (expires, value)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key) is not None
+
+    def put(self, key: Hashable, value: Any):
+        self._items.pop(key, None)
+        self._items[key] = (time.monotonic() + self.ttl, value)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        item = self._items.get(key)
+        if item is None:
+            return default
+        if item[0] < time.monotonic():
+            del self._items[key]
+            return default
+        return item[1]
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        item = self._items.pop(key, None)
+        if item is None or item[0] < time.monotonic():
+            return default
+        return item[1]
+
+    def purge(self) -> int:
+        """Удаляет просроченные записи. Возвращает число удалённых."""
+        now, n = time.monotonic(), 0
+        while self._items:
+            key, (expires, _) = next(iter(self._items.items()))
+            if expires >= now:
+                break
+            del self._items[key]
+            n += 1
+        return n
+
+
+class PendingStore:
+    """
+    Незавершённые действия пользователей (ждём время, подтверждение и т.п.).
+    У каждого пользователя свой TTLStore на per_user записей: брошенные
+    подтверждения не копятся, а самые старые вытесняются новыми.
+    """
+
+    def __init__(self, per_user: int, ttl: float):
+        self.per_user = per_user
+        self.ttl      = ttl
+        self._users: Dict[int, TTLStore] = {}
+
+    def __len__(self) -> int:
+        return sum(len(s) for s in self._users.values())
+
+    def put(self, uid: int, key: Hashable, value: Any):
+        s = self._users.get(uid)
+        if s is None:
+            s = self._users[uid] = TTLStore(self.per_user, self.ttl)
+        s.put(key, value)
+
+    def get(self, uid: int, key: Hashable, default: Any = None) -> Any:
+        s = self._users.get(uid)
+        return default if s is None else s.get(key, default)
+
+    def pop(self, uid: int, key: Hashable, default: Any = None) -> Any:
+        s = self._users.get(uid)
+        if s is None:
+            return default
+        value = s.pop(key, default)
+        if not s:
+            del self._users[uid]
+        return value
+
+    def purge(self) -> int:
+        """Удаляет просроченные записи и пустых пользователей. Возвращает число удалённых."""
+        n = 0
+        for uid in list(self._users):
+            n += self._users[uid].purge()
+            if not self._users[uid]:
+                del self._users[uid]
+        return n
+
+    def stats(self) -> Dict[str, int]:
+        return {'users': len(self._users), 'entries': len(self)}
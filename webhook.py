@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Webhook-режим — MTB Concerts Bot
+Встроенный aiohttp-сервер вместо long polling:
+  POST {path}  — апдейт от Telegram; заголовок X-Telegram-Bot-Api-Secret-Token
+                 должен совпадать с секретом, иначе 403
+  GET  /health — жив ли бот и сколько апдейтов ждут обработки
+Метрики (GET /metrics) на этот публичный порт не выставляются — у них свой
+сервер, см. start_metrics_server.
+
+Локальная проверка без Telegram: запустить с пустым WEBHOOK_URL и послать
+записанный Update JSON:
+  curl -H 'X-Telegram-Bot-Api-Secret-Token: <секрет>' \
+       -d @update.json http://localhost:8443/telegram
+"""
+
+import hmac
+import json
+import signal
+import asyncio
+import logging
+
+from aiohttp import web
+from telegram import Update
+from telegram.ext import Application
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+
+
+def make_web_app(app: Application, path: str, secret: str) -> web.Application:
+    async def on_update(request: web.Request) -> web.Response:
+        # Байты, не str: compare_digest падает на не-ASCII строках
+        token = request.headers.get(SECRET_HEADER, '').encode()
+        if not hmac.compare_digest(token, secret.encode()):
+            return web.Response(status=403)
+        try:
+            data = await request.json()
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return web.Response(status=400)
+        if not isinstance(data, dict):
+            return web.Response(status=400)
+        try:
+            update = Update.de_json(data, app.bot)
+        except (TypeError, ValueError, KeyError):
+            return web.Response(status=400)
+        await app.update_queue.put(update)
+        return web.Response()
+
+    async def on_health(request: web.Request) -> web.Response:
+        return web.json_response({
+            'status':  'ok' if app.running else 'stopped',
+            'pending': app.update_queue.qsize(),
+        }, status=200 if app.running else 503)
+
+    web_app = web.Application()
+    web_app.router.add_post(path, on_update)
+    web_app.router.add_get('/health', on_health)
+    return web_app
+
+
+async def on_metrics(request: web.Request) -> web.Response:
+    return web.Response(text=metrics.REGISTRY.prometheus(), content_type='text/plain')
+
+
+async def start_metrics_server(listen: str, port: int) -> web.AppRunner:
+    """
+    Отдельный сервер только с /metrics, в обоих режимах. Без авторизации —
+    поэтому слушает адрес METRICS_LISTEN (по умолчанию 127.0.0.1).
+    """
+    web_app = web.Application()
+    web_app.router.add_get('/metrics', on_metrics)
+    runner = web.AppRunner(web_app)
+    await runner.setup()
+    await web.TCPSite(runner, listen, port).start()
+    logger.info(f"Метрики: http://{listen}:{port}/metrics")
+    return runner
+
+
+async def run_webhook(app: Application, listen: str, port: int, path: str,
+                      secret: str, url: str = '', allowed_updates=None):
+    """Аналог app.run_polling() для webhook: работает до SIGINT/SIGTERM."""
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    runner = web.AppRunner(make_web_app(app, path, secret))
+    await app.initialize()
+    if app.post_init:
+        await app.post_init(app)
+    try:
+        await runner.setup()
+        await web.TCPSite(runner, listen, port).start()
+        if url:
+            await app.bot.set_webhook(url=url.rstrip('/') + path, secret_token=secret,
+                                      allowed_updates=allowed_updates)
+        await app.start()
+        logger.info(f"Webhook слушает {listen}:{port}{path}")
+        await stop.wait()
+    finally:
+        if app.running:
+            await app.stop()
+        await runner.cleanup()
+        # Порядок как в run_polling: post_shutdown — после app.shutdown()
+        await app.shutdown()
+        if app.post_shutdown:
+            await app.post_shutdown(app)